@@ -1,6 +1,5 @@
 from flask import Flask
 from flask_cors import CORS
-from config.firebase_config import initialize_firebase
 import logging
 
 # Configure logging
@@ -21,23 +20,61 @@ def create_app(config_name='development'):
         }
     })
     
-    # Initialize Firebase
-    initialize_firebase()
-    logger.info("Firebase initialized successfully")
+    # Storage clients are created lazily in each worker process (Firestore's
+    # gRPC channel must not cross fork); gunicorn.conf.py warms them post-fork
+    from app.models.backends import STORAGE_BACKEND
+    logger.info(f"Using {STORAGE_BACKEND} storage backend")
+    
+    # Per-request latency and storage usage
+    from app.metrics import init_request_metrics
+    init_request_metrics(app)
     
     # Register blueprints
-    from app.routes import auth_routes, business_routes, report_routes, ai_routes
+    from app.routes import auth_routes, business_routes, report_routes, ai_routes, import_routes, serial_routes
+    
+    # ID-token check for every /api/ endpoint except token verification (AUTH_REQUIRED)
+    auth_routes.init_auth(app)
     
     app.register_blueprint(auth_routes.bp)
     app.register_blueprint(business_routes.bp)
     app.register_blueprint(report_routes.bp)
     app.register_blueprint(ai_routes.bp)
+    app.register_blueprint(import_routes.bp)
+    app.register_blueprint(serial_routes.bp)
+    
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
     
     # Health check endpoint
     @app.route('/health', methods=['GET'])
     def health_check():
         return {'status': 'healthy', 'message': 'LUXEN Backend is running'}, 200
     
+    # Collection cache effectiveness (empty when FIRESTORE_CACHE is off)
+    @app.route('/health/cache', methods=['GET'])
+    def cache_health():
+        from app.models.collection_cache import cache_stats
+        return {'success': True, 'caches': cache_stats()}, 200
+    
+    # Serial-number index size and Bloom filter parameters
+    @app.route('/health/serials', methods=['GET'])
+    def serial_index_health():
+        from app.services.serial_index import get_serial_index
+        return {'success': True, 'index': get_serial_index().stats()}, 200
+    
+    # Background jobs of this process and the age of their results
+    @app.route('/health/jobs', methods=['GET'])
+    def jobs_health():
+        from app.services.job_runner import get_job_runner
+        return {'success': True, 'jobs': get_job_runner().stats()}, 200
+    
+    # Prometheus scrape endpoint (per-process; each gunicorn worker keeps its own)
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        from app.metrics import registry
+        return registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    
     logger.info("Application created successfully")
     return app
 
@@ -0,0 +1,110 @@
+import click
+from flask import Flask
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _ledger_models():
+    """Instantiate every model that keeps an aggregate ledger."""
+    from app.models.firestore_models import (
+        OwnerModel, ProductionModel, SalesModel,
+        ExpenseModel, WarrantyModel
+    )
+    models = [OwnerModel(), ProductionModel(), SalesModel(), ExpenseModel(), WarrantyModel()]
+    return {model.collection_name: model for model in models}
+
+
+def register_commands(app: Flask):
+    """Register maintenance CLI commands (run with `flask --app app <group> <command>`)."""
+    
+    @app.cli.group('ledger')
+    def ledger_group():
+        """Aggregate ledger maintenance."""
+    
+    @ledger_group.command('rebuild')
+    @click.argument('collections', nargs=-1)
+    def rebuild(collections):
+        """Recompute ledgers from their collections (all by default)."""
+        models = _ledger_models()
+        for name in collections or models.keys():
+            if name not in models:
+                raise click.BadParameter(f"No ledger for collection '{name}'")
+            totals = models[name].ledger.rebuild()
+            click.echo(f"{name}: {totals}")
+    
+    @ledger_group.command('check')
+    @click.argument('collections', nargs=-1)
+    def check(collections):
+        """Report drift between stored ledgers and their collections."""
+        models = _ledger_models()
+        drifted = False
+        for name in collections or models.keys():
+            if name not in models:
+                raise click.BadParameter(f"No ledger for collection '{name}'")
+            drift = models[name].ledger.drift()
+            drifted = drifted or bool(drift)
+            click.echo(f"{name}: {'drift ' + str(drift) if drift else 'ok'}")
+        if drifted:
+            raise SystemExit(1)
+    
+    @ledger_group.command('shards')
+    @click.argument('collection')
+    @click.argument('count', type=int, required=False)
+    def shards(collection, count):
+        """Show, or set, how many documents a ledger's writes are spread over."""
+        models = _ledger_models()
+        if collection not in models:
+            raise click.BadParameter(f"No ledger for collection '{collection}'")
+        ledger = models[collection].ledger
+        if count is None:
+            click.echo(f"{collection}: {ledger.shard_count()} shards")
+            return
+        if count < 1:
+            raise click.BadParameter('A ledger needs at least one shard')
+        previous = ledger.set_shards(count)
+        click.echo(f"{collection}: {previous} -> {count} shards")
+    
+    @app.cli.group('jobs')
+    def jobs_group():
+        """Background jobs and their materialized results."""
+    
+    @jobs_group.command('run')
+    @click.argument('keys', nargs=-1)
+    def run_jobs(keys):
+        """Recompute results now, e.g. `owner-shares` or `monthly-report:2024-01` (all scheduled by default)."""
+        from app.services.job_runner import get_job_runner
+        runner = get_job_runner()
+        keys = keys or [key for spec in runner.specs.values() for key in spec.scheduled()]
+        for key in keys:
+            try:
+                doc = runner.run(key, force=True)
+            except KeyError as e:
+                raise click.BadParameter(str(e))
+            except Exception as e:
+                raise click.ClickException(f"{key}: {str(e)}")
+            click.echo(f"{key}: computed in {doc['durationMs']}ms")
+    
+    @jobs_group.command('list')
+    def list_jobs():
+        """Show the job table."""
+        from app.services.job_runner import get_job_runner
+        for job in get_job_runner().job_model.iter_all(order_by=None):
+            click.echo(f"{job['id']}: {job.get('status')} at {job.get('finishedAt') or job.get('startedAt')}"
+                       f"{' (' + job['error'] + ')' if job.get('error') else ''}")
+    
+    @app.cli.group('reports')
+    def reports_group():
+        """Monthly report rollups."""
+    
+    @reports_group.command('rebuild')
+    @click.argument('year', type=int)
+    @click.argument('month', type=int)
+    def rebuild_report(year, month):
+        """Recompute and overwrite the stored rollup for a month."""
+        from app.services.report_service import ReportService
+        result = ReportService().get_monthly_report(year, month, rebuild=True)
+        if not result.get('success'):
+            raise click.ClickException(result.get('error'))
+        click.echo(f"{year}-{month:02d}: sales {result['totalSales']}, expenses {result['totalExpenses']}, "
+                   f"production {result['productionCost']}, profit/loss {result['profitLoss']}")
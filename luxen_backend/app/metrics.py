@@ -0,0 +1,210 @@
+from contextvars import ContextVar
+from typing import Dict, Any, Iterable, Optional, Tuple
+import bisect
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the documents-read-per-request histogram buckets
+DOCUMENT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, label_names: Labels = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_number(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, label_names: Labels = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = {labels: (list(entry[0]), entry[1], entry[2]) for labels, entry in self._values.items()}
+        for labels, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_number(total)}"
+            yield f"{self.name}_count{_format_labels(self.label_names, labels)} {count}"
+
+
+class MetricsRegistry:
+    """The metrics of this process, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    'luxen_http_request_duration_seconds', 'HTTP request latency by route.',
+    ('method', 'route', 'status')
+))
+REQUEST_DOCUMENTS_READ = registry.register(Histogram(
+    'luxen_http_request_documents_read', 'Storage documents read per HTTP request by route.',
+    ('method', 'route'), buckets=DOCUMENT_BUCKETS
+))
+STORAGE_READS = registry.register(Counter(
+    'luxen_storage_documents_read_total', 'Documents read from the storage backend.', ('collection',)
+))
+STORAGE_WRITES = registry.register(Counter(
+    'luxen_storage_documents_written_total', 'Documents written to the storage backend.', ('collection',)
+))
+STORAGE_OPERATIONS = registry.register(Counter(
+    'luxen_storage_operations_total', 'Storage backend calls by collection and operation.',
+    ('collection', 'operation')
+))
+STORAGE_SECONDS = registry.register(Counter(
+    'luxen_storage_operation_seconds_total', 'Time spent in storage backend calls.',
+    ('collection', 'operation')
+))
+CHAT_CACHE_LOOKUPS = registry.register(Counter(
+    'luxen_chat_cache_lookups_total', 'Assistant answer cache lookups by result.', ('result',)
+))
+SINGLE_FLIGHT_CALLS = registry.register(Counter(
+    'luxen_single_flight_calls_total',
+    'Coalesced service calls by method and outcome (executed, in_flight or grace).', ('method', 'outcome')
+))
+
+
+class RequestStats:
+    """Storage usage attributed to one HTTP request."""
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.storage_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, reads: int, writes: int, seconds: float):
+        # Snapshot reads run on worker threads sharing this object
+        with self._lock:
+            self.reads += reads
+            self.writes += writes
+            self.storage_seconds += seconds
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar('luxen_request_stats', default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being handled in this context, if any."""
+    return _request_stats.get()
+
+
+def record_storage(collection: str, operation: str, seconds: float, reads: int = 0, writes: int = 0):
+    """Count one storage call globally and against the current request."""
+    STORAGE_OPERATIONS.inc(collection, operation)
+    STORAGE_SECONDS.inc(collection, operation, amount=seconds)
+    if reads:
+        STORAGE_READS.inc(collection, amount=reads)
+    if writes:
+        STORAGE_WRITES.inc(collection, amount=writes)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add(reads, writes, seconds)
+
+
+def init_request_metrics(app):
+    """Time every request and log its latency and storage usage."""
+    from flask import g, request
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_token = _request_stats.set(RequestStats())
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        token = g.pop('metrics_token', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        stats = _request_stats.get()
+        _request_stats.reset(token)
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(elapsed, request.method, route, str(response.status_code))
+        if stats is not None:
+            REQUEST_DOCUMENTS_READ.observe(stats.reads, request.method, route)
+            logger.info(f"{request.method} {route} {response.status_code} {elapsed * 1000:.1f}ms "
+                        f"reads={stats.reads} writes={stats.writes} "
+                        f"storage={stats.storage_seconds * 1000:.1f}ms")
+        return response
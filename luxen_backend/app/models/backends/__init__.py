@@ -0,0 +1,42 @@
+from app.models.backends.base import (
+    StorageBackend, DocumentNotFound, Filters, Cursor, DEFAULT_PAGE_SIZE, OPERATORS
+)
+import os
+import threading
+
+# Which StorageBackend the models use: 'firestore' (default), 'sqlite' or 'memory'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'firestore').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'luxen.db')
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str) -> StorageBackend:
+    """Instantiate a backend by name, importing only what it needs."""
+    if name == 'firestore':
+        from app.models.backends.firestore_backend import FirestoreBackend
+        return FirestoreBackend()
+    if name == 'sqlite':
+        from app.models.backends.sqlite_backend import SQLiteBackend
+        return SQLiteBackend(SQLITE_PATH)
+    if name == 'memory':
+        from app.models.backends.memory_backend import MemoryBackend
+        return MemoryBackend()
+    raise ValueError(f"Unknown storage backend '{name}'")
+
+
+def get_backend() -> StorageBackend:
+    """Process-wide backend selected by STORAGE_BACKEND."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(STORAGE_BACKEND)
+        return _backend
+
+
+def set_backend(backend: StorageBackend) -> None:
+    """Replace the process-wide backend (benchmarks and tools)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
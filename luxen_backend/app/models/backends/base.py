@@ -0,0 +1,172 @@
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Documents fetched per round trip when streaming
+DEFAULT_PAGE_SIZE = 500
+
+# Firestore allows at most this many writes in one batch or transaction
+MAX_BATCH_WRITES = 500
+
+# (doc_id or None for a generated ID, data) pairs written by `write_batch`
+BatchWrites = List[Tuple[Optional[str], Dict[str, Any]]]
+
+# {field: default} set only when a write creates its document (e.g. createdAt)
+CreatedFields = Optional[Dict[str, Any]]
+
+# AND-ed (field, operator, value) conditions
+Filters = Optional[Iterable[Tuple[str, str, Any]]]
+
+# Comparison operators every backend understands
+OPERATORS = ('==', '!=', '<', '<=', '>', '>=', 'in', 'not-in', 'array_contains', 'array_contains_any')
+
+# A document returned by an earlier page: its `id` and `order_by` field position the next
+Cursor = Optional[Dict[str, Any]]
+
+
+class DocumentNotFound(LookupError):
+    """Raised when updating a document that does not exist."""
+
+
+def numeric_value(value: Any) -> float:
+    """Return value if it is a real number, otherwise 0."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return 0
+    return value
+
+
+def apply_created(data: Dict[str, Any], old: Optional[Dict[str, Any]], created: CreatedFields) -> Dict[str, Any]:
+    """Fill create-only fields `data` does not set: from `old` if it exists, else the defaults."""
+    for field, default in (created or {}).items():
+        if field not in data:
+            data[field] = old[field] if old is not None and field in old else default
+    return data
+
+
+def sum_documents(docs: Iterable[Dict[str, Any]], sum_fields: List[str]) -> Dict[str, Any]:
+    """Count documents and sum numeric fields client-side."""
+    totals = {'count': 0, **{field: 0 for field in sum_fields}}
+    for doc in docs:
+        totals['count'] += 1
+        for field in sum_fields:
+            totals[field] += numeric_value(doc.get(field))
+    return totals
+
+
+def order_key(value: Any) -> Tuple[int, Any]:
+    """Sort key approximating Firestore's cross-type value ordering."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value if value.tzinfo else value.replace(tzinfo=timezone.utc))
+    if isinstance(value, str):
+        return (4, value)
+    return (5, str(value))
+
+
+def sort_documents(docs: Iterable[Dict[str, Any]], order_by: Optional[str] = None,
+                   descending: bool = False, start_after: Cursor = None) -> List[Dict[str, Any]]:
+    """Order documents as a Firestore query would and drop those up to the cursor.
+
+    Ties on `order_by` (and the order without it) fall back to the document
+    ID; documents missing the `order_by` field are skipped.
+    """
+    if order_by:
+        def key(doc):
+            return order_key(doc[order_by]), doc['id']
+        docs = [doc for doc in docs if order_by in doc]
+    else:
+        def key(doc):
+            return doc['id']
+    docs = sorted(docs, key=key, reverse=descending)
+    if start_after is not None:
+        after = key(start_after)
+        docs = [doc for doc in docs if (key(doc) < after if descending else key(doc) > after)]
+    return docs
+
+
+class StorageBackend:
+    """Interface between the models and a document store.
+
+    Documents are plain dicts; reads return `{**data, 'id': doc_id}`. Every
+    write accepts an optional `ledger` (an `AggregateLedger`) whose delta the
+    backend must apply atomically with the write.
+    """
+
+    name = 'base'
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch one document, or None if it does not exist."""
+        raise NotImplementedError
+
+    def stream(self, collection: str, where: Filters = None, order_by: Optional[str] = None,
+               select: Optional[List[str]] = None,
+               page_size: int = DEFAULT_PAGE_SIZE, descending: bool = False,
+               limit: Optional[int] = None, start_after: Cursor = None) -> Iterator[Dict[str, Any]]:
+        """Stream matching documents with bounded memory.
+
+        Documents missing the `order_by` field are skipped; without `order_by`
+        documents come in document-ID order, and ties are broken by document
+        ID. `select` projects each document down to the listed fields.
+        `limit` caps the documents returned and `start_after` resumes after a
+        document from an earlier page (it needs `id` and the `order_by` field).
+        """
+        raise NotImplementedError
+
+    def aggregate(self, collection: str, sum_fields: List[str],
+                  where: Filters = None) -> Dict[str, Any]:
+        """Return {'count': n, <field>: total, ...} over matching documents."""
+        raise NotImplementedError
+
+    def add(self, collection: str, data: Dict[str, Any], ledger=None) -> str:
+        """Create a document with a generated ID and return the ID."""
+        raise NotImplementedError
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any], ledger=None) -> None:
+        """Create or overwrite a document."""
+        raise NotImplementedError
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any], ledger=None) -> None:
+        """Merge fields into an existing document; raises DocumentNotFound."""
+        raise NotImplementedError
+
+    def delete(self, collection: str, doc_id: str, ledger=None) -> None:
+        """Delete a document if it exists."""
+        raise NotImplementedError
+
+    def write_batch(self, collection: str, writes: BatchWrites, ledger=None,
+                    created: CreatedFields = None) -> List[str]:
+        """Create or overwrite up to MAX_BATCH_WRITES documents; returns their IDs.
+
+        `created` fields missing from a write keep the replaced document's
+        values, or get the default when the write creates the document;
+        they are filled into the write's data in place (see `apply_created`).
+        Backends that can should apply the writes and their combined ledger
+        delta atomically in one round trip. This default writes one by one.
+        """
+        ids = []
+        for doc_id, data in writes:
+            if doc_id is None:
+                ids.append(self.add(collection, apply_created(data, None, created), ledger=ledger))
+            else:
+                old = self.get(collection, doc_id) if created else None
+                self.set(collection, doc_id, apply_created(data, old, created), ledger=ledger)
+                ids.append(doc_id)
+        return ids
+
+    def watch(self, collection: str, on_reset: Callable[[Dict[str, Dict[str, Any]]], None],
+              on_change: Callable[[str, Optional[Dict[str, Any]]], None]):
+        """Subscribe to changes in a collection.
+
+        `on_reset` receives the full {id: data} contents once, then
+        `on_change(doc_id, data)` is called per change (data None on delete).
+        Returns a handle with `is_active` and `unsubscribe()`, or None when
+        the backend cannot push changes.
+        """
+        return None
@@ -0,0 +1,258 @@
+from config.firebase_config import get_db
+from app.models.backends.base import (
+    StorageBackend, DocumentNotFound, Filters, Cursor, OPERATORS, DEFAULT_PAGE_SIZE, BatchWrites,
+    CreatedFields, apply_created, sum_documents
+)
+from app.models.ledger import LEDGER_COLLECTION
+from typing import Dict, Any, Callable, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _firestore():
+    """The Firestore SDK module, imported on first use (with gRPC it dominates startup)."""
+    from firebase_admin import firestore
+    return firestore
+
+
+class FirestoreBackend(StorageBackend):
+    """Storage backend on Cloud Firestore via the Firebase Admin SDK."""
+
+    name = 'firestore'
+
+    def __init__(self):
+        # Cleared the first time Firestore rejects an aggregation query
+        self.aggregation_supported = True
+
+    @property
+    def db(self):
+        return get_db()
+
+    def _filtered(self, collection: str, where: Filters = None):
+        """Collection query with the given conditions applied."""
+        firestore = _firestore()
+        query = self.db.collection(collection)
+        for field, operator, value in where or ():
+            if operator not in OPERATORS:
+                raise ValueError(f"Unsupported operator '{operator}'")
+            query = query.where(filter=firestore.FieldFilter(field, operator, value))
+        return query
+
+    @staticmethod
+    def _increments(ledger, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]],
+                    delta: Optional[Dict[str, Any]] = None, writes: int = 1) -> Dict[str, Any]:
+        """`Increment` transforms to merge into a ledger shard."""
+        firestore = _firestore()
+        delta = ledger.delta(old, new) if delta is None else delta
+        update = {key: firestore.Increment(value) for key, value in delta.items()}
+        update['version'] = firestore.Increment(writes)
+        update.update(ledger.marker())
+        return update
+
+    def _ledger_ref(self, ledger):
+        """A random shard of the ledger, so bursts of writes do not contend on one document."""
+        return self.db.collection(LEDGER_COLLECTION).document(ledger.write_shard())
+
+    def _write_with_ledger(self, doc_ref, ledger, write) -> None:
+        """Run `write(transaction, old) -> new` and the matching ledger update atomically."""
+        firestore = _firestore()
+        ledger_ref = self._ledger_ref(ledger)
+
+        @firestore.transactional
+        def apply(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            old = snapshot.to_dict() if snapshot.exists else None
+            new = write(transaction, old)
+            if old is not None or new is not None:
+                transaction.set(ledger_ref, self._increments(ledger, old, new), merge=True)
+
+        apply(self.db.transaction())
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        doc = self.db.collection(collection).document(doc_id).get()
+        if doc.exists:
+            return {**doc.to_dict(), 'id': doc.id}
+        return None
+
+    def stream(self, collection: str, where: Filters = None, order_by: Optional[str] = None,
+               select: Optional[List[str]] = None,
+               page_size: int = DEFAULT_PAGE_SIZE, descending: bool = False,
+               limit: Optional[int] = None, start_after: Cursor = None) -> Iterator[Dict[str, Any]]:
+        """Page through the query with `start_after` cursors, one page in memory.
+
+        Ordering is always completed by document ID, so cursors are exact
+        even when `order_by` values tie.
+        """
+        firestore = _firestore()
+        base = self._filtered(collection, where)
+        direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+        # The cursor needs the order field even when the caller projects it away
+        hidden = order_by if select is not None and order_by and order_by not in select else None
+        if select is not None:
+            base = base.select(select + [hidden] if hidden else select)
+        if order_by:
+            base = base.order_by(order_by, direction=direction)
+        base = base.order_by('__name__', direction=direction)
+
+        def position(doc: Dict[str, Any]) -> Dict[str, Any]:
+            return {order_by: doc[order_by], '__name__': doc['id']} if order_by else {'__name__': doc['id']}
+
+        cursor = position(start_after) if start_after is not None else None
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page = base.start_after(cursor) if cursor is not None else base
+            docs = [{**doc.to_dict(), 'id': doc.id} for doc in page.limit(size).stream()]
+            for doc in docs:
+                yield {k: v for k, v in doc.items() if k != hidden} if hidden else doc
+            if len(docs) < size:
+                return
+            cursor = position(docs[-1])
+            if remaining is not None:
+                remaining -= len(docs)
+
+    def aggregate(self, collection: str, sum_fields: List[str],
+                  where: Filters = None) -> Dict[str, Any]:
+        """Run a count/sum aggregation query.
+
+        When aggregation is rejected (e.g. an older emulator), falls back to
+        streaming the documents projected to just the summed fields from then
+        on. Transient errors (deadlines, quota, unavailability) are raised,
+        since a full stream would only add load.
+        """
+        from google.api_core.exceptions import InvalidArgument, MethodNotImplemented
+        if self.aggregation_supported:
+            try:
+                query = self._filtered(collection, where).count(alias='count')
+                for field in sum_fields:
+                    query = query.sum(field, alias=field)
+                return {result.alias: result.value for result in query.get()[0]}
+            except (AttributeError, NotImplementedError, MethodNotImplemented, InvalidArgument) as e:
+                logger.warning(f"Aggregation unavailable for {collection}, "
+                               f"falling back to streaming: {str(e)}")
+                self.aggregation_supported = False
+        return sum_documents(self.stream(collection, where=where, select=sum_fields), sum_fields)
+
+    def add(self, collection: str, data: Dict[str, Any], ledger=None) -> str:
+        doc_ref = self.db.collection(collection).document()
+        if ledger is None:
+            doc_ref.set(data)
+            return doc_ref.id
+        # A fresh auto-ID cannot exist yet, so a batch is enough
+        batch = self.db.batch()
+        batch.set(doc_ref, data)
+        batch.set(self._ledger_ref(ledger), self._increments(ledger, None, data), merge=True)
+        batch.commit()
+        return doc_ref.id
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any], ledger=None) -> None:
+        doc_ref = self.db.collection(collection).document(doc_id)
+        if ledger is None:
+            doc_ref.set(data)
+            return
+
+        def write(transaction, old):
+            transaction.set(doc_ref, data)
+            return data
+
+        self._write_with_ledger(doc_ref, ledger, write)
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any], ledger=None) -> None:
+        from google.api_core.exceptions import NotFound
+        doc_ref = self.db.collection(collection).document(doc_id)
+        if ledger is None:
+            try:
+                doc_ref.update(data)
+            except NotFound:
+                raise DocumentNotFound(f"Document {doc_id} not found in {collection}")
+            return
+
+        def write(transaction, old):
+            if old is None:
+                raise DocumentNotFound(f"Document {doc_id} not found in {collection}")
+            transaction.update(doc_ref, data)
+            return {**old, **data}
+
+        self._write_with_ledger(doc_ref, ledger, write)
+
+    def delete(self, collection: str, doc_id: str, ledger=None) -> None:
+        doc_ref = self.db.collection(collection).document(doc_id)
+        if ledger is None:
+            doc_ref.delete()
+            return
+
+        def write(transaction, old):
+            transaction.delete(doc_ref)
+            return None
+
+        self._write_with_ledger(doc_ref, ledger, write)
+
+    def write_batch(self, collection: str, writes: BatchWrites, ledger=None,
+                    created: CreatedFields = None) -> List[str]:
+        """Commit the writes and their combined ledger delta as one batch.
+
+        Upserts of existing IDs with a ledger or `created` fields run as a
+        transaction, which reads the current documents to compute the delta
+        and keep their create-only fields.
+        """
+        firestore = _firestore()
+        collection_ref = self.db.collection(collection)
+        refs = [collection_ref.document(doc_id) if doc_id else collection_ref.document()
+                for doc_id, _ in writes]
+        upserts = [ref for ref, (doc_id, _) in zip(refs, writes) if doc_id is not None]
+
+        if not upserts or (ledger is None and not created):
+            batch = self.db.batch()
+            for ref, (_, data) in zip(refs, writes):
+                batch.set(ref, apply_created(data, None, created))
+            if ledger is not None:
+                delta = ledger.batch_delta((None, data) for _, data in writes)
+                batch.set(self._ledger_ref(ledger),
+                          self._increments(ledger, None, None, delta, len(writes)), merge=True)
+            batch.commit()
+            return [ref.id for ref in refs]
+
+        ledger_ref = self._ledger_ref(ledger) if ledger is not None else None
+        written = []
+
+        @firestore.transactional
+        def apply(transaction):
+            existing = {snapshot.id: snapshot.to_dict()
+                        for snapshot in self.db.get_all(upserts, transaction=transaction)
+                        if snapshot.exists}
+            # Fill create-only fields on copies: a retried attempt may see different documents
+            written[:] = [apply_created(dict(data), existing.get(ref.id), created)
+                          for ref, (_, data) in zip(refs, writes)]
+            changes = []
+            for ref, data in zip(refs, written):
+                transaction.set(ref, data)
+                # A repeated ID replaces what the batch wrote before it
+                changes.append((existing.get(ref.id), data))
+                existing[ref.id] = data
+            if ledger_ref is not None:
+                delta = ledger.batch_delta(changes)
+                transaction.set(ledger_ref, self._increments(ledger, None, None, delta, len(writes)), merge=True)
+
+        apply(self.db.transaction())
+        for (_, data), stored in zip(writes, written):
+            data.update(stored)
+        return [ref.id for ref in refs]
+
+    def watch(self, collection: str, on_reset: Callable[[Dict[str, Dict[str, Any]]], None],
+              on_change: Callable[[str, Optional[Dict[str, Any]]], None]):
+        """Subscribe with an `on_snapshot` listener; the Watch is the handle."""
+        state = {'initial': True}
+
+        def on_snapshot(collection_snapshot, changes, read_time):
+            if state['initial']:
+                state['initial'] = False
+                on_reset({doc.id: doc.to_dict() for doc in collection_snapshot})
+                return
+            for change in changes:
+                if change.type.name == 'REMOVED':
+                    on_change(change.document.id, None)
+                else:
+                    on_change(change.document.id, change.document.to_dict())
+
+        return self.db.collection(collection).on_snapshot(on_snapshot)
@@ -0,0 +1,125 @@
+from app.metrics import record_storage
+from app.models.backends.base import StorageBackend, Filters, Cursor, DEFAULT_PAGE_SIZE, BatchWrites, CreatedFields
+from app.models.ledger import LEDGER_COLLECTION
+from typing import Dict, Any, Callable, Iterator, List, Optional
+import time
+
+# Firestore bills one read per this many index entries scanned by an aggregation
+AGGREGATION_ENTRIES_PER_READ = 1000
+
+
+class InstrumentedBackend(StorageBackend):
+    """Wraps a backend, recording document reads, writes and call time.
+
+    Counts follow Firestore billing: one read per document returned (or per
+    `get`, found or not), one per 1000 documents aggregated, and one per
+    document written. Ledger writes also read the document and write the
+    `aggregates` document.
+    """
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self.name = backend.name
+
+    def _ledger_cost(self, ledger, reads_document: bool):
+        if ledger is not None:
+            record_storage(LEDGER_COLLECTION, 'ledger', 0, writes=1)
+            if reads_document:
+                record_storage(ledger.collection_name, 'ledger', 0, reads=1)
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            return self.backend.get(collection, doc_id)
+        finally:
+            record_storage(collection, 'get', time.perf_counter() - started, reads=1)
+
+    def stream(self, collection: str, where: Filters = None, order_by: Optional[str] = None,
+               select: Optional[List[str]] = None,
+               page_size: int = DEFAULT_PAGE_SIZE, descending: bool = False,
+               limit: Optional[int] = None, start_after: Cursor = None) -> Iterator[Dict[str, Any]]:
+        """Count streamed documents; only time spent inside the backend is measured."""
+        docs = self.backend.stream(collection, where=where, order_by=order_by, select=select,
+                                   page_size=page_size, descending=descending, limit=limit,
+                                   start_after=start_after)
+        reads = 0
+        seconds = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    doc = next(docs)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - started
+                reads += 1
+                yield doc
+        finally:
+            # An empty result is still billed as one read
+            record_storage(collection, 'stream', seconds, reads=max(reads, 1))
+
+    def aggregate(self, collection: str, sum_fields: List[str],
+                  where: Filters = None) -> Dict[str, Any]:
+        started = time.perf_counter()
+        totals = None
+        try:
+            totals = self.backend.aggregate(collection, sum_fields, where=where)
+            return totals
+        finally:
+            scanned = totals['count'] if totals else 0
+            reads = max(1, -(-scanned // AGGREGATION_ENTRIES_PER_READ))
+            record_storage(collection, 'aggregate', time.perf_counter() - started, reads=reads)
+
+    def add(self, collection: str, data: Dict[str, Any], ledger=None) -> str:
+        started = time.perf_counter()
+        try:
+            return self.backend.add(collection, data, ledger=ledger)
+        finally:
+            record_storage(collection, 'add', time.perf_counter() - started, writes=1)
+            self._ledger_cost(ledger, reads_document=False)
+
+    def _write(self, operation: str, write: Callable[[], None], collection: str, ledger):
+        started = time.perf_counter()
+        try:
+            write()
+        finally:
+            record_storage(collection, operation, time.perf_counter() - started, writes=1)
+            self._ledger_cost(ledger, reads_document=True)
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any], ledger=None) -> None:
+        self._write('set', lambda: self.backend.set(collection, doc_id, data, ledger=ledger),
+                    collection, ledger)
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any], ledger=None) -> None:
+        self._write('update', lambda: self.backend.update(collection, doc_id, data, ledger=ledger),
+                    collection, ledger)
+
+    def delete(self, collection: str, doc_id: str, ledger=None) -> None:
+        self._write('delete', lambda: self.backend.delete(collection, doc_id, ledger=ledger),
+                    collection, ledger)
+
+    def write_batch(self, collection: str, writes: BatchWrites, ledger=None,
+                    created: CreatedFields = None) -> List[str]:
+        started = time.perf_counter()
+        try:
+            return self.backend.write_batch(collection, writes, ledger=ledger, created=created)
+        finally:
+            upserts = sum(1 for doc_id, _ in writes if doc_id is not None)
+            record_storage(collection, 'write_batch', time.perf_counter() - started,
+                           reads=upserts if ledger is not None or created else 0, writes=len(writes))
+            if ledger is not None:
+                record_storage(LEDGER_COLLECTION, 'ledger', 0, writes=1)
+
+    def watch(self, collection: str, on_reset: Callable[[Dict[str, Dict[str, Any]]], None],
+              on_change: Callable[[str, Optional[Dict[str, Any]]], None]):
+        def counted_reset(docs):
+            # Listener reads happen on the backend's thread, outside any request
+            record_storage(collection, 'watch', 0, reads=max(len(docs), 1))
+            on_reset(docs)
+
+        def counted_change(doc_id, data):
+            record_storage(collection, 'watch', 0, reads=1)
+            on_change(doc_id, data)
+
+        return self.backend.watch(collection, counted_reset, counted_change)
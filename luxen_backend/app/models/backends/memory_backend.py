@@ -0,0 +1,175 @@
+from app.models.backends.base import (
+    StorageBackend, DocumentNotFound, Filters, Cursor, OPERATORS, DEFAULT_PAGE_SIZE, BatchWrites,
+    CreatedFields, apply_created, order_key, sort_documents, sum_documents
+)
+from app.models.ledger import LEDGER_COLLECTION
+from typing import Dict, Any, Callable, Iterator, List, Optional
+import threading
+import uuid
+
+
+def _compare(operator: str, actual: Any, expected: Any) -> bool:
+    """Evaluate one Firestore-style condition against a field value."""
+    if operator == '==':
+        return actual == expected
+    if operator == '!=':
+        return actual is not None and actual != expected
+    if operator == 'in':
+        return actual in expected
+    if operator == 'not-in':
+        return actual is not None and actual not in expected
+    if operator == 'array_contains':
+        return isinstance(actual, list) and expected in actual
+    if operator == 'array_contains_any':
+        return isinstance(actual, list) and any(value in actual for value in expected)
+    if actual is None:
+        return False
+    left, right = order_key(actual), order_key(expected)
+    # Range filters only match values of the same type, as in Firestore
+    if left[0] != right[0]:
+        return False
+    if operator == '<':
+        return left < right
+    if operator == '<=':
+        return left <= right
+    if operator == '>':
+        return left > right
+    return left >= right
+
+
+def matches(doc: Dict[str, Any], where: Filters) -> bool:
+    """True if the document satisfies every condition."""
+    for field, operator, value in where or ():
+        if operator not in OPERATORS:
+            raise ValueError(f"Unsupported operator '{operator}'")
+        if not _compare(operator, doc.get(field), value):
+            return False
+    return True
+
+
+class _Subscription:
+    """Handle returned by MemoryBackend.watch."""
+
+    def __init__(self, backend, collection: str, on_change):
+        self.backend = backend
+        self.collection = collection
+        self.on_change = on_change
+        self.is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+        self.backend._unsubscribe(self)
+
+
+class MemoryBackend(StorageBackend):
+    """Storage backend holding every collection in process memory.
+
+    A stand-in for Firestore in benchmarks, load tests and local tooling;
+    data is lost when the process exits.
+    """
+
+    name = 'memory'
+
+    def __init__(self):
+        self.collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._subscriptions: List[_Subscription] = []
+        self._lock = threading.RLock()
+
+    def _collection(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        return self.collections.setdefault(collection, {})
+
+    def _notify(self, collection: str, doc_id: str, data: Optional[Dict[str, Any]]):
+        """Deliver a change to watchers; called without holding the lock."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.collection == collection:
+                subscription.on_change(doc_id, dict(data) if data is not None else None)
+
+    def _unsubscribe(self, subscription: _Subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def _write(self, collection: str, doc_id: str, new: Optional[Dict[str, Any]], ledger=None):
+        """Replace (or delete, when new is None) a document and apply the ledger delta."""
+        docs = self._collection(collection)
+        old = docs.get(doc_id)
+        if new is None:
+            docs.pop(doc_id, None)
+        else:
+            docs[doc_id] = dict(new)
+        if ledger is not None and (old is not None or new is not None):
+            totals = self._collection(LEDGER_COLLECTION).setdefault(ledger.write_shard(), {})
+            totals.update(ledger.marker())
+            for key, value in ledger.delta(old, new).items():
+                totals[key] = totals.get(key, 0) + value
+            totals['version'] = totals.get('version', 0) + 1
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        data = self._collection(collection).get(doc_id)
+        return {**data, 'id': doc_id} if data is not None else None
+
+    def stream(self, collection: str, where: Filters = None, order_by: Optional[str] = None,
+               select: Optional[List[str]] = None,
+               page_size: int = DEFAULT_PAGE_SIZE, descending: bool = False,
+               limit: Optional[int] = None, start_after: Cursor = None) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._collection(collection).items())
+        docs = [{**data, 'id': doc_id} for doc_id, data in items if not where or matches(data, where)]
+        docs = sort_documents(docs, order_by, descending, start_after)
+        for doc in docs[:limit]:
+            if select is not None:
+                doc = {**{field: doc[field] for field in select if field in doc}, 'id': doc['id']}
+            yield doc
+
+    def aggregate(self, collection: str, sum_fields: List[str],
+                  where: Filters = None) -> Dict[str, Any]:
+        return sum_documents(self.stream(collection, where=where), sum_fields)
+
+    def add(self, collection: str, data: Dict[str, Any], ledger=None) -> str:
+        doc_id = uuid.uuid4().hex[:20]
+        with self._lock:
+            self._write(collection, doc_id, data, ledger)
+        self._notify(collection, doc_id, data)
+        return doc_id
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any], ledger=None) -> None:
+        with self._lock:
+            self._write(collection, doc_id, data, ledger)
+        self._notify(collection, doc_id, data)
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any], ledger=None) -> None:
+        with self._lock:
+            old = self._collection(collection).get(doc_id)
+            if old is None:
+                raise DocumentNotFound(f"Document {doc_id} not found in {collection}")
+            new = {**old, **data}
+            self._write(collection, doc_id, new, ledger)
+        self._notify(collection, doc_id, new)
+
+    def delete(self, collection: str, doc_id: str, ledger=None) -> None:
+        with self._lock:
+            if doc_id not in self._collection(collection):
+                return
+            self._write(collection, doc_id, None, ledger)
+        self._notify(collection, doc_id, None)
+
+    def write_batch(self, collection: str, writes: BatchWrites, ledger=None,
+                    created: CreatedFields = None) -> List[str]:
+        with self._lock:
+            ids = [doc_id or uuid.uuid4().hex[:20] for doc_id, _ in writes]
+            for doc_id, (_, data) in zip(ids, writes):
+                apply_created(data, self._collection(collection).get(doc_id), created)
+                self._write(collection, doc_id, data, ledger)
+        for doc_id, (_, data) in zip(ids, writes):
+            self._notify(collection, doc_id, data)
+        return ids
+
+    def watch(self, collection: str, on_reset: Callable[[Dict[str, Dict[str, Any]]], None],
+              on_change: Callable[[str, Optional[Dict[str, Any]]], None]):
+        with self._lock:
+            subscription = _Subscription(self, collection, on_change)
+            self._subscriptions.append(subscription)
+            on_reset({doc_id: dict(data) for doc_id, data in self._collection(collection).items()})
+        return subscription
@@ -0,0 +1,309 @@
+from app.models.backends.base import (
+    StorageBackend, DocumentNotFound, Filters, Cursor, OPERATORS, DEFAULT_PAGE_SIZE, BatchWrites,
+    CreatedFields, apply_created
+)
+from app.models.ledger import LEDGER_COLLECTION
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields copied into indexed columns so filters, ordering and sums on them use SQL indexes
+PROMOTED_COLUMNS = {'createdAt': 'created_at', 'category': 'category', 'replaced': 'replaced'}
+
+_FIELD_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at TEXT,
+    category TEXT,
+    replaced INTEGER,
+    PRIMARY KEY (collection, id)
+);
+CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents (collection, created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_category ON documents (collection, category, created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_replaced ON documents (collection, replaced, created_at);
+'''
+
+
+def _utc_iso(value: datetime) -> str:
+    """ISO-8601 in UTC, so timestamps sort correctly as text."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec='microseconds')
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'$date': _utc_iso(value)}
+    raise TypeError(f"Cannot store value of type {type(value).__name__}")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and '$date' in obj:
+        return datetime.fromisoformat(obj['$date'])
+    return obj
+
+
+def _sql_value(value: Any) -> Any:
+    """Convert a Python value to what SQLite stores for it in columns and JSON."""
+    if isinstance(value, datetime):
+        return _utc_iso(value)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_encode)
+    return value
+
+
+def _merge(old: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply an update, treating dotted keys as nested field paths like Firestore."""
+    merged = dict(old)
+    for key, value in data.items():
+        target = merged
+        parts = key.split('.')
+        for part in parts[:-1]:
+            target[part] = dict(target.get(part) or {})
+            target = target[part]
+        target[parts[-1]] = value
+    return merged
+
+
+class SQLiteBackend(StorageBackend):
+    """Storage backend on a local SQLite file.
+
+    Documents are stored as JSON in one table, with `createdAt`, `category`
+    and `replaced` promoted to indexed columns. Filters, ordering and sums
+    compile to SQL. Suited to single-tenant deployments, local development
+    and offline benchmarks; each thread gets its own connection.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = 'luxen.db'):
+        self.path = path
+        self._local = threading.local()
+        # ':memory:' databases are per-connection, so share one across threads
+        self._shared = None
+        if path == ':memory:':
+            self._shared = self._connect(check_same_thread=False)
+            self._shared_lock = threading.RLock()
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=check_same_thread)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._shared is not None:
+            return self._shared
+        conn = getattr(self._local, 'conn', None)
+        # A connection must not be used across fork (e.g. a preloaded gunicorn master)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Exclusive write transaction, so ledger read-modify-writes cannot interleave."""
+        lock = self._shared_lock if self._shared is not None else None
+        if lock:
+            lock.acquire()
+        conn = self.conn
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            if lock:
+                lock.release()
+
+    @staticmethod
+    def _field_expr(field: str, value: Any = None) -> str:
+        """SQL expression reading `field` (a promoted column or a JSON path)."""
+        if field in PROMOTED_COLUMNS:
+            return PROMOTED_COLUMNS[field]
+        if field == 'id':
+            return 'id'
+        if not _FIELD_PATTERN.match(field):
+            raise ValueError(f"Invalid field path '{field}'")
+        # Stored timestamps are tagged objects; compare on their ISO text
+        suffix = '."$date"' if isinstance(value, datetime) else ''
+        return f"json_extract(data, '$.{field}{suffix}')"
+
+    def _where_sql(self, collection: str, where: Filters) -> Tuple[str, List[Any]]:
+        clauses = ['collection = ?']
+        params: List[Any] = [collection]
+        for field, operator, value in where or ():
+            if operator not in OPERATORS:
+                raise ValueError(f"Unsupported operator '{operator}'")
+            if operator in ('array_contains', 'array_contains_any'):
+                if not _FIELD_PATTERN.match(field):
+                    raise ValueError(f"Invalid field path '{field}'")
+                values = value if operator == 'array_contains_any' else [value]
+                marks = ', '.join('?' for _ in values)
+                clauses.append(f"EXISTS (SELECT 1 FROM json_each(documents.data, '$.{field}') "
+                               f"WHERE json_each.value IN ({marks}))")
+                params.extend(_sql_value(v) for v in values)
+                continue
+            sample = value[0] if operator in ('in', 'not-in') and value else value
+            expr = self._field_expr(field, sample)
+            if operator in ('in', 'not-in'):
+                marks = ', '.join('?' for _ in value) or 'NULL'
+                negate = 'NOT ' if operator == 'not-in' else ''
+                clauses.append(f"{expr} IS NOT NULL AND {expr} {negate}IN ({marks})")
+                params.extend(_sql_value(v) for v in value)
+            elif operator == '==' and value is None:
+                clauses.append(f"{expr} IS NULL")
+            elif operator == '!=':
+                clauses.append(f"{expr} IS NOT NULL AND {expr} != ?")
+                params.append(_sql_value(value))
+            else:
+                sql_operator = '=' if operator == '==' else operator
+                clauses.append(f"{expr} {sql_operator} ?")
+                params.append(_sql_value(value))
+        return ' AND '.join(clauses), params
+
+    @staticmethod
+    def _row_to_doc(doc_id: str, data: str, select: Optional[List[str]] = None) -> Dict[str, Any]:
+        doc = json.loads(data, object_hook=_decode)
+        if select is not None:
+            doc = {field: doc[field] for field in select if field in doc}
+        return {**doc, 'id': doc_id}
+
+    def _read(self, conn, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        row = conn.execute('SELECT data FROM documents WHERE collection = ? AND id = ?',
+                           (collection, doc_id)).fetchone()
+        return json.loads(row[0], object_hook=_decode) if row else None
+
+    def _write(self, conn, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        columns = [_sql_value(data.get(field)) for field in PROMOTED_COLUMNS]
+        conn.execute(
+            'INSERT OR REPLACE INTO documents (collection, id, data, created_at, category, replaced) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (collection, doc_id, json.dumps(data, default=_encode), *columns)
+        )
+
+    def _apply_ledger(self, conn, ledger, old: Optional[Dict[str, Any]],
+                      new: Optional[Dict[str, Any]]) -> None:
+        if ledger is None or (old is None and new is None):
+            return
+        self._apply_delta(conn, ledger, ledger.delta(old, new), 1)
+
+    def _apply_delta(self, conn, ledger, delta: Dict[str, Any], writes: int) -> None:
+        shard = ledger.write_shard()
+        totals = self._read(conn, LEDGER_COLLECTION, shard) or {}
+        for key, value in delta.items():
+            totals[key] = totals.get(key, 0) + value
+        totals['version'] = totals.get('version', 0) + writes
+        self._write(conn, LEDGER_COLLECTION, shard, {**totals, **ledger.marker()})
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        data = self._read(self.conn, collection, doc_id)
+        return {**data, 'id': doc_id} if data is not None else None
+
+    def stream(self, collection: str, where: Filters = None, order_by: Optional[str] = None,
+               select: Optional[List[str]] = None,
+               page_size: int = DEFAULT_PAGE_SIZE, descending: bool = False,
+               limit: Optional[int] = None, start_after: Cursor = None) -> Iterator[Dict[str, Any]]:
+        clause, params = self._where_sql(collection, where)
+        direction, after = ('DESC', '<') if descending else ('ASC', '>')
+        if order_by:
+            value = start_after.get(order_by) if start_after is not None else None
+            expr = self._field_expr(order_by, value)
+            clause += f" AND {expr} IS NOT NULL"
+            if start_after is not None:
+                clause += f" AND ({expr} {after} ? OR ({expr} = ? AND id {after} ?))"
+                params.extend([_sql_value(value), _sql_value(value), start_after['id']])
+            clause += f" ORDER BY {expr} {direction}, id {direction}"
+        else:
+            if start_after is not None:
+                clause += f" AND id {after} ?"
+                params.append(start_after['id'])
+            clause += f" ORDER BY id {direction}"
+        if limit is not None:
+            clause += ' LIMIT ?'
+            params.append(limit)
+        cursor = self.conn.execute(f'SELECT id, data FROM documents WHERE {clause}', params)
+        while True:
+            rows = cursor.fetchmany(page_size)
+            for doc_id, data in rows:
+                yield self._row_to_doc(doc_id, data, select)
+            if len(rows) < page_size:
+                return
+
+    def aggregate(self, collection: str, sum_fields: List[str],
+                  where: Filters = None) -> Dict[str, Any]:
+        """Count and sum in SQL; non-numeric values count as 0 like Firestore."""
+        clause, params = self._where_sql(collection, where)
+        sums = [
+            f"COALESCE(SUM(CASE WHEN typeof({expr}) IN ('integer', 'real') THEN {expr} ELSE 0 END), 0)"
+            for expr in (self._field_expr(field) for field in sum_fields)
+        ]
+        row = self.conn.execute(
+            f"SELECT {', '.join(['COUNT(*)'] + sums)} FROM documents WHERE {clause}", params
+        ).fetchone()
+        return {'count': row[0], **dict(zip(sum_fields, row[1:]))}
+
+    def add(self, collection: str, data: Dict[str, Any], ledger=None) -> str:
+        doc_id = uuid.uuid4().hex[:20]
+        self.set(collection, doc_id, data, ledger)
+        return doc_id
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any], ledger=None) -> None:
+        with self._transaction() as conn:
+            old = self._read(conn, collection, doc_id) if ledger else None
+            self._write(conn, collection, doc_id, data)
+            self._apply_ledger(conn, ledger, old, data)
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any], ledger=None) -> None:
+        with self._transaction() as conn:
+            old = self._read(conn, collection, doc_id)
+            if old is None:
+                raise DocumentNotFound(f"Document {doc_id} not found in {collection}")
+            new = _merge(old, data)
+            self._write(conn, collection, doc_id, new)
+            self._apply_ledger(conn, ledger, old, new)
+
+    def delete(self, collection: str, doc_id: str, ledger=None) -> None:
+        with self._transaction() as conn:
+            old = self._read(conn, collection, doc_id)
+            if old is None:
+                return
+            conn.execute('DELETE FROM documents WHERE collection = ? AND id = ?', (collection, doc_id))
+            self._apply_ledger(conn, ledger, old, None)
+
+    def write_batch(self, collection: str, writes: BatchWrites, ledger=None,
+                    created: CreatedFields = None) -> List[str]:
+        """Write every document and the combined ledger delta in one transaction."""
+        ids = []
+        changes = []
+        with self._transaction() as conn:
+            for doc_id, data in writes:
+                doc_id = doc_id or uuid.uuid4().hex[:20]
+                old = self._read(conn, collection, doc_id) if ledger is not None or created else None
+                apply_created(data, old, created)
+                self._write(conn, collection, doc_id, data)
+                changes.append((old, data))
+                ids.append(doc_id)
+            if ledger is not None and writes:
+                self._apply_delta(conn, ledger, ledger.batch_delta(changes), len(writes))
+        return ids
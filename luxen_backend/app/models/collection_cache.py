@@ -0,0 +1,225 @@
+from typing import Dict, Any, List, Optional, Tuple
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Caching is opt-in; every setting can be overridden per deployment
+CACHE_ENABLED = os.getenv('FIRESTORE_CACHE', 'false').lower() in ('1', 'true', 'yes')
+CACHE_TTL_SECONDS = float(os.getenv('FIRESTORE_CACHE_TTL', 300))
+CACHE_MAX_DOCUMENTS = int(os.getenv('FIRESTORE_CACHE_MAX_DOCS', 50000))
+CACHE_USE_LISTENERS = os.getenv('FIRESTORE_CACHE_LISTENERS', 'true').lower() in ('1', 'true', 'yes')
+# How long the first read waits for a listener's initial snapshot
+LISTENER_READY_TIMEOUT = float(os.getenv('FIRESTORE_CACHE_LISTENER_TIMEOUT', 10))
+
+_caches: Dict[str, 'CollectionCache'] = {}
+_caches_lock = threading.Lock()
+
+
+class CollectionCache:
+    """In-memory mirror of one collection, shared by every model in the process.
+
+    The mirror is populated once, then kept current by the backend's change
+    listener (`on_snapshot` on Firestore). If the listener cannot be started
+    or dies, the mirror is reloaded after `ttl` seconds instead. Collections
+    larger than `max_documents` are not mirrored; reads for them always miss.
+    """
+
+    def __init__(self, backend, collection_name: str, ttl: float = CACHE_TTL_SECONDS,
+                 max_documents: int = CACHE_MAX_DOCUMENTS, use_listener: bool = CACHE_USE_LISTENERS):
+        self.backend = backend
+        self.collection_name = collection_name
+        self.ttl = ttl
+        self.max_documents = max_documents
+        self.use_listener = use_listener
+        self.hits = 0
+        self.misses = 0
+        self.oversized = False
+        self._docs: Optional[Dict[str, Dict[str, Any]]] = None
+        # Local writes made while `_load` streams the collection, replayed onto its result
+        self._pending: Optional[List[Tuple[str, Optional[Dict[str, Any]], bool]]] = None
+        self._loaded_at = 0.0
+        self._watch = None
+        self._ready = threading.Event()
+        self._lock = threading.RLock()
+        # Serialises (re)loads so concurrent misses start one listener or read
+        self._load_lock = threading.Lock()
+
+    @property
+    def listening(self) -> bool:
+        """True while a snapshot listener keeps the mirror current."""
+        return self._watch is not None and self._watch.is_active
+
+    def _check_size(self):
+        if self._docs is not None and len(self._docs) > self.max_documents:
+            logger.warning(f"Cache for {self.collection_name} exceeds "
+                           f"{self.max_documents} documents, disabling")
+            # A listener is stopped by the next reader, not from its own thread
+            self.oversized = True
+            self._docs = None
+
+    def _on_reset(self, docs: Dict[str, Dict[str, Any]]):
+        """Replace the mirror with the listener's full snapshot."""
+        with self._lock:
+            if self.oversized:
+                return
+            self._docs = docs
+            self._loaded_at = time.monotonic()
+            self._check_size()
+            self._ready.set()
+
+    def _on_change(self, doc_id: str, data: Optional[Dict[str, Any]]):
+        """Apply one listener change to the mirror."""
+        with self._lock:
+            if self.oversized or self._docs is None:
+                return
+            if data is None:
+                self._docs.pop(doc_id, None)
+            else:
+                self._docs[doc_id] = data
+            self._check_size()
+
+    def _stop_listener(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def _start_listener(self) -> bool:
+        """Start the snapshot listener and wait for the initial snapshot."""
+        try:
+            self._ready.clear()
+            self._watch = self.backend.watch(self.collection_name, self._on_reset, self._on_change)
+            if self._watch is None:
+                logger.info(f"Backend cannot push changes for {self.collection_name}, using TTL expiry")
+            elif self._ready.wait(LISTENER_READY_TIMEOUT):
+                return True
+            else:
+                logger.warning(f"Listener for {self.collection_name} not ready, using TTL expiry")
+        except Exception as e:
+            logger.warning(f"Listener unavailable for {self.collection_name}, using TTL expiry: {str(e)}")
+        self._stop_listener()
+        self.use_listener = False
+        return False
+
+    def _load(self):
+        """Populate the mirror with a one-off read of the whole collection.
+        
+        The collection is streamed without holding the lock, so writes and
+        stats are not blocked meanwhile; local writes made during the stream
+        are replayed onto its result before it replaces the mirror.
+        """
+        with self._lock:
+            self._pending = []
+        docs = {}
+        try:
+            for doc in self.backend.stream(self.collection_name):
+                docs[doc.pop('id')] = doc
+                if len(docs) > self.max_documents:
+                    break
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            for doc_id, data, merge in self._pending:
+                self._apply_to(docs, doc_id, data, merge)
+            self._pending = None
+            self._docs = docs
+            self._loaded_at = time.monotonic()
+            self._check_size()
+
+    def _is_fresh(self) -> bool:
+        if self.listening:
+            return self._docs is not None
+        return self._docs is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def _mirror(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Return the mirror, counting a hit or (re)loading it on a miss.
+        
+        Returns None, counted as a miss, when the collection is not cacheable.
+        """
+        with self._lock:
+            if not self.oversized and self._is_fresh():
+                self.hits += 1
+                return self._docs
+            self.misses += 1
+        # The listener thread needs the lock to deliver the initial snapshot
+        with self._load_lock:
+            with self._lock:
+                if self.oversized:
+                    self._stop_listener()
+                    return None
+                if self._is_fresh():
+                    return self._docs
+                # A listener that died leaves the mirror to TTL expiry
+                self._stop_listener()
+            if self.use_listener and self._start_listener():
+                return self._docs
+            self._load()
+            with self._lock:
+                return self._docs
+
+    def documents(self) -> Optional[List[Dict[str, Any]]]:
+        """All documents as `{**data, 'id': id}` copies, or None if not cacheable."""
+        docs = self._mirror()
+        if docs is None:
+            return None
+        with self._lock:
+            return [{**data, 'id': doc_id} for doc_id, data in docs.items()]
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """A single document copy; raises KeyError if not cacheable, None if absent."""
+        docs = self._mirror()
+        if docs is None:
+            raise KeyError(doc_id)
+        with self._lock:
+            data = docs.get(doc_id)
+            return {**data, 'id': doc_id} if data is not None else None
+
+    @staticmethod
+    def _apply_to(docs: Dict[str, Dict[str, Any]], doc_id: str, data: Optional[Dict[str, Any]], merge: bool):
+        if data is None:
+            docs.pop(doc_id, None)
+        elif merge:
+            if doc_id in docs:
+                docs[doc_id] = {**docs[doc_id], **data}
+        else:
+            docs[doc_id] = dict(data)
+
+    def apply(self, doc_id: str, data: Optional[Dict[str, Any]], merge: bool = False):
+        """Reflect a local write in the mirror (None deletes)."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((doc_id, dict(data) if data is not None else None, merge))
+            if self._docs is not None:
+                self._apply_to(self._docs, doc_id, data, merge)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and state for monitoring."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._docs) if self._docs is not None else 0,
+                'listening': self.listening,
+                'oversized': self.oversized,
+            }
+
+
+def get_cache(backend, collection_name: str) -> Optional[CollectionCache]:
+    """Shared cache for a collection, or None when caching is disabled."""
+    if not CACHE_ENABLED:
+        return None
+    with _caches_lock:
+        if collection_name not in _caches:
+            _caches[collection_name] = CollectionCache(backend, collection_name)
+        return _caches[collection_name]
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats for every collection cache created in this process."""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {name: cache.stats() for name, cache in caches.items()}
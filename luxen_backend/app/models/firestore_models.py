@@ -1,72 +1,263 @@
-from config.firebase_config import get_db
+from app.models.backends import get_backend, Filters, Cursor, DEFAULT_PAGE_SIZE
+from app.models.backends.base import MAX_BATCH_WRITES, CreatedFields, sort_documents, sum_documents
+from app.models.backends.instrumented import InstrumentedBackend
+from app.models.collection_cache import get_cache
+from app.models.ledger import AggregateLedger
+from app.models.query import Query, ASCENDING, DESCENDING
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from itertools import islice
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+import contextvars
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Batches committed concurrently by add_many/upsert_many
+BULK_WRITE_WORKERS = int(os.getenv('BULK_WRITE_WORKERS', 4))
+
+# Per collection: callbacks run after each successful write through a model
+WriteListener = Callable[[str, Optional[Dict[str, Any]], bool], None]
+_write_listeners: Dict[str, List[WriteListener]] = {}
+
+
+def add_write_listener(collection_name: str, listener: WriteListener):
+    """Call `listener(doc_id, data, merge)` after every write to a collection.
+
+    `data` is None for deletes; with `merge` True it holds only the updated
+    fields. Writes made outside the models (the web app) are not seen.
+    """
+    _write_listeners.setdefault(collection_name, []).append(listener)
+
+
+def remove_write_listener(collection_name: str, listener: WriteListener):
+    """Stop calling a listener added with `add_write_listener`."""
+    listeners = _write_listeners.get(collection_name, [])
+    if listener in listeners:
+        listeners.remove(listener)
+
+
+def _from_mirror(docs: List[Dict[str, Any]], order_by: Optional[str], select: Optional[List[str]],
+                 descending: bool = False, start_after: Cursor = None) -> Iterator[Dict[str, Any]]:
+    """Order and project cached documents the way a Firestore query would."""
+    for doc in sort_documents(docs, order_by, descending, start_after):
+        if select is not None:
+            doc = {**{field: doc[field] for field in select if field in doc}, 'id': doc['id']}
+        yield doc
+
 
 class FirestoreModel:
-    """Base Firestore model class."""
+    """Base model class for a collection in the configured storage backend."""
+    
+    # Numeric fields summed, and boolean fields counted, in the aggregate ledger.
+    # Models declaring neither keep no ledger.
+    ledger_sum_fields: Tuple[str, ...] = ()
+    ledger_flag_fields: Tuple[str, ...] = ()
+    # Field whose values the sum fields are also totalled per (e.g. expense category)
+    ledger_group_field: Optional[str] = None
+    # Whether reads may be served from the in-process collection cache
+    cacheable = True
     
     def __init__(self, collection_name: str):
         self.collection_name = collection_name
-        self.db = get_db()
+        # Reads, writes and time are recorded per collection for /metrics
+        self.backend = InstrumentedBackend(get_backend())
+        self.cache = get_cache(self.backend, collection_name) if self.cacheable else None
+        self.ledger = None
+        if self.ledger_sum_fields or self.ledger_flag_fields:
+            self.ledger = AggregateLedger(self)
     
     def add(self, data: Dict[str, Any], doc_id: Optional[str] = None) -> str:
         """Add a document to the collection."""
         try:
             data['createdAt'] = datetime.utcnow()
             if doc_id:
-                self.db.collection(self.collection_name).document(doc_id).set(data)
-                return doc_id
+                self.backend.set(self.collection_name, doc_id, data, ledger=self.ledger)
             else:
-                _, doc_ref = self.db.collection(self.collection_name).add(data)
-                return doc_ref.id
+                doc_id = self.backend.add(self.collection_name, data, ledger=self.ledger)
+            self._applied(doc_id, data)
+            return doc_id
         except Exception as e:
             logger.error(f"Error adding document to {self.collection_name}: {str(e)}")
             raise
     
+    def _applied(self, doc_id: str, data: Optional[Dict[str, Any]], merge: bool = False):
+        """Reflect a completed write in the cache and notify write listeners."""
+        if self.cache:
+            self.cache.apply(doc_id, data, merge=merge)
+        if self.ledger:
+            self.ledger.written()
+        for listener in _write_listeners.get(self.collection_name, ()):
+            try:
+                listener(doc_id, data, merge)
+            except Exception as e:
+                logger.error(f"Write listener failed for {self.collection_name}/{doc_id}: {str(e)}")
+    
+    def _commit_batch(self, writes: List[Tuple[Optional[str], Dict[str, Any]]],
+                      created: CreatedFields = None) -> List[str]:
+        ids = self.backend.write_batch(self.collection_name, writes, ledger=self.ledger, created=created)
+        for doc_id, (_, data) in zip(ids, writes):
+            self._applied(doc_id, data)
+        return ids
+    
+    def _write_many(self, writes: Iterable[Tuple[Optional[str], Dict[str, Any]]],
+                    batch_size: int, max_workers: int, created: CreatedFields = None) -> List[str]:
+        """Commit writes in batches, at most `max_workers` at a time.
+        
+        The input is consumed lazily; only a bounded number of batches is
+        held in memory. Each batch is atomic; if one fails, batches already
+        committed stay written and the error is raised. `created` fields
+        are set only on documents a write creates.
+        """
+        # The ledger update is one of the batch's writes
+        batch_size = max(1, min(batch_size, MAX_BATCH_WRITES - (1 if self.ledger else 0)))
+        writes = iter(writes)
+        ids: List[str] = []
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bulk-write') as executor:
+            while True:
+                batch = list(islice(writes, batch_size))
+                if not batch:
+                    break
+                if len(pending) >= max_workers * 2:
+                    ids.extend(pending.popleft().result())
+                # Each batch runs in a copy of the caller's context, for request metrics
+                pending.append(executor.submit(contextvars.copy_context().run, self._commit_batch, batch, created))
+            while pending:
+                ids.extend(pending.popleft().result())
+        return ids
+    
+    def add_many(self, docs: Iterable[Dict[str, Any]], batch_size: int = MAX_BATCH_WRITES,
+                 max_workers: int = BULK_WRITE_WORKERS) -> List[str]:
+        """Add documents with generated IDs in concurrent batches; returns the IDs.
+        
+        Documents keep their own `createdAt` (e.g. imported history); the
+        rest share one timestamp.
+        """
+        try:
+            created_at = datetime.utcnow()
+            
+            def writes():
+                for data in docs:
+                    data.setdefault('createdAt', created_at)
+                    yield None, data
+            
+            return self._write_many(writes(), batch_size, max_workers)
+        except Exception as e:
+            logger.error(f"Error adding documents to {self.collection_name}: {str(e)}")
+            raise
+    
+    def upsert_many(self, docs: Iterable[Dict[str, Any]], id_field: str = 'id',
+                    batch_size: int = MAX_BATCH_WRITES, max_workers: int = BULK_WRITE_WORKERS) -> List[str]:
+        """Create or replace documents keyed by their `id_field`, in concurrent batches.
+        
+        Documents without an ID get a generated one. Replaced documents
+        keep their `createdAt`, so re-importing the same rows changes nothing.
+        """
+        try:
+            now = datetime.utcnow()
+            
+            def writes():
+                for data in docs:
+                    doc_id = data.pop(id_field, None)
+                    data['updatedAt'] = now
+                    yield (str(doc_id) if doc_id not in (None, '') else None), data
+            
+            return self._write_many(writes(), batch_size, max_workers, created={'createdAt': now})
+        except Exception as e:
+            logger.error(f"Error upserting documents in {self.collection_name}: {str(e)}")
+            raise
+    
     def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Get a single document."""
         try:
-            doc = self.db.collection(self.collection_name).document(doc_id).get()
-            if doc.exists:
-                return {**doc.to_dict(), 'id': doc.id}
-            return None
+            if self.cache:
+                try:
+                    return self.cache.get(doc_id)
+                except KeyError:
+                    pass
+            return self.backend.get(self.collection_name, doc_id)
         except Exception as e:
             logger.error(f"Error getting document from {self.collection_name}: {str(e)}")
             raise
     
-    def get_all(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all documents from the collection."""
+    def iter_all(self, page_size: int = DEFAULT_PAGE_SIZE,
+                 order_by: Optional[str] = 'createdAt', where: Filters = None,
+                 select: Optional[List[str]] = None, descending: bool = False,
+                 limit: Optional[int] = None, start_after: Cursor = None) -> Iterator[Dict[str, Any]]:
+        """Stream every document, fetching `page_size` at a time.
+        
+        Only one page is held in memory. Documents missing the `order_by`
+        field are skipped; pass `order_by=None` to stream in document-ID
+        order, which includes every document. `select` projects each
+        document down to the listed fields. See `where` for composing
+        validated queries.
+        """
+        if where is None and self.cache:
+            docs = self.cache.documents()
+            if docs is not None:
+                yield from islice(_from_mirror(docs, order_by, select, descending, start_after), limit)
+                return
         try:
-            docs = self.db.collection(self.collection_name).limit(limit).stream()
-            return [{**doc.to_dict(), 'id': doc.id} for doc in docs]
+            yield from self.backend.stream(self.collection_name, where=where, order_by=order_by,
+                                           select=select, page_size=page_size, descending=descending,
+                                           limit=limit, start_after=start_after)
         except Exception as e:
-            logger.error(f"Error getting documents from {self.collection_name}: {str(e)}")
+            logger.error(f"Error streaming documents from {self.collection_name}: {str(e)}")
             raise
     
+    def aggregate(self, sum_fields: Iterable[str] = (), where: Filters = None) -> Dict[str, Any]:
+        """Count matching documents and sum numeric fields in the backend.
+        
+        Returns {'count': n, <field>: total, ...}; non-numeric values count as 0.
+        """
+        sum_fields = list(sum_fields)
+        if where is None and self.cache:
+            docs = self.cache.documents()
+            if docs is not None:
+                return sum_documents(docs, sum_fields)
+        try:
+            return self.backend.aggregate(self.collection_name, sum_fields, where=where)
+        except Exception as e:
+            logger.error(f"Error aggregating {self.collection_name}: {str(e)}")
+            raise
+    
+    def sum_field(self, field: str, where: Filters = None) -> float:
+        """Sum a numeric field over the matching documents."""
+        return self.aggregate([field], where)[field]
+    
+    def count(self, where: Filters = None) -> int:
+        """Count the matching documents."""
+        return self.aggregate([], where)['count']
+    
+    def get_all(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get all documents from the collection (or the first `limit`)."""
+        return list(islice(self.iter_all(), limit))
+    
+    def where(self, field: str, operator: str, value: Any) -> Query:
+        """Start a query on this collection with one condition.
+        
+        Chain more `where`, `order_by`, `limit`, `start_after` and `select`
+        calls, then `get()` or `stream()`. Raises `InvalidQuery` for
+        unsupported operators or combinations.
+        """
+        return Query(self).where(field, operator, value)
+    
+    def order_by(self, field: str, direction: str = ASCENDING) -> Query:
+        """Start a query on this collection ordered by one field."""
+        return Query(self).order_by(field, direction)
+    
+    def created_between(self, start: datetime, end: datetime, direction: str = DESCENDING) -> Query:
+        """Documents created in [start, end), newest first unless `direction` is ASCENDING."""
+        return (Query(self).where('createdAt', '>=', start).where('createdAt', '<', end)
+                .order_by('createdAt', direction))
+    
     def query(self, field: str, operator: str, value: Any) -> List[Dict[str, Any]]:
         """Query documents with a condition."""
         try:
-            query = self.db.collection(self.collection_name)
-            
-            if operator == '==':
-                query = query.where(field, '==', value)
-            elif operator == '<':
-                query = query.where(field, '<', value)
-            elif operator == '<=':
-                query = query.where(field, '<=', value)
-            elif operator == '>':
-                query = query.where(field, '>', value)
-            elif operator == '>=':
-                query = query.where(field, '>=', value)
-            elif operator == '!=':
-                query = query.where(field, '!=', value)
-            
-            docs = query.stream()
-            return [{**doc.to_dict(), 'id': doc.id} for doc in docs]
+            return self.where(field, operator, value).get()
         except Exception as e:
             logger.error(f"Error querying {self.collection_name}: {str(e)}")
             raise
@@ -75,7 +266,8 @@ class FirestoreModel:
         """Update a document."""
         try:
             data['updatedAt'] = datetime.utcnow()
-            self.db.collection(self.collection_name).document(doc_id).update(data)
+            self.backend.update(self.collection_name, doc_id, data, ledger=self.ledger)
+            self._applied(doc_id, data, merge=True)
             return True
         except Exception as e:
             logger.error(f"Error updating document in {self.collection_name}: {str(e)}")
@@ -84,7 +276,8 @@ class FirestoreModel:
     def delete(self, doc_id: str) -> bool:
         """Delete a document."""
         try:
-            self.db.collection(self.collection_name).document(doc_id).delete()
+            self.backend.delete(self.collection_name, doc_id, ledger=self.ledger)
+            self._applied(doc_id, None)
             return True
         except Exception as e:
             logger.error(f"Error deleting document from {self.collection_name}: {str(e)}")
@@ -94,6 +287,8 @@ class FirestoreModel:
 class OwnerModel(FirestoreModel):
     """Owner model for managing owner data."""
     
+    ledger_sum_fields = ('investmentAmount',)
+    
     def __init__(self):
         super().__init__('owners')
     
@@ -105,6 +300,8 @@ class OwnerModel(FirestoreModel):
 class ProductionModel(FirestoreModel):
     """Production model for managing production batches."""
     
+    ledger_sum_fields = ('totalCost',)
+    
     def __init__(self):
         super().__init__('production')
     
@@ -116,6 +313,8 @@ class ProductionModel(FirestoreModel):
 class SalesModel(FirestoreModel):
     """Sales model for managing sales transactions."""
     
+    ledger_sum_fields = ('totalAmount',)
+    
     def __init__(self):
         super().__init__('sales')
     
@@ -127,6 +326,9 @@ class SalesModel(FirestoreModel):
 class ExpenseModel(FirestoreModel):
     """Expense model for managing expenses."""
     
+    ledger_sum_fields = ('amount',)
+    ledger_group_field = 'category'
+    
     def __init__(self):
         super().__init__('expenses')
     
@@ -137,11 +339,21 @@ class ExpenseModel(FirestoreModel):
     def get_by_category(self, category: str) -> List[Dict[str, Any]]:
         """Get expenses by category."""
         return self.query('category', '==', category)
+    
+    def between(self, start: datetime, end: datetime, category: Optional[str] = None) -> Query:
+        """Expenses created in [start, end), newest first, optionally for one category.
+        
+        Served by the (category, createdAt DESC) composite index.
+        """
+        query = self.created_between(start, end)
+        return query.where('category', '==', category) if category is not None else query
 
 
 class WarrantyModel(FirestoreModel):
     """Warranty model for managing warranty claims."""
     
+    ledger_flag_fields = ('replaced',)
+    
     def __init__(self):
         super().__init__('warranty')
     
@@ -159,4 +371,61 @@ class ReportModel(FirestoreModel):
     def get_all_reports(self) -> List[Dict[str, Any]]:
         """Get all reports."""
         return self.get_all()
+    
+    @staticmethod
+    def report_id(year: int, month: int) -> str:
+        """Document ID of a monthly report, e.g. `rep_2024_01`."""
+        return f"rep_{year}_{month:02d}"
+    
+    def get_month(self, year: int, month: int) -> Optional[Dict[str, Any]]:
+        """Get the stored report for a month."""
+        return self.get(self.report_id(year, month))
+    
+    def save_month(self, year: int, month: int, report: Dict[str, Any]) -> str:
+        """Create or replace the stored report for a month."""
+        doc_id = self.report_id(year, month)
+        try:
+            self.backend.set(self.collection_name, doc_id, report)
+            self._applied(doc_id, report)
+            return doc_id
+        except Exception as e:
+            logger.error(f"Error saving report {doc_id}: {str(e)}")
+            raise
+
+
 
+class JobModel(FirestoreModel):
+    """Job table: the last run of each background job, keyed by job key."""
+    
+    # Read across processes to see who is running what; never cached
+    cacheable = False
+    
+    def __init__(self):
+        super().__init__('jobs')
+    
+    def record(self, key: str, job: Dict[str, Any]) -> None:
+        """Create or replace the record of a job."""
+        try:
+            self.backend.set(self.collection_name, key, job)
+            self._applied(key, job)
+        except Exception as e:
+            logger.error(f"Error recording job {key}: {str(e)}")
+            raise
+
+
+class MaterializedModel(FirestoreModel):
+    """Precomputed results served by the API, one document per job key."""
+    
+    cacheable = False
+    
+    def __init__(self):
+        super().__init__('materialized')
+    
+    def save(self, key: str, doc: Dict[str, Any]) -> None:
+        """Create or replace the materialized result of a job."""
+        try:
+            self.backend.set(self.collection_name, key, doc)
+            self._applied(key, doc)
+        except Exception as e:
+            logger.error(f"Error saving materialized result {key}: {str(e)}")
+            raise
@@ -0,0 +1,406 @@
+from app.models.backends.base import numeric_value
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import os
+import random
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Collection holding the running-totals documents of each business collection
+LEDGER_COLLECTION = 'aggregates'
+# Shard documents a ledger's writes are spread over, until `set_shards` changes it
+LEDGER_SHARDS = max(1, int(os.getenv('LEDGER_SHARDS', 1)))
+# Seconds a process trusts the shard count it read (raising it takes effect within this)
+LEDGER_SHARD_COUNT_TTL = float(os.getenv('LEDGER_SHARD_COUNT_TTL', 60))
+# Seconds the summed totals of a sharded ledger are reused by reads in this process
+LEDGER_READ_CACHE_SECONDS = float(os.getenv('LEDGER_READ_CACHE_SECONDS', 1))
+# Seconds a rebuilt ledger is trusted; older ones are rebuilt in the background after
+# the next read, which picks up writes the backend never saw (the web app writes to
+# Firestore directly). 0 trusts ledgers until the next manual rebuild
+LEDGER_MAX_AGE_SECONDS = float(os.getenv('LEDGER_MAX_AGE_SECONDS', 300))
+# Seconds an expired ledger's rebuild is left to the process that started it
+LEDGER_REBUILD_LEASE_SECONDS = float(os.getenv('LEDGER_REBUILD_LEASE_SECONDS', 120))
+# Bookkeeping fields of ledger documents, not totals
+SHARD_FIELDS = ('ledger', 'shards', 'shardsUsed', 'rebuildingSince', 'rebuildingBy')
+
+# Per collection: (expires, shard count, shards recorded as used) and (expires, summed ledger)
+_shard_counts: Dict[str, Tuple[float, int, int]] = {}
+_summed: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_shards_lock = threading.Lock()
+# Per collection: the thread of this process rebuilding its expired ledger
+_rebuilds: Dict[str, threading.Thread] = {}
+
+
+def _utc(value: Any) -> Optional[datetime]:
+    """A stored timestamp as a naive UTC datetime (backends differ in tz handling)."""
+    if not isinstance(value, datetime):
+        return None
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+class AggregateLedger:
+    """Running totals for one collection, stored in `aggregates/{collection}`.
+
+    The ledger document holds `count`, one field per summed numeric field
+    (e.g. `totalAmount`), one `<flag>Count` field per boolean flag (e.g.
+    `replacedCount`), one `<field>:<group>` field per value of the group
+    field (e.g. `amount:Packaging`) and a `version` counter bumped on every
+    write. The storage backend applies deltas in the same transaction as
+    the document write. Writes made outside the backend (the web app writes
+    to Firestore directly) are not seen, so a ledger is only trusted for
+    LEDGER_MAX_AGE_SECONDS after its last `rebuild`; the first read after
+    that starts a rebuild in the background.
+
+    Firestore sustains about one write per second on a document, so a busy
+    ledger can be split into shards: `aggregates/{collection}` (shard 0)
+    and `aggregates/{collection}.{n}`. Each write increments one shard at
+    random and reads sum them. The shard count lives on the root document
+    as `shards` (default LEDGER_SHARDS) and can be raised (or lowered)
+    while the app runs; `shardsUsed` records the most ever used, so no
+    shard is left out of the sum. A process writing to more shards than
+    the root records raises `shardsUsed` after its first such write.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.backend = model.backend
+        self.collection_name = model.collection_name
+        self.sum_fields = tuple(model.ledger_sum_fields)
+        self.flag_fields = tuple(model.ledger_flag_fields)
+        self.group_field = model.ledger_group_field
+
+    @staticmethod
+    def flag_key(field: str) -> str:
+        """Ledger field name counting documents where `field` is true."""
+        return f"{field}Count"
+
+    @staticmethod
+    def group_key(field: str, group: str) -> str:
+        """Ledger field name summing `field` over documents in `group`."""
+        return f"{field}:{group}"
+
+    @staticmethod
+    def groups(totals: Dict[str, Any], field: str) -> Dict[str, Any]:
+        """{group: total} of `field` from ledger values (empty groups omitted)."""
+        prefix = f"{field}:"
+        return {key[len(prefix):]: value for key, value in totals.items()
+                if key.startswith(prefix) and value}
+
+    def _group(self, doc: Dict[str, Any]) -> Optional[str]:
+        group = doc.get(self.group_field) if self.group_field else None
+        return str(group) if group is not None else None
+
+    def delta(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Compute the ledger change for replacing `old` with `new` (None = absent)."""
+        old = old or {}
+        new = new or {}
+        changes = {'count': (1 if new else 0) - (1 if old else 0)}
+        for field in self.sum_fields:
+            changes[field] = numeric_value(new.get(field)) - numeric_value(old.get(field))
+        for field in self.flag_fields:
+            changes[self.flag_key(field)] = int(bool(new.get(field))) - int(bool(old.get(field)))
+        if self.group_field:
+            old_group, new_group = self._group(old), self._group(new)
+            for field in self.sum_fields:
+                if old_group is not None:
+                    key = self.group_key(field, old_group)
+                    changes[key] = changes.get(key, 0) - numeric_value(old.get(field))
+                if new_group is not None:
+                    key = self.group_key(field, new_group)
+                    changes[key] = changes.get(key, 0) + numeric_value(new.get(field))
+        return {key: value for key, value in changes.items() if value}
+
+    def batch_delta(self, changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> Dict[str, Any]:
+        """Combined ledger change for several (old, new) replacements."""
+        total: Dict[str, Any] = {}
+        for old, new in changes:
+            for key, value in self.delta(old, new).items():
+                total[key] = total.get(key, 0) + value
+        return {key: value for key, value in total.items() if value}
+
+    def empty(self) -> Dict[str, Any]:
+        """Ledger values for an empty collection."""
+        totals = {'count': 0}
+        totals.update({field: 0 for field in self.sum_fields})
+        totals.update({self.flag_key(field): 0 for field in self.flag_fields})
+        return totals
+
+    def compute(self, groups: bool = True) -> Dict[str, Any]:
+        """Compute the ledger values with aggregation queries over the collection.
+
+        Group totals have no aggregation query: with `groups` the collection
+        is streamed (projected) for them.
+        """
+        totals = {**self.empty(), **self.model.aggregate(self.sum_fields)}
+        for field in self.flag_fields:
+            totals[self.flag_key(field)] = self.model.count(where=[(field, '==', True)])
+        if groups and self.group_field:
+            select = [self.group_field, *self.sum_fields]
+            for doc in self.model.iter_all(order_by=None, select=select):
+                group = self._group(doc)
+                if group is None:
+                    continue
+                for field in self.sum_fields:
+                    key = self.group_key(field, group)
+                    totals[key] = totals.get(key, 0) + numeric_value(doc.get(field))
+        return totals
+
+    # ---- shards ------------------------------------------------------
+
+    def shard_id(self, index: int) -> str:
+        """Document ID of shard `index` in LEDGER_COLLECTION."""
+        return self.collection_name if index == 0 else f"{self.collection_name}.{index}"
+
+    def shard_count(self) -> int:
+        """Shards writes are spread over (re-read every LEDGER_SHARD_COUNT_TTL)."""
+        now = time.monotonic()
+        with _shards_lock:
+            cached = _shard_counts.get(self.collection_name)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        root = self.backend.get(LEDGER_COLLECTION, self.collection_name) or {}
+        return self._remember_count(root)
+
+    def _remember_count(self, root: Dict[str, Any]) -> int:
+        shards = max(1, int(root.get('shards') or LEDGER_SHARDS))
+        used = int(root.get('shardsUsed') or 1)
+        with _shards_lock:
+            _shard_counts[self.collection_name] = (time.monotonic() + LEDGER_SHARD_COUNT_TTL, shards, used)
+        return shards
+
+    @staticmethod
+    def _fan_out(root: Dict[str, Any]) -> int:
+        """Upper bound on the shards that may hold values, for reads and rebuilds."""
+        return max(LEDGER_SHARDS, int(root.get('shards') or 1), int(root.get('shardsUsed') or 1))
+
+    def write_shard(self) -> str:
+        """Document ID for the next write's ledger delta: a random shard."""
+        return self.shard_id(random.randrange(self.shard_count()))
+
+    def marker(self) -> Dict[str, Any]:
+        """Fields every ledger write sets, so its shard is found when summing."""
+        return {'ledger': self.collection_name}
+
+    def _shards(self) -> List[Dict[str, Any]]:
+        """Every shard document except the root."""
+        return [doc for doc in self.backend.stream(LEDGER_COLLECTION, where=[('ledger', '==', self.collection_name)])
+                if doc['id'] != self.collection_name]
+
+    def invalidate(self):
+        """Drop this process's summed totals (after a local write)."""
+        with _shards_lock:
+            _summed.pop(self.collection_name, None)
+
+    def written(self):
+        """After a local write: drop summed totals and make sure its shard is summed.
+
+        Writes spread over more shards than the root's `shardsUsed` (e.g.
+        LEDGER_SHARDS raised in this process only) raise it, once, so every
+        process includes them in its reads.
+        """
+        self.invalidate()
+        with _shards_lock:
+            cached = _shard_counts.get(self.collection_name)
+        if cached is None or cached[1] <= cached[2]:
+            return
+        try:
+            self._record_used(cached[1])
+        except Exception as e:
+            logger.error(f"Error recording ledger shards for {self.collection_name}: {str(e)}")
+
+    def _record_used(self, shards: int, fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Set `fields` on the root and raise its `shardsUsed` to at least `shards`."""
+        root = self.backend.get(LEDGER_COLLECTION, self.collection_name)
+        used = max(shards, int((root or {}).get('shardsUsed') or 1))
+        fields = {**self.marker(), **(fields or {}), 'shardsUsed': used}
+        if root is None:
+            self.backend.set(LEDGER_COLLECTION, self.collection_name, fields)
+        else:
+            # A field update, so concurrent increments of shard 0 are kept
+            self.backend.update(LEDGER_COLLECTION, self.collection_name, fields)
+        self._remember_count({**(root or {}), **fields})
+        return fields
+
+    def set_shards(self, shards: int) -> int:
+        """Spread future writes over `shards` documents; returns the previous count.
+
+        Existing shards keep their values and are still summed, so the
+        count can change at any time. Other processes follow within
+        LEDGER_SHARD_COUNT_TTL.
+        """
+        if shards < 1:
+            raise ValueError('A ledger needs at least one shard')
+        try:
+            root = self.backend.get(LEDGER_COLLECTION, self.collection_name)
+            previous = max(1, int((root or {}).get('shards') or LEDGER_SHARDS))
+            self._record_used(max(shards, previous), {'shards': shards})
+            self.invalidate()
+            return previous
+        except Exception as e:
+            logger.error(f"Error setting ledger shards for {self.collection_name}: {str(e)}")
+            raise
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        """The ledger with its shards summed, or None if it was never written."""
+        now = time.monotonic()
+        with _shards_lock:
+            cached = _summed.get(self.collection_name)
+        if cached is not None and cached[0] > now:
+            return dict(cached[1])
+        root = self.backend.get(LEDGER_COLLECTION, self.collection_name)
+        self._remember_count(root or {})
+        if self._fan_out(root or {}) <= 1:
+            # Unsharded: one document, read fresh every time
+            return root
+        summed = dict(root or {})
+        shards = self._shards()
+        if root is None and not shards:
+            return None
+        for shard in shards:
+            for key, value in shard.items():
+                if key in SHARD_FIELDS or isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                summed[key] = summed.get(key, 0) + value
+        with _shards_lock:
+            _summed[self.collection_name] = (now + LEDGER_READ_CACHE_SECONDS, summed)
+        return dict(summed)
+
+    # ---- reads -------------------------------------------------------
+
+    @staticmethod
+    def expired(data: Dict[str, Any]) -> bool:
+        """Whether a rebuilt ledger is older than LEDGER_MAX_AGE_SECONDS."""
+        rebuilt_at = _utc(data.get('rebuiltAt'))
+        if LEDGER_MAX_AGE_SECONDS <= 0 or rebuilt_at is None:
+            return False
+        return (datetime.utcnow() - rebuilt_at).total_seconds() >= LEDGER_MAX_AGE_SECONDS
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """Read the ledger (shards summed), or None if it has never been rebuilt."""
+        try:
+            data = self._load()
+            # Increments alone may create the document; only trust rebuilt ledgers
+            if not data or 'rebuiltAt' not in data:
+                return None
+            for key in ('id', *SHARD_FIELDS):
+                data.pop(key, None)
+            return {**self.empty(), **data}
+        except Exception as e:
+            logger.error(f"Error reading ledger for {self.collection_name}: {str(e)}")
+            raise
+
+    def version(self) -> int:
+        """Write counter of the ledger, over all shards (0 if it does not exist)."""
+        data = self._load()
+        return data.get('version', 0) if data else 0
+
+    def stamp(self) -> Optional[str]:
+        """Version and rebuild time of a trusted ledger, or None while totals are aggregated live.
+
+        The rebuild time is part of the stamp, so tags derived from it change
+        when an expired ledger is reconciled, even if its version does not.
+        """
+        data = self._load()
+        if not data or 'rebuiltAt' not in data or self.expired(data):
+            return None
+        return f"{data.get('version', 0)}@{_utc(data['rebuiltAt']).isoformat()}"
+
+    def totals(self) -> Dict[str, Any]:
+        """Return the ledger values, aggregating the collection if no ledger exists.
+
+        An expired ledger's totals are returned as they are while it is
+        rebuilt in the background (see `rebuild_in_background`).
+        """
+        data = self.read()
+        if data is None:
+            logger.warning(f"No aggregate ledger for {self.collection_name}, aggregating collection")
+            # Group totals (expenses by category) need a projected stream of the collection
+            return self.compute()
+        if self.expired(data):
+            self.rebuild_in_background()
+        return data
+
+    def rebuild_in_background(self) -> Optional[threading.Thread]:
+        """Start rebuilding an expired ledger on a daemon thread; None if one is running.
+
+        Only one thread per process rebuilds a ledger, and across processes
+        the rebuild lease on the root document (see `_claim_rebuild`) lets
+        the first one do it.
+        """
+        with _shards_lock:
+            running = _rebuilds.get(self.collection_name)
+            if running is not None and running.is_alive():
+                return None
+            thread = threading.Thread(target=self._rebuild_expired, daemon=True,
+                                      name=f"ledger-rebuild-{self.collection_name}")
+            _rebuilds[self.collection_name] = thread
+            thread.start()
+        return thread
+
+    def _rebuild_expired(self):
+        try:
+            if self._claim_rebuild():
+                logger.info(f"Ledger for {self.collection_name} expired, rebuilding")
+                self.rebuild()
+        except Exception as e:
+            logger.error(f"Background rebuild of ledger for {self.collection_name} failed: {str(e)}")
+
+    def _claim_rebuild(self) -> bool:
+        """Take the rebuild lease on an expired root; False if it is fresh or leased elsewhere.
+
+        The lease is `rebuildingSince`/`rebuildingBy` on the root, which the
+        rebuild overwrites; an abandoned lease lapses after
+        LEDGER_REBUILD_LEASE_SECONDS.
+        """
+        root = self.backend.get(LEDGER_COLLECTION, self.collection_name)
+        if root is None or not self.expired(root):
+            return False
+        since = _utc(root.get('rebuildingSince'))
+        if since is not None and (datetime.utcnow() - since).total_seconds() < LEDGER_REBUILD_LEASE_SECONDS:
+            return False
+        token = uuid.uuid4().hex
+        self.backend.update(LEDGER_COLLECTION, self.collection_name,
+                            {'rebuildingSince': datetime.utcnow(), 'rebuildingBy': token})
+        # Processes that both saw the lease free both write it; only the last writer proceeds
+        root = self.backend.get(LEDGER_COLLECTION, self.collection_name) or {}
+        return root.get('rebuildingBy') == token
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Recompute the ledger from the collection and overwrite the stored totals.
+
+        The totals go to the root document and every other shard is reset
+        to zero in the same batch, whatever `shardsUsed` says; the shard
+        count is kept.
+        """
+        try:
+            totals = self.compute()
+            self.invalidate()
+            previous = self._load() or {}
+            root = {
+                **totals, **self.marker(),
+                **{key: previous[key] for key in ('shards', 'shardsUsed') if key in previous},
+                # The summed version keeps moving forward once the shards are reset
+                'version': previous.get('version', 0) + 1, 'rebuiltAt': datetime.utcnow()
+            }
+            # Emptied shards keep their marker and are summed as zero
+            self.backend.write_batch(LEDGER_COLLECTION, [(self.collection_name, root)] +
+                                     [(shard['id'], self.marker()) for shard in self._shards()])
+            self.invalidate()
+            return totals
+        except Exception as e:
+            logger.error(f"Error rebuilding ledger for {self.collection_name}: {str(e)}")
+            raise
+
+    def drift(self) -> Dict[str, Any]:
+        """Compare stored totals with the collection; returns {field: stored - actual}."""
+        self.invalidate()
+        stored = self.read() or self.empty()
+        actual = self.compute()
+        keys = set(actual) | {key for key, value in stored.items()
+                              if ':' in key and isinstance(value, (int, float)) and value}
+        return {key: stored.get(key, 0) - actual.get(key, 0) for key in keys
+                if stored.get(key, 0) != actual.get(key, 0)}
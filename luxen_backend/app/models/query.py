@@ -0,0 +1,119 @@
+from app.models.backends.base import OPERATORS, DEFAULT_PAGE_SIZE
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+ASCENDING = 'ASCENDING'
+DESCENDING = 'DESCENDING'
+
+# Firestore accepts at most this many values in one in/not-in/array_contains_any filter
+MAX_DISJUNCTION_VALUES = 30
+
+# Operators whose value is a list of alternatives
+LIST_OPERATORS = ('in', 'not-in', 'array_contains_any')
+ARRAY_OPERATORS = ('array_contains', 'array_contains_any')
+
+
+class InvalidQuery(ValueError):
+    """Raised when a query would be rejected by Firestore (or needs a full scan)."""
+
+
+class Query:
+    """Composable, validated query over one model's collection.
+
+    Built like a Firestore query and immutable: every method returns a new
+    query. Filters are AND-ed and run in the backend (so Firestore can use
+    the indexes in `firestore.indexes.json`); invalid combinations raise
+    `InvalidQuery` when they are added rather than falling back to a scan.
+
+        model.where('category', '==', 'Rent').order_by('createdAt', DESCENDING).limit(20).get()
+    """
+
+    def __init__(self, model, filters: Tuple[Tuple[str, str, Any], ...] = (),
+                 order_field: Optional[str] = None, direction: str = ASCENDING,
+                 count: Optional[int] = None, cursor: Optional[Dict[str, Any]] = None,
+                 fields: Optional[Tuple[str, ...]] = None):
+        self.model = model
+        self.filters = filters
+        self.order_field = order_field
+        self.direction = direction
+        self.count = count
+        self.cursor = cursor
+        self.fields = fields
+
+    def _copy(self, **changes) -> 'Query':
+        state = {'filters': self.filters, 'order_field': self.order_field, 'direction': self.direction,
+                 'count': self.count, 'cursor': self.cursor, 'fields': self.fields, **changes}
+        return Query(self.model, **state)
+
+    def where(self, field: str, operator: str, value: Any) -> 'Query':
+        """Add a condition; all conditions must hold."""
+        if not isinstance(field, str) or not field:
+            raise InvalidQuery('Field path must be a non-empty string')
+        if operator not in OPERATORS:
+            raise InvalidQuery(f"Unsupported operator '{operator}'; expected one of {', '.join(OPERATORS)}")
+        if operator in LIST_OPERATORS:
+            if not isinstance(value, (list, tuple)) or not value:
+                raise InvalidQuery(f"'{operator}' needs a non-empty list of values")
+            if len(value) > MAX_DISJUNCTION_VALUES:
+                raise InvalidQuery(f"'{operator}' accepts at most {MAX_DISJUNCTION_VALUES} values")
+            value = list(value)
+        operators = [existing for _, existing, _ in self.filters]
+        if operator in ARRAY_OPERATORS and any(op in ARRAY_OPERATORS for op in operators):
+            raise InvalidQuery('Only one array_contains or array_contains_any filter is allowed')
+        if operator == 'not-in' and any(op in ('not-in', '!=', 'in', 'array_contains_any') for op in operators):
+            raise InvalidQuery("'not-in' cannot be combined with 'not-in', '!=', 'in' or 'array_contains_any'")
+        if operator in ('!=', 'in', 'array_contains_any') and 'not-in' in operators:
+            raise InvalidQuery(f"'{operator}' cannot be combined with 'not-in'")
+        return self._copy(filters=self.filters + ((field, operator, value),))
+
+    def order_by(self, field: str, direction: str = ASCENDING) -> 'Query':
+        """Order by one field (ties by document ID); documents without it are excluded."""
+        if not isinstance(field, str) or not field:
+            raise InvalidQuery('Field path must be a non-empty string')
+        if self.order_field is not None:
+            raise InvalidQuery('Only one order_by field is supported')
+        direction = direction.upper()
+        if direction not in (ASCENDING, DESCENDING):
+            raise InvalidQuery(f"Direction must be {ASCENDING} or {DESCENDING}")
+        return self._copy(order_field=field, direction=direction)
+
+    def limit(self, count: int) -> 'Query':
+        """Return at most `count` documents."""
+        if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+            raise InvalidQuery('Limit must be a positive integer')
+        return self._copy(count=count)
+
+    def start_after(self, document: Dict[str, Any]) -> 'Query':
+        """Resume after a document returned by an earlier page of the same query."""
+        if not isinstance(document, dict) or 'id' not in document:
+            raise InvalidQuery("Cursor must be a document with an 'id'")
+        if self.order_field is not None and self.order_field not in document:
+            raise InvalidQuery(f"Cursor document is missing the order_by field '{self.order_field}'")
+        cursor = {'id': document['id']}
+        if self.order_field is not None:
+            cursor[self.order_field] = document[self.order_field]
+        return self._copy(cursor=cursor)
+
+    def select(self, fields: Iterable[str]) -> 'Query':
+        """Return only these fields (plus `id`) of each document."""
+        fields = tuple(fields)
+        if not all(isinstance(field, str) and field for field in fields):
+            raise InvalidQuery('Selected fields must be non-empty strings')
+        return self._copy(fields=fields)
+
+    def stream(self, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """Matching documents, fetched `page_size` at a time."""
+        if self.cursor is not None and self.order_field is not None and self.order_field not in self.cursor:
+            raise InvalidQuery('start_after must be set after order_by')
+        return self.model.iter_all(page_size=page_size, order_by=self.order_field,
+                                   where=list(self.filters) or None,
+                                   select=list(self.fields) if self.fields is not None else None,
+                                   descending=self.direction == DESCENDING,
+                                   limit=self.count, start_after=self.cursor)
+
+    def get(self) -> List[Dict[str, Any]]:
+        """All matching documents as a list."""
+        return list(self.stream())
+
+    def __repr__(self) -> str:
+        return (f"Query({self.model.collection_name!r}, where={list(self.filters)!r}, "
+                f"order_by={self.order_field!r} {self.direction}, limit={self.count!r})")
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from app.services.ai_service import AIService
 from app.services.business_service import BusinessService
+from app.services.chat_cache import INTENT_SOURCES, get_chat_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -8,6 +9,33 @@ logger = logging.getLogger(__name__)
 bp = Blueprint('ai', __name__, url_prefix='/api/ai')
 business_service = BusinessService()
 
+# Upper bound on messages per /classify request
+MAX_CLASSIFY_MESSAGES = 1000
+
+
+def _business_data(intent):
+    """Business figures an intent's answer needs (None if they cannot be loaded)."""
+    if not INTENT_SOURCES.get(intent):
+        return {}
+    
+    # Owner answers only need the shares; everything else uses the dashboard metrics.
+    # Called without a snapshot, so concurrent chats share the dashboard's computation.
+    if intent != 'owner':
+        metrics_result = business_service.get_dashboard_metrics()
+        return metrics_result.get('metrics', {}) if metrics_result.get('success') else None
+    
+    shares_result = business_service.calculate_owner_shares()
+    if not shares_result.get('success'):
+        return None
+    owners_data = []
+    for share in shares_result.get('shares', []):
+        owners_data.append({
+            'name': share.get('name'),
+            'investment': share.get('investmentAmount'),
+            'percentage': share.get('ownershipPercentage')
+        })
+    return {'owners': owners_data}
+
 
 @bp.route('/chat', methods=['POST'])
 def chat():
@@ -19,35 +47,50 @@ def chat():
         if not user_input:
             return jsonify({'success': False, 'error': 'Message is required'}), 400
         
-        # Get current business data
-        metrics_result = business_service.get_dashboard_metrics()
-        if not metrics_result.get('success'):
-            return jsonify({'success': False, 'error': 'Failed to fetch business data'}), 500
-        
-        business_data = metrics_result.get('metrics', {})
+        language = AIService.detect_language(user_input)
+        intent = AIService.classify(user_input)
         
-        # Get owner shares for additional context
-        shares_result = business_service.calculate_owner_shares()
-        if shares_result.get('success'):
-            owners_data = []
-            for share in shares_result.get('shares', []):
-                owners_data.append({
-                    'name': share.get('name'),
-                    'investment': share.get('investmentAmount'),
-                    'percentage': share.get('ownershipPercentage')
-                })
-            business_data['owners'] = owners_data
+        # Repeated questions are answered without reading business data
+        cache = get_chat_cache()
+        key = cache.key(intent, language) if cache else None
+        response = cache.get(key) if cache else None
+        cached = response is not None
         
-        # Generate response
-        response = AIService.generate_response(user_input, business_data)
+        if not cached:
+            business_data = _business_data(intent)
+            if business_data is None:
+                return jsonify({'success': False, 'error': 'Failed to fetch business data'}), 500
+            
+            response = AIService.generate_response(user_input, business_data, language=language, intent=intent)
+            if cache:
+                cache.put(key, response)
         
         return jsonify({
             'success': True,
             'response': response,
-            'language': AIService.detect_language(user_input)
+            'language': language,
+            'cached': cached
         }), 200
     
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+
+@bp.route('/classify', methods=['POST'])
+def classify():
+    """Classify a batch of messages without generating responses."""
+    try:
+        data = request.get_json(silent=True) or {}
+        messages = data.get('messages')
+        if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+            return jsonify({'success': False, 'error': 'messages must be a list of strings'}), 400
+        if len(messages) > MAX_CLASSIFY_MESSAGES:
+            return jsonify({'success': False,
+                            'error': f'At most {MAX_CLASSIFY_MESSAGES} messages per request'}), 400
+        
+        return jsonify({'success': True, 'results': AIService.classify_batch(messages)}), 200
+    
+    except Exception as e:
+        logger.error(f"Error in classify endpoint: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,30 +1,94 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, g, jsonify, request
+from app.services.token_verifier import InvalidToken, get_token_verifier
+from typing import Optional
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+# Require a Firebase ID token (`Authorization: Bearer <token>`) on every /api/ endpoint
+AUTH_REQUIRED = os.getenv('AUTH_REQUIRED', 'false').lower() in ('1', 'true', 'yes')
+PROTECTED_PREFIX = '/api/'
+# Blueprints under PROTECTED_PREFIX answered without a token (verify-token checks its own)
+PUBLIC_BLUEPRINTS = ('auth',)
+# EventSource cannot send headers, so streams may pass the token as ?access_token=
+QUERY_TOKEN_ENDPOINTS = ('business.stream_dashboard_metrics',)
+
+
+def request_token() -> Optional[str]:
+    """The bearer token of the current request, if any."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() == 'bearer' and token.strip():
+        return token.strip()
+    if request.endpoint in QUERY_TOKEN_ENDPOINTS:
+        return request.args.get('access_token')
+    return None
+
+
+def _unauthorized(message: str):
+    response = jsonify({'success': False, 'error': message})
+    response.headers['WWW-Authenticate'] = 'Bearer'
+    return response, 401
+
+
+def requires_token(public=PUBLIC_BLUEPRINTS) -> bool:
+    """Whether the current request must carry a valid ID token (when AUTH_REQUIRED).
+
+    Everything under PROTECTED_PREFIX is protected unless its blueprint is
+    listed in `public`, so new endpoints are never exposed by omission.
+    Health checks and /metrics live outside the prefix.
+    """
+    if request.method == 'OPTIONS' or not request.path.startswith(PROTECTED_PREFIX):
+        return False
+    return request.blueprint not in public
+
+
+def init_auth(app, public=PUBLIC_BLUEPRINTS):
+    """Reject /api/ requests without a valid ID token (when AUTH_REQUIRED).
+
+    Verified claims are available to handlers as `g.user` (`g.user['uid']`).
+    """
+
+    @app.before_request
+    def authenticate():
+        if not AUTH_REQUIRED or not requires_token(public):
+            return None
+        token = request_token()
+        if not token:
+            return _unauthorized('Authentication required')
+        try:
+            g.user = get_token_verifier().verify(token)
+        except InvalidToken as e:
+            return _unauthorized(str(e))
+        except Exception as e:
+            logger.error(f"Error verifying token: {str(e)}")
+            return jsonify({'success': False, 'error': 'Token verification unavailable'}), 503
+        return None
+
 
 @bp.route('/verify-token', methods=['POST'])
 def verify_token():
-    """Verify Firebase token (placeholder)."""
+    """Verify a Firebase ID token and return its user."""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         token = data.get('token')
-        
+
         if not token:
             return jsonify({'success': False, 'error': 'Token is required'}), 400
-        
-        # In a real application, you would verify the Firebase token here
-        # For now, we'll just return success
+
+        claims = get_token_verifier().verify(token)
         return jsonify({
             'success': True,
             'message': 'Token verified',
-            'uid': 'user_id_from_token'
+            'uid': claims['uid'],
+            'email': claims.get('email'),
+            'expiresAt': claims['exp']
         }), 200
-    
+
+    except InvalidToken as e:
+        return jsonify({'success': False, 'error': str(e)}), 401
     except Exception as e:
         logger.error(f"Error in verify_token: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
-
@@ -1,5 +1,13 @@
-from flask import Blueprint, jsonify, request
-from app.services.business_service import BusinessService
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from typing import Any, Callable, Dict, Optional
+from app.services.business_service import BusinessService, OWNER_SHARE_SOURCES, DASHBOARD_SOURCES
+from app.services.job_runner import JOBS_ENABLED, JobFailed, get_job_runner
+from app.services.live_metrics import get_live_metrics_hub
+import json
+import os
+import queue
+import threading
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,13 +15,73 @@ logger = logging.getLogger(__name__)
 bp = Blueprint('business', __name__, url_prefix='/api/business')
 business_service = BusinessService()
 
+# Seconds between keep-alive comments on idle streams
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+# Streams are closed after this long; EventSource reconnects on its own
+SSE_MAX_STREAM_SECONDS = float(os.getenv('SSE_MAX_STREAM_SECONDS', 300))
+# Open streams per worker process; more get 503 and should poll /dashboard-metrics.
+# Under gthread each stream holds one of the worker's threads for its lifetime
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS',
+                                100 if os.getenv('GUNICORN_PROFILE', 'gthread').lower() == 'gevent' else 4))
+
+_stream_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+
+def _conditional_json(compute: Callable[[], Dict[str, Any]], etag: Callable[[], Optional[str]]):
+    """Answer `If-None-Match` with 304 when the data version matches, else compute.
+    
+    The tag is taken before computing, so a write racing with the
+    calculation makes the next revalidation miss rather than pin stale data.
+    """
+    tag = etag()
+    if tag and request.if_none_match.contains_weak(tag):
+        response = Response(status=304)
+    else:
+        result = compute()
+        if not result.get('success'):
+            return jsonify(result), 400
+        response = jsonify(result)
+        # Tags derived from the result itself (the forecast) exist only after computing
+        tag = tag or etag()
+    if tag:
+        response.set_etag(tag)
+    # Caches may store the response but must revalidate it on every use
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def materialized_json(key: str):
+    """Answer with the latest precomputed result for a job key, and its age.
+    
+    A stale result is served while it is recomputed in the background;
+    only a result that was never computed is computed on the request.
+    """
+    runner = get_job_runner()
+    try:
+        doc = runner.serve(key)
+    except JobFailed as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    tag = runner.etag(doc)
+    if request.if_none_match.contains_weak(tag):
+        response = Response(status=304)
+    else:
+        response = jsonify({**doc['result'], 'computedAt': doc['computedAt'].isoformat() + 'Z',
+                            'ageSeconds': round(runner.age(doc), 1)})
+    response.set_etag(tag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 
 @bp.route('/owner-shares', methods=['GET'])
 def get_owner_shares():
     """Get owner profit shares calculation."""
     try:
-        result = business_service.calculate_owner_shares()
-        return jsonify(result), 200 if result.get('success') else 400
+        if JOBS_ENABLED:
+            return materialized_json('owner-shares')
+        return _conditional_json(
+            business_service.calculate_owner_shares,
+            lambda: business_service.data_etag('owner-shares', OWNER_SHARE_SOURCES)
+        )
     except Exception as e:
         logger.error(f"Error in get_owner_shares: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -23,8 +91,10 @@ def get_owner_shares():
 def predict_expenses():
     """Predict next month's expenses."""
     try:
-        result = business_service.predict_next_month_expenses()
-        return jsonify(result), 200 if result.get('success') else 400
+        if JOBS_ENABLED:
+            return materialized_json('expense-forecast')
+        return _conditional_json(business_service.predict_next_month_expenses,
+                                 business_service.forecast_etag)
     except Exception as e:
         logger.error(f"Error in predict_expenses: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -34,9 +104,61 @@ def predict_expenses():
 def get_dashboard_metrics():
     """Get all dashboard metrics."""
     try:
-        result = business_service.get_dashboard_metrics()
-        return jsonify(result), 200 if result.get('success') else 400
+        return _conditional_json(
+            business_service.get_dashboard_metrics,
+            lambda: business_service.data_etag('dashboard-metrics', DASHBOARD_SOURCES)
+        )
     except Exception as e:
         logger.error(f"Error in get_dashboard_metrics: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+
+
+@bp.route('/dashboard-metrics/stream', methods=['GET'])
+def stream_dashboard_metrics():
+    """Server-Sent Events: a `snapshot` of all metrics, then `delta` events with changed fields.
+    
+    At most SSE_MAX_STREAMS streams are open per worker, so streams cannot
+    take every thread from normal API traffic; beyond that the answer is
+    503 and the client should poll /dashboard-metrics instead.
+    """
+    if not _stream_slots.acquire(blocking=False):
+        response = jsonify({'success': False, 'error': 'Too many live streams, poll /api/business/dashboard-metrics'})
+        response.headers['Retry-After'] = str(int(SSE_MAX_STREAM_SECONDS))
+        return response, 503
+    try:
+        hub = get_live_metrics_hub(business_service)
+        events = hub.subscribe()
+    except Exception:
+        _stream_slots.release()
+        raise
+    closed = threading.Event()
+    
+    def close():
+        # Runs when the server closes the response, even if the stream never started
+        if not closed.is_set():
+            closed.set()
+            hub.unsubscribe(events)
+            _stream_slots.release()
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    event, payload, sequence = events.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"id: {sequence}\nevent: {event}\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            close()
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop nginx-style proxies from buffering the stream
+        'X-Accel-Buffering': 'no',
+    })
+    response.call_on_close(close)
+    return response
@@ -0,0 +1,29 @@
+from flask import Blueprint, jsonify, request
+from app.services.import_service import ImportService
+import logging
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('import', __name__, url_prefix='/api/import')
+import_service = ImportService()
+
+
+@bp.route('/<collection>', methods=['POST'])
+def import_collection(collection):
+    """Stream an NDJSON or CSV upload into a collection."""
+    try:
+        fmt = import_service.detect_format(request.content_type, request.args.get('format'))
+        if fmt is None:
+            return jsonify({'success': False,
+                            'error': 'Send NDJSON or CSV (Content-Type or ?format=ndjson|csv)'}), 400
+        
+        mode = request.args.get('mode', 'add')
+        result = import_service.import_stream(collection, request.stream, fmt, mode)
+        if result.get('success'):
+            return jsonify(result), 200
+        # Nothing was processed when the request itself was rejected
+        return jsonify(result), 500 if 'imported' in result else 400
+    
+    except Exception as e:
+        logger.error(f"Error in import_collection: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
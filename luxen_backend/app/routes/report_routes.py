@@ -1,33 +1,86 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from app.routes.business_routes import materialized_json
+from app.services.export_service import ExportService
+from app.services.job_runner import JOBS_ENABLED
+from app.services.report_service import ReportService
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('reports', __name__, url_prefix='/api/reports')
+report_service = ReportService()
+export_service = ExportService()
 
 
 @bp.route('/monthly', methods=['GET'])
 def get_monthly_report():
-    """Get monthly report (placeholder)."""
+    """Get the report for one month (closed months come from the stored rollup)."""
     try:
         month = request.args.get('month')
         year = request.args.get('year')
         
         if not month or not year:
             return jsonify({'success': False, 'error': 'Month and year are required'}), 400
+        if not month.isdigit() or not year.isdigit():
+            return jsonify({'success': False, 'error': 'Month and year must be numbers'}), 400
         
-        # Placeholder response
-        return jsonify({
-            'success': True,
-            'month': month,
-            'year': year,
-            'totalSales': 100000,
-            'totalExpenses': 50000,
-            'totalProduction': 30000,
-            'profitLoss': 20000
-        }), 200
+        year, month = int(year), int(month)
+        now = datetime.utcnow()
+        # Invalid and future months get their error from the service directly
+        if JOBS_ENABLED and 1 <= month <= 12 and (year, month) <= (now.year, now.month):
+            return materialized_json(f"monthly-report:{year:04d}-{month:02d}")
+        
+        result = report_service.get_monthly_report(year, month)
+        return jsonify(result), 200 if result.get('success') else 400
     
     except Exception as e:
         logger.error(f"Error in get_monthly_report: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+
+@bp.route('', methods=['GET'])
+def list_reports():
+    """List stored monthly reports, optionally filtered by year."""
+    try:
+        year = request.args.get('year')
+        if year is not None and not year.isdigit():
+            return jsonify({'success': False, 'error': 'Year must be a number'}), 400
+        
+        reports = report_service.list_reports(int(year) if year else None)
+        return jsonify({'success': True, 'reports': reports}), 200
+    
+    except Exception as e:
+        logger.error(f"Error in list_reports: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@bp.route('/export/<collection>', methods=['GET'])
+def export_collection(collection):
+    """Stream a collection's documents for a date range as CSV or XLSX.
+    
+    Query parameters: `format` (csv or xlsx), `start` and `end` (ISO dates,
+    end inclusive), `columns` (comma-separated fields) and `gzip`.
+    """
+    try:
+        result = export_service.export(
+            collection,
+            fmt=request.args.get('format', 'csv').lower(),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            columns=request.args.get('columns'),
+            compress=request.args.get('gzip', 'false').lower() in ('1', 'true', 'yes'),
+        )
+        if not result.get('success'):
+            return jsonify(result), 400
+        
+        return Response(stream_with_context(result['chunks']), content_type=result['contentType'], headers={
+            'Content-Disposition': f"attachment; filename=\"{result['filename']}\"",
+            'Cache-Control': 'no-store',
+            # Send chunks as they are produced instead of buffering the file in a proxy
+            'X-Accel-Buffering': 'no',
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in export_collection: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,53 @@
+from flask import Blueprint, jsonify, request
+from app.services.serial_index import get_serial_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('serials', __name__, url_prefix='/api/serials')
+
+
+@bp.route('/<serial>', methods=['GET'])
+def lookup_serial(serial):
+    """Where a serial number was produced, sold and claimed."""
+    try:
+        result = get_serial_index().lookup(serial)
+        return jsonify({'success': True, **result}), 200 if result['produced'] or result['sold'] else 404
+    
+    except Exception as e:
+        logger.error(f"Error in lookup_serial: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@bp.route('/validate/sale', methods=['POST'])
+def validate_sale():
+    """Check that a sale's serial numbers were produced and are not sold yet."""
+    try:
+        data = request.get_json(silent=True) or {}
+        serials = data.get('serialNumbers')
+        if not isinstance(serials, list) or not all(isinstance(s, str) for s in serials):
+            return jsonify({'success': False, 'error': 'serialNumbers must be a list of strings'}), 400
+        
+        result = get_serial_index().validate_sale(serials, sale_id=data.get('saleId'))
+        return jsonify({'success': True, **result}), 200
+    
+    except Exception as e:
+        logger.error(f"Error in validate_sale: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@bp.route('/validate/warranty', methods=['POST'])
+def validate_warranty():
+    """Check that a warranty claim's serial number was sold."""
+    try:
+        data = request.get_json(silent=True) or {}
+        serial = data.get('serialNumber')
+        if not isinstance(serial, str) or not serial.strip():
+            return jsonify({'success': False, 'error': 'serialNumber is required'}), 400
+        
+        result = get_serial_index().validate_claim(serial)
+        return jsonify({'success': True, **result}), 200
+    
+    except Exception as e:
+        logger.error(f"Error in validate_warranty: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,9 +1,12 @@
+from app.services.intent_matcher import INTENT_MATCHER, detect_language
 import logging
-import re
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Default `intent` of generate_response: classify the message there
+_CLASSIFY: Any = object()
+
 
 class AIService:
     """Service for AI-powered responses (LUXEN Assistant)."""
@@ -11,23 +14,34 @@ class AIService:
     @staticmethod
     def detect_language(text: str) -> str:
         """Detect if text is in Bangla or English."""
-        # Simple heuristic: check for Bangla Unicode characters
-        bangla_pattern = re.compile(r'[\u0980-\u09FF]')
-        if bangla_pattern.search(text):
-            return 'bn'
-        return 'en'
+        return detect_language(text)
+    
+    @staticmethod
+    def classify(user_input: str) -> Optional[str]:
+        """Intent of a message ('sales', 'profit', ... or None)."""
+        return INTENT_MATCHER.classify(user_input)
     
     @staticmethod
-    def generate_response(user_input: str, business_data: Dict[str, Any]) -> str:
-        """Generate a response based on user input and business data."""
+    def classify_batch(messages: Iterable[str]) -> List[Dict[str, Optional[str]]]:
+        """Intent and language for each message, in order."""
+        return INTENT_MATCHER.classify_many(messages)
+    
+    @staticmethod
+    def generate_response(user_input: str, business_data: Dict[str, Any],
+                          language: Optional[str] = None, intent: Optional[str] = _CLASSIFY) -> str:
+        """Generate a response based on user input and business data.
+        
+        Pass the `intent` (possibly None) when the message was already classified.
+        """
         
-        input_lower = user_input.lower()
-        language = AIService.detect_language(user_input)
+        if intent is _CLASSIFY:
+            intent = INTENT_MATCHER.classify(user_input)
+        language = language or detect_language(user_input)
         
         # ============================================
         # SALES QUERIES
         # ============================================
-        if any(keyword in input_lower for keyword in ['sale', 'বিক্রয়', 'revenue', 'আয়']):
+        if intent == 'sales':
             total_sales = business_data.get('totalSales', 0)
             sales_count = business_data.get('salesCount', 0)
             
@@ -39,7 +53,7 @@ class AIService:
         # ============================================
         # PROFIT/LOSS QUERIES
         # ============================================
-        if any(keyword in input_lower for keyword in ['profit', 'লাভ', 'loss', 'ক্ষতি']):
+        if intent == 'profit':
             total_sales = business_data.get('totalSales', 0)
             total_expenses = business_data.get('totalExpenses', 0)
             total_production = business_data.get('totalProduction', 0)
@@ -55,7 +69,7 @@ class AIService:
         # ============================================
         # EXPENSE QUERIES
         # ============================================
-        if any(keyword in input_lower for keyword in ['expense', 'খরচ', 'cost']):
+        if intent == 'expense':
             total_expenses = business_data.get('totalExpenses', 0)
             expense_count = business_data.get('expenseCount', 0)
             
@@ -67,7 +81,7 @@ class AIService:
         # ============================================
         # PRODUCTION QUERIES
         # ============================================
-        if any(keyword in input_lower for keyword in ['production', 'উৎপাদন', 'batch', 'ব্যাচ']):
+        if intent == 'production':
             total_production = business_data.get('totalProduction', 0)
             production_count = business_data.get('productionCount', 0)
             
@@ -79,7 +93,7 @@ class AIService:
         # ============================================
         # WARRANTY QUERIES
         # ============================================
-        if any(keyword in input_lower for keyword in ['warranty', 'ওয়ারেন্টি', 'claim', 'দাবি']):
+        if intent == 'warranty':
             warranty_count = business_data.get('warrantyCount', 0)
             warranty_replaced = business_data.get('warrantyReplaced', 0)
             warranty_pending = warranty_count - warranty_replaced
@@ -92,7 +106,7 @@ class AIService:
         # ============================================
         # OWNER/INVESTMENT QUERIES
         # ============================================
-        if any(keyword in input_lower for keyword in ['owner', 'মালিক', 'investment', 'বিনিয়োগ', 'share', 'অংশ']):
+        if intent == 'owner':
             owners = business_data.get('owners', [])
             
             if not owners:
@@ -118,7 +132,7 @@ class AIService:
         # ============================================
         # GREETING QUERIES
         # ============================================
-        if any(keyword in input_lower for keyword in ['hello', 'hi', 'হ্যালো', 'হাই', 'নমস্কার']):
+        if intent == 'greeting':
             if language == 'bn':
                 return "আপনাকে স্বাগতম! আমি LUXEN সহায়ক। আপনার ব্যবসায়িক প্রশ্নের উত্তর দিতে এখানে আছি। আপনি বিক্রয়, খরচ, লাভ, উৎপাদন বা ওয়ারেন্টি সম্পর্কে জিজ্ঞাসা করতে পারেন।"
             else:
@@ -127,7 +141,7 @@ class AIService:
         # ============================================
         # HELP QUERIES
         # ============================================
-        if any(keyword in input_lower for keyword in ['help', 'সাহায্য', 'what can', 'কি করতে পারি']):
+        if intent == 'help':
             if language == 'bn':
                 return "আমি আপনাকে এই বিষয়গুলিতে সাহায্য করতে পারি:\n- বিক্রয় এবং আয় সম্পর্কে প্রশ্ন\n- খরচ এবং ব্যয় সম্পর্কে প্রশ্ন\n- লাভ এবং ক্ষতি গণনা\n- উৎপাদন ব্যাচ তথ্য\n- ওয়ারেন্টি দাবি পরিসংখ্যান\n- মালিক এবং বিনিয়োগ তথ্য"
             else:
@@ -2,12 +2,32 @@ from app.models.firestore_models import (
     OwnerModel, ProductionModel, SalesModel, 
     ExpenseModel, WarrantyModel
 )
+from app.models.backends.base import numeric_value
+from app.models.ledger import AggregateLedger
+from app.services.business_snapshot import BusinessSnapshot
+from app.services.single_flight import single_flight
+import hashlib
+import os
+import threading
 import logging
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, Iterable, List, Optional, Tuple
 from datetime import datetime, timedelta
 
+if TYPE_CHECKING:
+    # NumPy-backed; imported on first use to keep it out of startup
+    from app.services.columnar_snapshot import ColumnarTable
+    from app.services.forecast_service import ForecastService
+
 logger = logging.getLogger(__name__)
 
+# Where calculations get their data: 'ledger' (default) reads the aggregate
+# ledgers per request; 'columnar' keeps every collection in NumPy columns
+BUSINESS_ENGINE = os.getenv('BUSINESS_ENGINE', 'ledger').lower()
+
+# Collections each calculation reads; their ledger versions make up its ETag
+OWNER_SHARE_SOURCES = ('owners', 'sales', 'production', 'expenses')
+DASHBOARD_SOURCES = ('sales', 'production', 'expenses', 'warranty')
+
 
 class BusinessService:
     """Service for business logic calculations."""
@@ -18,27 +38,99 @@ class BusinessService:
         self.sales_model = SalesModel()
         self.expense_model = ExpenseModel()
         self.warranty_model = WarrantyModel()
+        self._forecaster = None
+        self._forecaster_lock = threading.Lock()
+    
+    @property
+    def forecaster(self) -> 'ForecastService':
+        """Expense forecaster, created (and NumPy imported) on first use."""
+        if self._forecaster is None:
+            with self._forecaster_lock:
+                if self._forecaster is None:
+                    from app.services.forecast_service import ForecastService
+                    self._forecaster = ForecastService()
+        return self._forecaster
+    
+    def snapshot(self):
+        """Create a snapshot to share reads between calculations in one request."""
+        if BUSINESS_ENGINE == 'columnar':
+            from app.services.columnar_snapshot import get_columnar_store
+            return get_columnar_store(self).snapshot()
+        return BusinessSnapshot(self)
+    
+    def data_etag(self, calculation: str, collections: Iterable[str]) -> Optional[str]:
+        """Strong ETag for a calculation, from the ledger versions of its collections.
+        
+        Every write through the backend moves a ledger version, so the tag is
+        known without recomputing. None while a ledger has not been rebuilt:
+        its totals are then aggregated live and no version covers them.
+        """
+        models = {model.collection_name: model for model in (
+            self.owner_model, self.sales_model, self.production_model,
+            self.expense_model, self.warranty_model
+        )}
+        stamps = []
+        for name in collections:
+            stamp = models[name].ledger.stamp()
+            if stamp is None:
+                return None
+            stamps.append(f"{name}={stamp}")
+        key = '|'.join([calculation, BUSINESS_ENGINE, *stamps])
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+    
+    def forecast_etag(self) -> Optional[str]:
+        """ETag of this month's cached expense forecast (None until it is fitted)."""
+        if self._forecaster is None:
+            return None
+        return self._forecaster.etag(version=self.expense_model.ledger.version())
+    
+    def forecast_stamp(self) -> str:
+        """Version of the forecast's inputs: the month and the expenses ledger version."""
+        return f"{datetime.utcnow().strftime('%Y-%m')}|{self.expense_model.ledger.version()}"
     
-    def calculate_owner_shares(self) -> Dict[str, Any]:
+    def closed_expenses_version(self, today: Optional[datetime] = None) -> str:
+        """Count and sum of expenses before the current month (one aggregation query)."""
+        today = today or datetime.utcnow()
+        month_start = datetime(today.year, today.month, 1)
+        totals = self.expense_model.aggregate(['amount'], where=[('createdAt', '<', month_start)])
+        return f"{totals['count']}:{round(totals['amount'], 2)}"
+    
+    @single_flight
+    def monthly_expense_totals(self) -> Dict[str, float]:
+        """Total expense amount per 'YYYY-MM' month."""
+        # Group expenses by month in a single pass over the stream
+        monthly_totals = {}
+        for expense in self.expense_model.iter_all(order_by=None, select=['amount', 'createdAt']):
+            created_at = expense.get('createdAt')
+            if isinstance(created_at, datetime):
+                month_key = created_at.strftime('%Y-%m')
+            else:
+                month_key = str(created_at)[:7]
+            
+            if month_key not in monthly_totals:
+                monthly_totals[month_key] = 0
+            monthly_totals[month_key] += numeric_value(expense.get('amount'))
+        return monthly_totals
+    
+    @single_flight
+    def calculate_owner_shares(self, snapshot: Optional[BusinessSnapshot] = None) -> Dict[str, Any]:
         """Calculate profit shares for all owners based on investment."""
         try:
-            owners = self.owner_model.get_all_owners()
-            sales = self.sales_model.get_all_sales()
-            production = self.production_model.get_all_batches()
-            expenses = self.expense_model.get_all_expenses()
+            snapshot = (snapshot or self.snapshot()).prefetch('owners', 'sales', 'production', 'expenses')
+            owners = snapshot.get('owners')
             
-            # Calculate totals
-            total_sales = sum(s.get('totalAmount', 0) for s in sales)
-            total_production = sum(p.get('totalCost', 0) for p in production)
-            total_expenses = sum(e.get('amount', 0) for e in expenses)
+            # Totals come from the aggregate ledgers instead of full scans
+            total_sales = snapshot.get('sales')['totalAmount']
+            total_production = snapshot.get('production')['totalCost']
+            total_expenses = snapshot.get('expenses')['amount']
             
             profit_loss = total_sales - total_production - total_expenses
-            total_investment = sum(o.get('investmentAmount', 0) for o in owners)
+            total_investment = sum(numeric_value(o.get('investmentAmount')) for o in owners)
             
             # Calculate shares
             shares = []
             for owner in owners:
-                investment = owner.get('investmentAmount', 0)
+                investment = numeric_value(owner.get('investmentAmount'))
                 ownership_percentage = (investment / total_investment * 100) if total_investment > 0 else 0
                 profit_share = (profit_loss * ownership_percentage / 100)
                 
@@ -64,99 +156,50 @@ class BusinessService:
             logger.error(f"Error calculating owner shares: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def predict_next_month_expenses(self) -> Dict[str, Any]:
-        """Predict next month's expenses using linear regression."""
+    def expense_table(self, snapshot=None) -> Tuple['ColumnarTable', int]:
+        """Expenses as a columnar table: the snapshot's when it has one, else streamed."""
+        from app.services.columnar_snapshot import ColumnarSnapshot, ColumnarTable
+        if isinstance(snapshot, ColumnarSnapshot):
+            return snapshot.table('expenses')
+        table = ColumnarTable(numeric=('amount',), categorical=('category',))
+        table.append(self.expense_model.iter_all(order_by=None, select=['amount', 'category', 'createdAt']))
+        return table, len(table)
+    
+    @single_flight
+    def predict_next_month_expenses(self, snapshot: Optional[BusinessSnapshot] = None) -> Dict[str, Any]:
+        """Predict next month's expenses, per category and in total.
+        
+        Models are fitted on closed months only and reused until the next
+        month closes or expenses in closed months change; expenses are only
+        read when a refit is needed. A write to expenses (or a ledger
+        reconcile) costs one aggregation query to tell which it was.
+        """
         try:
-            expenses = self.expense_model.get_all_expenses()
-            
-            if not expenses:
-                return {
-                    'success': True,
-                    'historicalData': {},
-                    'predictedNextMonth': 0,
-                    'confidence': 'Low'
-                }
-            
-            # Group expenses by month
-            monthly_totals = {}
-            for expense in expenses:
-                created_at = expense.get('createdAt')
-                if isinstance(created_at, datetime):
-                    month_key = created_at.strftime('%Y-%m')
-                else:
-                    month_key = str(created_at)[:7]
-                
-                if month_key not in monthly_totals:
-                    monthly_totals[month_key] = 0
-                monthly_totals[month_key] += expense.get('amount', 0)
-            
-            sorted_months = sorted(monthly_totals.keys())
-            values = [monthly_totals[m] for m in sorted_months]
-            n = len(values)
-            
-            if n < 2:
-                # Not enough data for prediction
-                return {
-                    'success': True,
-                    'historicalData': monthly_totals,
-                    'predictedNextMonth': values[0] if values else 0,
-                    'confidence': 'Low'
-                }
-            
-            # Simple linear regression
-            x_values = list(range(1, n + 1))
-            sum_x = sum(x_values)
-            sum_y = sum(values)
-            sum_xy = sum(x * y for x, y in zip(x_values, values))
-            sum_x2 = sum(x ** 2 for x in x_values)
-            
-            # Calculate slope and intercept
-            denominator = (n * sum_x2 - sum_x ** 2)
-            if denominator == 0:
-                slope = 0
-            else:
-                slope = (n * sum_xy - sum_x * sum_y) / denominator
-            
-            intercept = (sum_y - slope * sum_x) / n
-            
-            # Predict for next month
-            prediction = intercept + slope * (n + 1)
-            prediction = max(0, prediction)  # Ensure non-negative
-            
-            # Determine confidence
-            if n >= 3:
-                confidence = 'High'
-            elif n == 2:
-                confidence = 'Medium'
-            else:
-                confidence = 'Low'
-            
-            return {
-                'success': True,
-                'historicalData': monthly_totals,
-                'predictedNextMonth': round(prediction, 2),
-                'confidence': confidence,
-                'monthsAnalyzed': n
-            }
+            result = self.forecaster.forecast(lambda: self.expense_table(snapshot),
+                                              version=self.expense_model.ledger.version(),
+                                              closed_version=self.closed_expenses_version)
+            return {'success': True, **result}
         except Exception as e:
             logger.error(f"Error predicting expenses: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def get_dashboard_metrics(self) -> Dict[str, Any]:
+    @single_flight
+    def get_dashboard_metrics(self, snapshot: Optional[BusinessSnapshot] = None) -> Dict[str, Any]:
         """Get all dashboard metrics."""
         try:
-            sales = self.sales_model.get_all_sales()
-            production = self.production_model.get_all_batches()
-            expenses = self.expense_model.get_all_expenses()
-            warranty = self.warranty_model.get_all_claims()
-            
-            total_sales = sum(s.get('totalAmount', 0) for s in sales)
-            total_production = sum(p.get('totalCost', 0) for p in production)
-            total_expenses = sum(e.get('amount', 0) for e in expenses)
+            snapshot = (snapshot or self.snapshot()).prefetch('sales', 'production', 'expenses', 'warranty')
+            sales = snapshot.get('sales')
+            production = snapshot.get('production')
+            expenses = snapshot.get('expenses')
+            warranty = snapshot.get('warranty')
+            
+            total_sales = sales['totalAmount']
+            total_production = production['totalCost']
+            total_expenses = expenses['amount']
             profit_loss = total_sales - total_production - total_expenses
             
-            warranty_replaced = sum(1 for w in warranty if w.get('replaced', False))
-            warranty_pending = len(warranty) - warranty_replaced
+            warranty_replaced = warranty['replacedCount']
+            warranty_pending = warranty['count'] - warranty_replaced
             
             return {
                 'success': True,
@@ -165,12 +208,13 @@ class BusinessService:
                     'totalExpenses': total_expenses,
                     'totalProduction': total_production,
                     'profitLoss': profit_loss,
-                    'salesCount': len(sales),
-                    'expenseCount': len(expenses),
-                    'productionCount': len(production),
-                    'warrantyCount': len(warranty),
+                    'salesCount': sales['count'],
+                    'expenseCount': expenses['count'],
+                    'productionCount': production['count'],
+                    'warrantyCount': warranty['count'],
                     'warrantyReplaced': warranty_replaced,
-                    'warrantyPending': warranty_pending
+                    'warrantyPending': warranty_pending,
+                    'expensesByCategory': AggregateLedger.groups(expenses, 'amount')
                 }
             }
         except Exception as e:
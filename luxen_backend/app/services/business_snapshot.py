@@ -0,0 +1,74 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextvars
+from typing import Dict, Any, Callable
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on concurrent Firestore reads issued by snapshots in this process
+SNAPSHOT_MAX_WORKERS = int(os.getenv('SNAPSHOT_MAX_WORKERS', 8))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Shared pool for snapshot reads, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=SNAPSHOT_MAX_WORKERS, thread_name_prefix='snapshot'
+            )
+        return _executor
+
+
+class BusinessSnapshot:
+    """Business data for a single request, each source loaded at most once.
+
+    Sources are the owner list (`owners`), the aggregate ledger totals of
+    `sales`, `production`, `expenses` and `warranty`, and the monthly expense
+    totals (`expenseMonths`). `prefetch` fans the reads out concurrently;
+    `get` loads a source on demand.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _loaders(self) -> Dict[str, Callable[[], Any]]:
+        service = self.service
+        return {
+            'owners': service.owner_model.get_all_owners,
+            'sales': service.sales_model.ledger.totals,
+            'production': service.production_model.ledger.totals,
+            'expenses': service.expense_model.ledger.totals,
+            'warranty': service.warranty_model.ledger.totals,
+            'expenseMonths': service.monthly_expense_totals,
+        }
+
+    def _future(self, name: str) -> Future:
+        with self._lock:
+            if name not in self._futures:
+                loaders = self._loaders()
+                if name not in loaders:
+                    raise KeyError(f"Unknown snapshot source '{name}'")
+                # Run in a copy of the caller's context so reads count against its request
+                self._futures[name] = _get_executor().submit(
+                    contextvars.copy_context().run, loaders[name]
+                )
+            return self._futures[name]
+
+    def prefetch(self, *names: str) -> 'BusinessSnapshot':
+        """Start loading the named sources concurrently and wait for all of them."""
+        futures = [self._future(name) for name in names]
+        for future in futures:
+            future.result()
+        return self
+
+    def get(self, name: str) -> Any:
+        """Return a source, loading it if it has not been loaded yet."""
+        return self._future(name).result()
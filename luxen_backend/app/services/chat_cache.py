@@ -0,0 +1,107 @@
+from app.metrics import CHAT_CACHE_LOOKUPS
+from app.models.firestore_models import add_write_listener
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHAT_CACHE_ENABLED = os.getenv('CHAT_CACHE', 'true').lower() in ('1', 'true', 'yes')
+# Answers kept per process (least recently used are evicted)
+CHAT_CACHE_SIZE = int(os.getenv('CHAT_CACHE_SIZE', 256))
+# Upper bound on staleness for writes this process does not see (the web
+# app, other workers); local writes invalidate immediately
+CHAT_CACHE_TTL = float(os.getenv('CHAT_CACHE_TTL', 30))
+
+# Collections each intent's answer is computed from; intents without
+# sources (greeting, help, unknown) need no business data at all
+INTENT_SOURCES: Dict[Optional[str], Tuple[str, ...]] = {
+    'sales': ('sales',),
+    'profit': ('sales', 'expenses', 'production'),
+    'expense': ('expenses',),
+    'production': ('production',),
+    'warranty': ('warranty',),
+    'owner': ('owners', 'sales', 'expenses', 'production'),
+    'greeting': (),
+    'help': (),
+    None: (),
+}
+
+CacheKey = Tuple[Optional[str], str, Tuple[int, ...]]
+
+
+class ChatResponseCache:
+    """LRU cache of assistant answers keyed by (intent, language, data version).
+
+    An answer depends only on its intent, its language and the collections
+    behind it, so the same question in any wording is served from one entry.
+    The data version is a per-collection counter bumped by every write made
+    through the models in this process; entries also expire after
+    `ttl` seconds to pick up writes made elsewhere.
+    """
+
+    def __init__(self, max_size: int = CHAT_CACHE_SIZE, ttl: float = CHAT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._versions: Dict[str, int] = {}
+        self._entries: 'OrderedDict[CacheKey, Tuple[str, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        for collection in {c for sources in INTENT_SOURCES.values() for c in sources}:
+            add_write_listener(collection, lambda doc_id, data, merge, c=collection: self.bump(c))
+
+    def bump(self, collection: str):
+        """Mark a collection as changed; answers built from it become stale."""
+        with self._lock:
+            self._versions[collection] = self._versions.get(collection, 0) + 1
+
+    def key(self, intent: Optional[str], language: str) -> CacheKey:
+        """Cache key for the current data; take it before reading the data."""
+        with self._lock:
+            return intent, language, tuple(self._versions.get(c, 0) for c in INTENT_SOURCES.get(intent, ()))
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        """The cached answer for a key, or None on a miss or expiry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                CHAT_CACHE_LOOKUPS.inc('hit')
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+        CHAT_CACHE_LOOKUPS.inc('miss')
+        return None
+
+    def put(self, key: CacheKey, response: str):
+        with self._lock:
+            self._entries[key] = (response, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'size': len(self._entries), 'maxSize': self.max_size, 'ttl': self.ttl,
+                    'versions': dict(self._versions)}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_chat_cache() -> Optional[ChatResponseCache]:
+    """The process-wide answer cache, or None when CHAT_CACHE is off."""
+    global _cache
+    if not CHAT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ChatResponseCache()
+        return _cache
@@ -0,0 +1,361 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds a loaded store may be reused before checking for new documents
+COLUMNAR_REFRESH_SECONDS = float(os.getenv('COLUMNAR_REFRESH_SECONDS', 1))
+# Seconds between full reloads, which also pick up edits the ledgers cannot see
+COLUMNAR_REBUILD_SECONDS = float(os.getenv('COLUMNAR_REBUILD_SECONDS', 300))
+# Documents created within this many seconds may still be in flight; they are
+# re-queried (and de-duplicated by ID) until they are older than this
+COLUMNAR_SETTLE_SECONDS = float(os.getenv('COLUMNAR_SETTLE_SECONDS', 60))
+
+_INITIAL_CAPACITY = 1024
+_NAT = np.datetime64('NaT', 'us')
+
+
+def _to_datetime64(value: Any) -> np.datetime64:
+    """UTC datetime64[us] for a datetime or ISO string; NaT otherwise."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return np.datetime64(value, 'us')
+    if isinstance(value, str):
+        try:
+            return np.datetime64(datetime.fromisoformat(value.replace('Z', '+00:00'))
+                                 .astimezone(timezone.utc).replace(tzinfo=None), 'us')
+        except ValueError:
+            return _NAT
+    return _NAT
+
+
+def _to_float(value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return 0.0
+    return float(value)
+
+
+def _number(value: float) -> Any:
+    """Plain Python number, integral values as int, so results serialize like the dict path."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class ColumnarTable:
+    """One collection as NumPy columns.
+
+    Numeric fields are float64 arrays (non-numbers count as 0), `createdAt`
+    is a datetime64[us] array in UTC (NaT when missing), categorical fields
+    are dictionary-encoded int32 codes and flag fields are bool arrays.
+    Rows are appended in place; capacity doubles as needed.
+    """
+
+    def __init__(self, numeric: Iterable[str] = (), categorical: Iterable[str] = (),
+                 flags: Iterable[str] = ()):
+        self.numeric = tuple(numeric)
+        self.categorical = tuple(categorical)
+        self.flags = tuple(flags)
+        self.length = 0
+        self.capacity = _INITIAL_CAPACITY
+        self.ids: List[str] = []
+        self._columns: Dict[str, np.ndarray] = {'createdAt': np.full(self.capacity, _NAT)}
+        for field in self.numeric:
+            self._columns[field] = np.zeros(self.capacity, dtype=np.float64)
+        for field in self.categorical:
+            self._columns[field] = np.full(self.capacity, -1, dtype=np.int32)
+        for field in self.flags:
+            self._columns[field] = np.zeros(self.capacity, dtype=bool)
+        self.categories: Dict[str, List[str]] = {field: [] for field in self.categorical}
+        self._codes: Dict[str, Dict[str, int]] = {field: {} for field in self.categorical}
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _grow(self, needed: int):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        for field, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.length] = column[:self.length]
+            self._columns[field] = grown
+        self.capacity = capacity
+
+    def _encode(self, field: str, value: Any) -> int:
+        if value is None:
+            return -1
+        codes = self._codes[field]
+        value = str(value)
+        if value not in codes:
+            codes[value] = len(self.categories[field])
+            self.categories[field].append(value)
+        return codes[value]
+
+    def append(self, docs: Iterable[Dict[str, Any]]) -> int:
+        """Append documents (with 'id'); returns the number appended."""
+        docs = list(docs)
+        if not docs:
+            return 0
+        start = self.length
+        end = start + len(docs)
+        self._grow(end)
+        columns = self._columns
+        columns['createdAt'][start:end] = [_to_datetime64(doc.get('createdAt')) for doc in docs]
+        for field in self.numeric:
+            columns[field][start:end] = [_to_float(doc.get(field)) for doc in docs]
+        for field in self.categorical:
+            columns[field][start:end] = [self._encode(field, doc.get(field)) for doc in docs]
+        for field in self.flags:
+            columns[field][start:end] = [bool(doc.get(field)) for doc in docs]
+        self.ids.extend(doc.get('id') for doc in docs)
+        self.length = end
+        return len(docs)
+
+    def column(self, field: str, length: Optional[int] = None) -> np.ndarray:
+        """Read-only view of the first `length` rows (all rows by default)."""
+        view = self._columns[field][:self.length if length is None else length]
+        view.flags.writeable = False
+        return view
+
+    def total(self, field: str, length: Optional[int] = None) -> float:
+        return _number(self.column(field, length).sum())
+
+    def count_true(self, field: str, length: Optional[int] = None) -> int:
+        return int(np.count_nonzero(self.column(field, length)))
+
+    def group_sum(self, field: str, by: str, length: Optional[int] = None) -> Dict[str, Any]:
+        """Sum `field` per value of the categorical field `by` (missing values are skipped)."""
+        codes = self.column(by, length)
+        valid = codes >= 0
+        categories = self.categories[by]
+        counts = np.bincount(codes[valid], minlength=len(categories))
+        sums = np.bincount(codes[valid], weights=self.column(field, length)[valid],
+                           minlength=len(categories))
+        return {category: _number(total) for category, total, count in zip(categories, sums, counts)
+                if count}
+
+    def month_index(self, length: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(month labels 'YYYY-MM', per-row month position, mask of rows with a createdAt)."""
+        months = self.column('createdAt', length).astype('datetime64[M]')
+        valid = ~np.isnat(months)
+        unique, inverse = np.unique(months[valid], return_inverse=True)
+        return np.datetime_as_string(unique, unit='M'), inverse, valid
+
+    def month_sums(self, field: str, length: Optional[int] = None) -> Dict[str, Any]:
+        """Sum `field` per 'YYYY-MM' month of `createdAt`."""
+        labels, inverse, valid = self.month_index(length)
+        sums = np.bincount(inverse, weights=self.column(field, length)[valid], minlength=len(labels))
+        return {str(label): _number(total) for label, total in zip(labels, sums)}
+
+
+# Columns kept per collection: (numeric, categorical, flags)
+TABLE_SCHEMAS = {
+    'sales': (('totalAmount',), (), ()),
+    'production': (('totalCost', 'quantity'), (), ()),
+    'expenses': (('amount',), ('category',), ()),
+    'warranty': ((), (), ('replaced',)),
+}
+
+
+class ColumnarStore:
+    """Process-wide columnar copy of the business collections.
+
+    Loaded in full once, then extended with documents created since the
+    last refresh. Documents changed or deleted through the backend move the
+    aggregate ledger versions; when versions move more than documents were
+    appended, a document already in a table turns up as new (its
+    `createdAt` changed), or `COLUMNAR_REBUILD_SECONDS` pass, the store is
+    reloaded.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.models = {
+            'sales': service.sales_model,
+            'production': service.production_model,
+            'expenses': service.expense_model,
+            'warranty': service.warranty_model,
+        }
+        self.tables: Dict[str, ColumnarTable] = {}
+        # Per collection: IDs of every row in its table
+        self._ids: Dict[str, Set[str]] = {}
+        self.owners: List[Dict[str, Any]] = []
+        self._versions: Dict[str, int] = {}
+        # Per collection: {id: createdAt} of rows newer than the watermark
+        self._recent: Dict[str, Dict[str, np.datetime64]] = {}
+        self._watermark: Optional[datetime] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _fields(self, name: str) -> List[str]:
+        numeric, categorical, flags = TABLE_SCHEMAS[name]
+        return ['createdAt', *numeric, *categorical, *flags]
+
+    def _ledger_versions(self) -> Dict[str, int]:
+        return {name: model.ledger.version() for name, model in self.models.items()}
+
+    def _track_recent(self, name: str, table: ColumnarTable, start: int):
+        """Remember IDs of appended rows that are newer than the watermark."""
+        watermark = np.datetime64(self._watermark, 'us')
+        created = table.column('createdAt')[start:]
+        recent = self._recent.setdefault(name, {})
+        for doc_id, value in zip(table.ids[start:], created):
+            if not np.isnat(value) and value > watermark:
+                recent[doc_id] = value
+
+    def load(self):
+        """Read every collection into fresh tables."""
+        started = time.perf_counter()
+        versions = self._ledger_versions()
+        now = datetime.utcnow()
+        tables = {}
+        for name, model in self.models.items():
+            table = ColumnarTable(*TABLE_SCHEMAS[name])
+            batch = []
+            for doc in model.iter_all(order_by=None, select=self._fields(name)):
+                batch.append(doc)
+                if len(batch) >= 5000:
+                    table.append(batch)
+                    batch = []
+            table.append(batch)
+            tables[name] = table
+        self.tables = tables
+        self._ids = {name: set(table.ids) for name, table in tables.items()}
+        self.owners = self.service.owner_model.get_all_owners()
+        self._versions = versions
+        self._watermark = now - timedelta(seconds=COLUMNAR_SETTLE_SECONDS)
+        self._recent = {}
+        for name, table in tables.items():
+            self._track_recent(name, table, 0)
+        self._loaded_at = self._checked_at = time.monotonic()
+        logger.info(f"Columnar store loaded {sum(len(t) for t in tables.values())} rows "
+                    f"in {time.perf_counter() - started:.2f}s")
+
+    def _append_new(self) -> bool:
+        """Append documents created since the watermark; False if a reload is needed."""
+        versions = self._ledger_versions()
+        now = datetime.utcnow()
+        appended = 0
+        for name, model in self.models.items():
+            recent = self._recent.setdefault(name, {})
+            ids = self._ids.setdefault(name, set())
+            where = [('createdAt', '>', self._watermark)]
+            new_docs = []
+            for doc in model.iter_all(where=where, select=self._fields(name)):
+                if doc['id'] in recent:
+                    # Appended by an earlier refresh and still inside the settle window
+                    continue
+                if doc['id'] in ids:
+                    # An existing row moved past the watermark; appending it would count it twice
+                    return False
+                new_docs.append(doc)
+            table = self.tables[name]
+            start = len(table)
+            appended += table.append(new_docs)
+            ids.update(doc['id'] for doc in new_docs)
+            self._track_recent(name, table, start)
+        moves = sum(versions.values()) - sum(self._versions.values())
+        if moves > appended:
+            return False
+        self._versions = versions
+        self._watermark = now - timedelta(seconds=COLUMNAR_SETTLE_SECONDS)
+        watermark = np.datetime64(self._watermark, 'us')
+        for recent in self._recent.values():
+            for doc_id in [doc_id for doc_id, created in recent.items() if created <= watermark]:
+                del recent[doc_id]
+        self.owners = self.service.owner_model.get_all_owners()
+        return True
+
+    def refresh(self, force: bool = False):
+        """Bring the store up to date (at most once per COLUMNAR_REFRESH_SECONDS)."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self.tables and now - self._checked_at < COLUMNAR_REFRESH_SECONDS:
+                return
+            try:
+                if force or not self.tables or now - self._loaded_at >= COLUMNAR_REBUILD_SECONDS \
+                        or not self._append_new():
+                    self.load()
+                self._checked_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error refreshing columnar store: {str(e)}")
+                raise
+
+    def snapshot(self, refresh: bool = True) -> 'ColumnarSnapshot':
+        """Freeze the current rows for one request, refreshing first by default."""
+        if refresh:
+            self.refresh()
+        with self._lock:
+            return ColumnarSnapshot(
+                {name: (table, len(table)) for name, table in self.tables.items()}, list(self.owners)
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_columnar_store(service) -> ColumnarStore:
+    """The process-wide store, created (not yet loaded) on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ColumnarStore(service)
+        return _store
+
+
+class ColumnarSnapshot:
+    """A `BusinessSnapshot` stand-in computed from columnar tables.
+
+    Provides the same sources (`owners`, `sales`, `production`, `expenses`,
+    `warranty`, `expenseMonths`) with the same shapes, so `BusinessService`
+    calculations run on it unchanged. Rows appended after the snapshot was
+    taken are not visible to it.
+    """
+
+    def __init__(self, tables: Dict[str, Tuple[ColumnarTable, int]], owners: List[Dict[str, Any]]):
+        self.tables = tables
+        self.owners = owners
+        self._values: Dict[str, Any] = {}
+
+    def table(self, name: str) -> Tuple[ColumnarTable, int]:
+        return self.tables[name]
+
+    def _compute(self, name: str) -> Any:
+        if name == 'owners':
+            return self.owners
+        if name == 'expenseMonths':
+            table, length = self.tables['expenses']
+            return table.month_sums('amount', length)
+        if name not in self.tables:
+            raise KeyError(f"Unknown snapshot source '{name}'")
+        table, length = self.tables[name]
+        totals = {'count': length}
+        for field in table.numeric:
+            totals[field] = table.total(field, length)
+        for field in table.flags:
+            totals[f"{field}Count"] = table.count_true(field, length)
+        for by in table.categorical:
+            for field in table.numeric:
+                for group, total in table.group_sum(field, by, length).items():
+                    totals[f"{field}:{group}"] = total
+        return totals
+
+    def prefetch(self, *names: str) -> 'ColumnarSnapshot':
+        for name in names:
+            self.get(name)
+        return self
+
+    def get(self, name: str) -> Any:
+        if name not in self._values:
+            self._values[name] = self._compute(name)
+        return self._values[name]
@@ -0,0 +1,326 @@
+from app.models.firestore_models import ProductionModel, SalesModel, ExpenseModel
+from app.models.query import ASCENDING
+from app.services.import_service import parse_timestamp
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence
+from xml.sax.saxutils import escape
+import csv
+import io
+import json
+import math
+import os
+import re
+import zipfile
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Collections that can be exported, with the columns exported by default
+EXPORTABLE_MODELS = {
+    'sales': SalesModel,
+    'expenses': ExpenseModel,
+    'production': ProductionModel,
+}
+DEFAULT_COLUMNS = {
+    'sales': ('id', 'createdAt', 'invoiceId', 'customerName', 'unitPrice', 'totalAmount',
+              'paymentStatus', 'serialNumbers'),
+    'expenses': ('id', 'createdAt', 'category', 'description', 'amount'),
+    'production': ('id', 'createdAt', 'batchName', 'quantity', 'materialCost', 'laborCost',
+                   'electricityCost', 'packagingCost', 'costPerUnit', 'totalCost', 'serialNumbers'),
+}
+EXPORT_FORMATS = ('csv', 'xlsx')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+# Rows encoded per response chunk; memory use is bounded by this and the page size
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', 1000))
+# Documents fetched per storage round trip
+EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', 500))
+MAX_EXPORT_COLUMNS = 50
+# Excel's limit; longer exports continue on further sheets
+XLSX_MAX_ROWS = 1048576
+
+_FIELD_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_.]*$')
+# Characters XML 1.0 cannot represent
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+# Leading characters that make a spreadsheet read CSV text as a formula
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportError(ValueError):
+    """Raised for an export request that cannot be served (bad collection, range or columns)."""
+
+
+def _utc(value: datetime) -> datetime:
+    """Naive UTC datetime, as timestamps are stored."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_range(start: Optional[str], end: Optional[str], now: Optional[datetime] = None):
+    """[start, end) from ISO dates or timestamps; a date-only end includes that whole day."""
+    now = now or datetime.utcnow()
+    try:
+        start_at = _utc(parse_timestamp(start)) if start else datetime(1970, 1, 1)
+        end_at = _utc(parse_timestamp(end)) if end else now + timedelta(seconds=1)
+    except ValueError:
+        raise ExportError('start and end must be ISO dates (YYYY-MM-DD) or timestamps')
+    if end and len(end.strip()) == 10:
+        end_at += timedelta(days=1)
+    if end_at <= start_at:
+        raise ExportError('end must be after start')
+    return start_at, end_at
+
+
+def parse_columns(collection: str, columns: Optional[str]) -> List[str]:
+    """Requested columns (comma-separated field names), or the collection's defaults."""
+    if not columns:
+        return list(DEFAULT_COLUMNS[collection])
+    names = [name.strip() for name in columns.split(',') if name.strip()]
+    if not names:
+        raise ExportError('columns must list at least one field')
+    if len(names) > MAX_EXPORT_COLUMNS:
+        raise ExportError(f"At most {MAX_EXPORT_COLUMNS} columns can be exported")
+    invalid = [name for name in names if not _FIELD_PATTERN.match(name)]
+    if invalid:
+        raise ExportError(f"Invalid column names: {', '.join(invalid[:5])}")
+    return list(dict.fromkeys(names))
+
+
+def _text(value: Any) -> str:
+    """Cell text for values without a native spreadsheet type."""
+    if isinstance(value, (list, tuple)):
+        return '; '.join(_text(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, default=str, ensure_ascii=False)
+    if isinstance(value, datetime):
+        return _utc(value).isoformat(sep=' ', timespec='seconds')
+    return str(value)
+
+
+def _csv_text(value: Any) -> str:
+    """Cell text for CSV, with formula-like text (`=SUM(...)`, `@cmd`) quoted as text."""
+    text = _text(value)
+    return "'" + text if text.startswith(_FORMULA_PREFIXES) else text
+
+
+def csv_chunks(columns: Sequence[str], docs: Iterable[Dict[str, Any]],
+               chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """UTF-8 CSV (with a BOM, so Excel detects the encoding) in chunks of rows.
+
+    Text starting with `=`, `+`, `-` or `@` gets a leading `'`, so user
+    input cannot run as a formula when the file is opened; numbers are
+    written as they are.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    rows = 0
+    for doc in docs:
+        writer.writerow(['' if doc.get(column) is None else
+                         (doc[column] if isinstance(doc[column], (int, float)) else _csv_text(doc[column]))
+                         for column in columns])
+        rows += 1
+        if rows % chunk_rows == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _Sink:
+    """Write-only file collecting what zipfile writes, drained after every chunk."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _xlsx_cell(value: Any) -> str:
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)) and math.isfinite(value):
+        return f'<c><v>{value!r}</v></c>'
+    if isinstance(value, datetime):
+        serial = (_utc(value) - _EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c s="1"><v>{serial:.8f}</v></c>'
+    text = escape(_XML_ILLEGAL.sub('', _text(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+_SHEET_START = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+_SHEET_END = '</sheetData></worksheet>'
+_STYLES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+           '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+           '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+           '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+           '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+           '<fill><patternFill patternType="gray125"/></fill></fills>'
+           '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+           '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+           '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+           '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+           '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+           '</styleSheet>')
+
+
+def _xlsx_package(sheets: int) -> Dict[str, str]:
+    """Workbook parts other than the sheets, for `sheets` worksheets."""
+    ids = range(1, sheets + 1)
+    return {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for i in ids)
+            + '</Types>'),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+            'relationships/officeDocument" Target="xl/workbook.xml"/></Relationships>'),
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + ''.join(f'<sheet name="Sheet{i}" sheetId="{i}" r:id="rId{i}"/>' for i in ids)
+            + '</sheets></workbook>'),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + ''.join(f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/'
+                      f'2006/relationships/worksheet" Target="worksheets/sheet{i}.xml"/>' for i in ids)
+            + f'<Relationship Id="rId{sheets + 1}" Type="http://schemas.openxmlformats.org/officeDocument/'
+            '2006/relationships/styles" Target="styles.xml"/></Relationships>'),
+        'xl/styles.xml': _STYLES,
+    }
+
+
+def xlsx_chunks(columns: Sequence[str], docs: Iterable[Dict[str, Any]],
+                chunk_rows: int = EXPORT_CHUNK_ROWS, max_rows: int = XLSX_MAX_ROWS) -> Iterator[bytes]:
+    """An XLSX workbook written as a streamed zip, in chunks of rows.
+
+    Cells are inline strings, numbers and dates (no shared-string table),
+    so nothing accumulates while rows are written. Past `max_rows` rows
+    (header included) the export continues on a new sheet; the workbook
+    parts listing the sheets are written last.
+    """
+    sink = _Sink()
+    header = '<row>' + ''.join(_xlsx_cell(column) for column in columns) + '</row>'
+    docs = iter(docs)
+    sheets = 0
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        pending = next(docs, None)
+        while sheets == 0 or pending is not None:
+            sheets += 1
+            with archive.open(f"xl/worksheets/sheet{sheets}.xml", 'w', force_zip64=True) as sheet:
+                sheet.write((_SHEET_START + header).encode('utf-8'))
+                rows, lines = 1, []
+                while pending is not None and rows < max_rows:
+                    lines.append('<row>' + ''.join(_xlsx_cell(pending.get(column)) for column in columns)
+                                 + '</row>')
+                    rows += 1
+                    pending = next(docs, None)
+                    if len(lines) >= chunk_rows:
+                        sheet.write(''.join(lines).encode('utf-8'))
+                        lines = []
+                        yield sink.drain()
+                sheet.write((''.join(lines) + _SHEET_END).encode('utf-8'))
+            yield sink.drain()
+        for name, content in _xlsx_package(sheets).items():
+            archive.writestr(name, content)
+    yield sink.drain()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a stream of chunks incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class ExportService:
+    """Streams a collection's documents for a date range as CSV or XLSX.
+
+    Documents are read page by page in `createdAt` order and encoded a
+    chunk of rows at a time, so memory stays flat however long the export.
+    """
+
+    def __init__(self):
+        self.models = {name: model_class() for name, model_class in EXPORTABLE_MODELS.items()}
+
+    def export(self, collection: str, fmt: str = 'csv', start: Optional[str] = None,
+               end: Optional[str] = None, columns: Optional[str] = None,
+               compress: bool = False) -> Dict[str, Any]:
+        """Validate an export and return its filename, content type and body chunks.
+
+        The chunks are a generator: nothing is read until it is iterated.
+        """
+        try:
+            if collection not in self.models:
+                raise ExportError(f"Collection must be one of: {', '.join(self.models)}")
+            if fmt not in EXPORT_FORMATS:
+                raise ExportError(f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+            start_at, end_at = parse_range(start, end)
+            selected = parse_columns(collection, columns)
+        except ExportError as e:
+            return {'success': False, 'error': str(e)}
+
+        fields = [column for column in selected if column != 'id'] or ['createdAt']
+        query = self.models[collection].created_between(start_at, end_at, ASCENDING).select(fields)
+        encode = csv_chunks if fmt == 'csv' else xlsx_chunks
+
+        def chunks() -> Iterator[bytes]:
+            rows = 0
+
+            def docs():
+                nonlocal rows
+                for doc in query.stream(page_size=EXPORT_PAGE_SIZE):
+                    rows += 1
+                    yield doc
+
+            try:
+                body = encode(selected, docs())
+                yield from (gzip_chunks(body) if compress else body)
+                logger.info(f"Exported {rows} {collection} rows as {fmt}")
+            except Exception as e:
+                # Headers are already sent; the client sees a truncated file
+                logger.error(f"Error exporting {collection} after {rows} rows: {str(e)}")
+                raise
+
+        filename = f"{collection}_{start_at:%Y%m%d}_{(end_at - timedelta(microseconds=1)):%Y%m%d}.{fmt}"
+        return {
+            'success': True,
+            'filename': filename + ('.gz' if compress else ''),
+            'contentType': 'application/gzip' if compress else CONTENT_TYPES[fmt],
+            'chunks': chunks(),
+        }
@@ -0,0 +1,226 @@
+from app.services.columnar_snapshot import ColumnarTable
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import hashlib
+import json
+import numpy as np
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Expenses without a category are forecast under this name
+UNCATEGORIZED = 'Other'
+# Closed months needed before the seasonal model is considered (two full years)
+SEASONAL_MIN_MONTHS = 24
+# Closed months needed before models are chosen by backtest instead of defaulting to the trend
+BACKTEST_MIN_MONTHS = 6
+# Months held out when backtesting
+BACKTEST_MONTHS = 3
+# Small ridge penalty: only resolves the collinear intercept and month indicators
+SEASONAL_ALPHA = 1e-3
+
+ExpenseLoader = Callable[[], Tuple[ColumnarTable, int]]
+# () -> a value that changes when expenses in closed months change (e.g. their count and sum)
+ClosedVersion = Callable[[], Any]
+
+
+def _month_number(label: str) -> int:
+    """Months since 1970-01 for a 'YYYY-MM' label."""
+    return int(np.datetime64(label, 'M').astype(np.int64))
+
+
+def _month_label(number: int) -> str:
+    return str(np.datetime64(int(number), 'M'))
+
+
+def monthly_matrix(table: ColumnarTable, length: int, before: str) -> Tuple[List[str], List[str], np.ndarray]:
+    """Expense totals as a dense (months x categories) matrix.
+
+    Covers every month from the first expense up to (not including) `before`,
+    with zeros for months without expenses. Returns (month labels,
+    categories, matrix).
+    """
+    labels, inverse, valid = table.month_index(length)
+    if not len(labels):
+        return [], [], np.zeros((0, 0))
+    numbers = np.array([_month_number(label) for label in labels])[inverse]
+    codes = table.column('category', length)[valid].astype(np.int64)
+    amounts = table.column('amount', length)[valid]
+
+    categories = list(table.categories['category'])
+    if np.any(codes < 0):
+        if UNCATEGORIZED not in categories:
+            categories.append(UNCATEGORIZED)
+        codes = np.where(codes < 0, categories.index(UNCATEGORIZED), codes)
+
+    first, end = numbers.min(), _month_number(before)
+    closed = numbers < end
+    if end <= first:
+        return [], categories, np.zeros((0, len(categories)))
+    rows = numbers[closed] - first
+    matrix = np.zeros((end - first, len(categories)))
+    np.add.at(matrix, (rows, codes[closed]), amounts[closed])
+
+    months = [_month_label(first + offset) for offset in range(end - first)]
+    present = matrix.any(axis=0)
+    return months, [c for c, keep in zip(categories, present) if keep], matrix[:, present]
+
+
+def _design(steps: np.ndarray, month_of_year: np.ndarray, seasonal: bool) -> np.ndarray:
+    """Model inputs: linear time step, plus month-of-year indicators when seasonal."""
+    columns = [steps.reshape(-1, 1).astype(float)]
+    if seasonal:
+        columns.append(np.eye(12)[month_of_year])
+    return np.hstack(columns)
+
+
+def _fit_predict(model: str, history: np.ndarray, first_month: int, target_steps: np.ndarray) -> np.ndarray:
+    """Fit one model to every category column at once; predict the target steps."""
+    n = history.shape[0]
+    if model == 'mean':
+        window = history[-BACKTEST_MONTHS:]
+        return np.repeat(window.mean(axis=0, keepdims=True), len(target_steps), axis=0)
+    if model == 'naive':
+        return np.repeat(history[-1:], len(target_steps), axis=0)
+
+    # Imported on first fit; scikit-learn is slow to import
+    from sklearn.linear_model import LinearRegression, Ridge
+    seasonal = model == 'seasonal'
+    steps = np.arange(n)
+    x_train = _design(steps, (first_month + steps) % 12, seasonal)
+    x_target = _design(target_steps, (first_month + target_steps) % 12, seasonal)
+    regressor = Ridge(alpha=SEASONAL_ALPHA) if seasonal else LinearRegression()
+    regressor.fit(x_train, history)
+    return regressor.predict(x_target).reshape(len(target_steps), history.shape[1])
+
+
+def _candidates(n: int) -> List[str]:
+    if n < 2:
+        return ['naive']
+    models = ['trend']
+    if n >= BACKTEST_MIN_MONTHS:
+        models.append('mean')
+    if n >= SEASONAL_MIN_MONTHS:
+        models.append('seasonal')
+    return models
+
+
+def _choose_models(history: np.ndarray, first_month: int) -> Tuple[List[str], np.ndarray]:
+    """Pick the model with the lowest backtest error per category.
+
+    Returns (model per category, mean absolute error per category).
+    """
+    n, k = history.shape
+    candidates = _candidates(n)
+    if len(candidates) == 1:
+        return [candidates[0]] * k, np.full(k, np.nan)
+    train, test = history[:-BACKTEST_MONTHS], history[-BACKTEST_MONTHS:]
+    test_steps = np.arange(n - BACKTEST_MONTHS, n)
+    errors = np.vstack([
+        np.abs(_fit_predict(model, train, first_month, test_steps) - test).mean(axis=0)
+        for model in candidates
+    ])
+    best = errors.argmin(axis=0)
+    return [candidates[i] for i in best], errors[best, np.arange(k)]
+
+
+class ForecastService:
+    """Per-category monthly expense forecasts.
+
+    Every category is modelled at once: a linear trend, the recent mean, and
+    (with two years of history) trend plus month-of-year seasonality. The
+    model with the lowest backtest error is used per category. Only closed
+    months are modelled, so a fit is cached until the next month closes or
+    the closed months' data changes.
+    """
+
+    def __init__(self):
+        # (month, data version, closed-months version, result, etag) of the last fit
+        self._cache: Optional[Tuple[str, Any, Any, Dict[str, Any], str]] = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _current_month(today: Optional[datetime] = None) -> str:
+        today = today or datetime.utcnow()
+        return f"{today.year:04d}-{today.month:02d}"
+
+    def invalidate(self):
+        """Drop the cached fit (e.g. after correcting historical expenses)."""
+        with self._lock:
+            self._cache = None
+
+    def forecast(self, load_expenses: ExpenseLoader, today: Optional[datetime] = None,
+                 version: Any = None, closed_version: Optional[ClosedVersion] = None) -> Dict[str, Any]:
+        """Forecast next month's expenses per category and in total.
+
+        The fit is reused while the month and `version` (a cheap data
+        version, e.g. the expenses ledger's) are unchanged. When `version`
+        moves, `closed_version()` decides: the fit is only redone if the
+        closed months changed (a late or corrected entry), not for new
+        expenses this month. `load_expenses` is only called to refit.
+        """
+        current = self._current_month(today)
+        with self._lock:
+            if self._cache and self._cache[:2] == (current, version):
+                return self._cache[3]
+            closed = closed_version() if closed_version else None
+            if self._cache and self._cache[0] == current and self._cache[2] == closed:
+                self._cache = (current, version, *self._cache[2:])
+                return self._cache[3]
+            table, length = load_expenses()
+            result = self._fit(table, length, current)
+            digest = hashlib.sha256(json.dumps(result, sort_keys=True).encode('utf-8')).hexdigest()
+            self._cache = (current, version, closed, result, digest[:32])
+            return result
+    
+    def etag(self, today: Optional[datetime] = None, version: Any = None) -> Optional[str]:
+        """Content hash of the cached forecast for the current month and version, without fitting."""
+        current = self._current_month(today)
+        with self._lock:
+            if self._cache and self._cache[:2] == (current, version):
+                return self._cache[4]
+        return None
+
+    def _fit(self, table: ColumnarTable, length: int, current: str) -> Dict[str, Any]:
+        months, categories, matrix = monthly_matrix(table, length, before=current)
+        target = _month_label(_month_number(current) + 1)
+        n = len(months)
+        if n == 0:
+            return {'historicalData': {}, 'predictedNextMonth': 0, 'confidence': 'Low',
+                    'monthsAnalyzed': 0, 'forecastMonth': target, 'categories': {}}
+
+        first_month = _month_number(months[0])
+        models, errors = _choose_models(matrix, first_month)
+        target_step = np.array([_month_number(target) - first_month])
+        predictions = np.zeros(len(categories))
+        for model in set(models):
+            columns = [i for i, name in enumerate(models) if name == model]
+            predictions[columns] = _fit_predict(model, matrix[:, columns], first_month, target_step)[0]
+        predictions = np.maximum(predictions, 0)
+
+        if n >= 3:
+            confidence = 'High'
+        elif n == 2:
+            confidence = 'Medium'
+        else:
+            confidence = 'Low'
+
+        totals = matrix.sum(axis=1)
+        return {
+            'historicalData': {month: round(float(total), 2) for month, total in zip(months, totals)},
+            'predictedNextMonth': round(float(predictions.sum()), 2),
+            'confidence': confidence,
+            'monthsAnalyzed': n,
+            'forecastMonth': target,
+            'categories': {
+                category: {
+                    'predictedNextMonth': round(float(prediction), 2),
+                    'model': model,
+                    'backtestError': None if np.isnan(error) else round(float(error), 2),
+                    'lastMonth': round(float(matrix[-1, i]), 2),
+                }
+                for i, (category, model, prediction, error)
+                in enumerate(zip(categories, models, predictions, errors))
+            },
+        }
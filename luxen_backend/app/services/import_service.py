@@ -0,0 +1,176 @@
+from app.models.firestore_models import (
+    OwnerModel, ProductionModel, SalesModel,
+    ExpenseModel, WarrantyModel
+)
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Any, IO, Iterable, Iterator, List, Optional, Tuple
+import csv
+import io
+import json
+import math
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Collections that accept bulk imports
+IMPORTABLE_MODELS = {
+    'owners': OwnerModel,
+    'production': ProductionModel,
+    'sales': SalesModel,
+    'expenses': ExpenseModel,
+    'warranty': WarrantyModel,
+}
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+}
+# Fields parsed from ISO-8601 strings into timestamps
+TIMESTAMP_FIELDS = ('createdAt', 'updatedAt')
+# Rows handed to the model per add_many/upsert_many call
+IMPORT_CHUNK_ROWS = 5000
+# Line errors listed in the response (all are counted)
+MAX_REPORTED_ERRORS = 50
+# CSV columns never coerced to numbers or booleans (document IDs)
+CSV_TEXT_FIELDS = ('id',)
+
+# No leading zeros: codes such as phone numbers or '0001' stay text
+_NUMBER_PATTERN = re.compile(r'^-?(0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?$')
+
+Row = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def parse_timestamp(value: Any) -> Any:
+    """Datetime for an ISO-8601 string (a trailing 'Z' is accepted); other values unchanged."""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    return value
+
+
+def _reject_constant(name: str):
+    raise ValueError(f"Non-finite number '{name}' is not allowed")
+
+
+def _loads(text: str) -> Any:
+    """json.loads that rejects NaN and Infinity."""
+    return json.loads(text, parse_constant=_reject_constant)
+
+
+def coerce_csv_value(value: str) -> Any:
+    """Interpret a CSV cell: JSON arrays/objects, numbers and booleans; otherwise text."""
+    text = value.strip()
+    if text[:1] in ('[', '{'):
+        return _loads(text)
+    if _NUMBER_PATTERN.match(text):
+        if text.lstrip('-').isdigit() and abs(int(text)) < 2 ** 63:
+            return int(text)
+        number = float(text)
+        if not math.isfinite(number):
+            raise ValueError(f"Number '{text}' is out of range")
+        return number
+    if text.lower() in ('true', 'false'):
+        return text.lower() == 'true'
+    return value
+
+
+def _normalize(doc: Any) -> Dict[str, Any]:
+    if not isinstance(doc, dict):
+        raise ValueError('Each record must be a JSON object')
+    for field in TIMESTAMP_FIELDS:
+        if field in doc:
+            doc[field] = parse_timestamp(doc[field])
+    return doc
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[Row]:
+    """Yield (line number, document or None, error or None) per non-blank line."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, _normalize(_loads(line)), None
+        except ValueError as e:
+            yield number, None, str(e)
+
+
+def parse_csv(lines: Iterable[str], text_fields: Iterable[str] = CSV_TEXT_FIELDS) -> Iterator[Row]:
+    """Yield (line number, document or None, error or None) per CSV record after the header.
+
+    Cells of `text_fields` are kept as text; the rest go through `coerce_csv_value`.
+    """
+    text_fields = set(text_fields)
+    reader = csv.DictReader(lines)
+    for record in reader:
+        try:
+            doc = {field: value if field in text_fields else coerce_csv_value(value)
+                   for field, value in record.items() if field and value not in (None, '')}
+            yield reader.line_num, _normalize(doc), None
+        except ValueError as e:
+            yield reader.line_num, None, str(e)
+
+
+class ImportService:
+    """Streams NDJSON or CSV uploads into a collection with batched writes."""
+
+    @staticmethod
+    def detect_format(content_type: Optional[str], requested: Optional[str] = None) -> Optional[str]:
+        """Format from an explicit `format` value or the request Content-Type."""
+        if requested:
+            return requested.lower() if requested.lower() in FORMATS else None
+        media_type = (content_type or '').split(';')[0].strip().lower()
+        return CONTENT_TYPES.get(media_type)
+
+    def import_stream(self, collection: str, stream: IO[bytes], fmt: str,
+                      mode: str = 'add') -> Dict[str, Any]:
+        """Import every record of a binary stream without buffering it.
+
+        `mode='add'` generates document IDs (an `id` field is dropped);
+        `mode='upsert'` uses the `id` field as the document ID.
+        """
+        if collection not in IMPORTABLE_MODELS:
+            return {'success': False, 'error': f"Collection '{collection}' cannot be imported"}
+        if fmt not in FORMATS:
+            return {'success': False, 'error': 'Format must be ndjson or csv'}
+        if mode not in ('add', 'upsert'):
+            return {'success': False, 'error': "Mode must be 'add' or 'upsert'"}
+
+        model = IMPORTABLE_MODELS[collection]()
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        rows = parse_ndjson(text) if fmt == 'ndjson' else parse_csv(text)
+        stats = {'imported': 0, 'skipped': 0}
+        errors: List[Dict[str, Any]] = []
+
+        def valid_docs() -> Iterator[Dict[str, Any]]:
+            for line, doc, error in rows:
+                if error is not None:
+                    stats['skipped'] += 1
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append({'line': line, 'error': error})
+                    continue
+                if mode == 'add':
+                    doc.pop('id', None)
+                yield doc
+
+        docs = valid_docs()
+        try:
+            while True:
+                chunk = list(islice(docs, IMPORT_CHUNK_ROWS))
+                if not chunk:
+                    break
+                if mode == 'add':
+                    model.add_many(chunk)
+                else:
+                    model.upsert_many(chunk)
+                stats['imported'] += len(chunk)
+        except UnicodeDecodeError as e:
+            return {'success': False, 'error': f"Upload is not valid UTF-8: {str(e)}",
+                    'collection': collection, **stats, 'errors': errors}
+        except Exception as e:
+            logger.error(f"Error importing into {collection}: {str(e)}")
+            return {'success': False, 'error': str(e), 'collection': collection, **stats, 'errors': errors}
+
+        return {'success': True, 'collection': collection, **stats, 'errors': errors}
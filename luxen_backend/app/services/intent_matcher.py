@@ -0,0 +1,107 @@
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Intents in priority order: when a message matches several, the first wins.
+# English keywords marked True also match common inflections ('sale' ->
+# 'sales', 'claim' -> 'claimed'); Bangla keywords always accept the suffixes
+# below ('খরচ' -> 'খরচের'), since Bangla attaches case markers to the word.
+INTENTS: List[Tuple[str, List[Tuple[str, bool]]]] = [
+    ('sales', [('sale', True), ('revenue', True), ('বিক্রয়', True), ('আয়', True)]),
+    ('profit', [('profit', True), ('loss', True), ('লাভ', True), ('ক্ষতি', True)]),
+    ('expense', [('expense', True), ('cost', True), ('খরচ', True)]),
+    ('production', [('production', True), ('batch', True), ('উৎপাদন', True), ('ব্যাচ', True)]),
+    ('warranty', [('warranty', False), ('warranties', False), ('claim', True),
+                  ('ওয়ারেন্টি', True), ('দাবি', True)]),
+    ('owner', [('owner', True), ('ownership', False), ('investment', True), ('share', True),
+               ('মালিক', True), ('বিনিয়োগ', True), ('অংশ', True)]),
+    ('greeting', [('hello', False), ('hi', False), ('হ্যালো', True), ('হাই', True), ('নমস্কার', True)]),
+    ('help', [('help', True), ('what can', False), ('সাহায্য', True), ('কি করতে পারি', True),
+              ('কী করতে পারি', True)]),
+]
+
+# Suffixes accepted after inflectable English keywords
+ENGLISH_SUFFIXES = ('s', 'es', 'd', 'ed', 'ing', 'able')
+# Case markers, plurals, classifiers and particles accepted after Bangla keywords;
+# any other following letter means the keyword is only the start of a longer
+# word ('আয়' does not match 'আয়না' or 'আয়োজন')
+BANGLA_SUFFIXES = ('ের', 'এর', 'য়ের', 'র', 'ে', 'য়', 'তে', 'কে', 'রে', 'দের', 'রা', 'রাই',
+                   'গুলো', 'গুলি', 'গুলোর', 'গুলির', 'টা', 'টি', 'টার', 'টির', 'ও', 'ই')
+
+BANGLA_PATTERN = re.compile(r'[\u0980-\u09FF]')
+_WORD_CHAR = r'[\w\u0980-\u09FF]'
+_ZERO_WIDTH = dict.fromkeys(map(ord, '\u200b\u200c\u200d\ufeff'))
+# Khanda ta written as ta + hasanta + ZWJ (older keyboards)
+_KHANDA_TA = ('\u09a4\u09cd\u200d', '\u09ce')
+
+
+def normalize(text: str) -> str:
+    """Canonical form for matching: NFC (nukta letters decomposed), case-folded,
+    khanda ta unified and zero-width characters dropped."""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFC', text).casefold()
+    return text.replace(*_KHANDA_TA).translate(_ZERO_WIDTH)
+
+
+def detect_language(text: str) -> str:
+    """'bn' if the text contains any Bangla character, else 'en'."""
+    return 'bn' if BANGLA_PATTERN.search(text) else 'en'
+
+
+def _keyword_pattern(keyword: str, inflect: bool) -> str:
+    keyword = normalize(keyword)
+    body = r'\s+'.join(re.escape(part) for part in keyword.split(' '))
+    if BANGLA_PATTERN.search(keyword):
+        # Bangla suffixes attach directly; longest first so 'ের' is tried before 'ে'
+        suffixes = sorted({normalize(suffix) for suffix in BANGLA_SUFFIXES}, key=len, reverse=True)
+        ending = f"(?:{'|'.join(map(re.escape, suffixes))})?"
+    elif inflect:
+        ending = f"(?:{'|'.join(ENGLISH_SUFFIXES)})?"
+    else:
+        ending = ''
+    return f'{body}{ending}(?!{_WORD_CHAR})'
+
+
+class IntentMatcher:
+    """Classifies chat messages into intents with one compiled pattern.
+
+    Every keyword of every intent is an alternative of a single regular
+    expression, with one named group per intent, so a message is scanned
+    once however many keywords there are. Keywords match whole words only
+    ('hi' does not match 'this' or 'shipping').
+    """
+
+    def __init__(self, intents: Iterable[Tuple[str, Iterable[Tuple[str, bool]]]] = INTENTS):
+        self.intents = [name for name, _ in intents]
+        self._priority = {name: i for i, name in enumerate(self.intents)}
+        groups = []
+        for name, keywords in intents:
+            # Longest first, so the most specific keyword is reported
+            alternatives = sorted((_keyword_pattern(k, inflect) for k, inflect in keywords),
+                                  key=len, reverse=True)
+            groups.append(f"(?P<{name}>{'|'.join(alternatives)})")
+        # The word-start check is shared, so positions inside words fail at once
+        self._pattern = re.compile(f"(?<!{_WORD_CHAR})(?:{'|'.join(groups)})")
+
+    def matches(self, text: str) -> Dict[str, str]:
+        """Every intent found in the text, with the first keyword that matched it."""
+        found: Dict[str, str] = {}
+        for match in self._pattern.finditer(normalize(text)):
+            found.setdefault(match.lastgroup, match.group())
+        return found
+
+    def classify(self, text: str) -> Optional[str]:
+        """Highest-priority intent in the text, or None."""
+        found = self.matches(text)
+        if not found:
+            return None
+        return min(found, key=self._priority.__getitem__)
+
+    def classify_many(self, texts: Iterable[str]) -> List[Dict[str, Optional[str]]]:
+        """Intent and language for each message, in order."""
+        return [{'intent': self.classify(text), 'language': detect_language(text)} for text in texts]
+
+
+# Compiled once at import; shared by every request
+INTENT_MATCHER = IntentMatcher()
@@ -0,0 +1,414 @@
+from app.models.firestore_models import JobModel, MaterializedModel, add_write_listener
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, List, Optional, Set, Tuple
+import hashlib
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Serve owner shares, forecasts and reports from results computed off the request path
+JOBS_ENABLED = os.getenv('JOBS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Threads running jobs in each process
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+# Where queued jobs wait: 'local' (in-process) is the only queue so far
+JOB_QUEUE = os.getenv('JOB_QUEUE', 'local').lower()
+# Writes within this many seconds of each other trigger one recomputation
+JOB_DEBOUNCE_SECONDS = float(os.getenv('JOB_DEBOUNCE_SECONDS', 2))
+# A job another process started this recently is assumed to still be running
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', 120))
+
+
+class JobFailed(RuntimeError):
+    """Raised when a result is requested whose only computation failed."""
+
+
+class JobQueue:
+    """Job keys waiting for a worker.
+
+    A key already waiting is not queued twice. Implementations backed by a
+    shared queue (Cloud Tasks, Pub/Sub) let several instances split work.
+    """
+
+    def put(self, key: str) -> bool:
+        """Queue a key; False if it was already queued."""
+        raise NotImplementedError
+
+    def get(self, timeout: float) -> Optional[str]:
+        """Next key, or None if none arrives within `timeout` seconds."""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class LocalJobQueue(JobQueue):
+    """In-process FIFO queue; each process runs the jobs it queues."""
+
+    def __init__(self):
+        self._keys = deque()
+        self._queued: Set[str] = set()
+        self._cond = threading.Condition()
+
+    def put(self, key: str) -> bool:
+        with self._cond:
+            if key in self._queued:
+                return False
+            self._queued.add(key)
+            self._keys.append(key)
+            self._cond.notify()
+            return True
+
+    def get(self, timeout: float) -> Optional[str]:
+        with self._cond:
+            if not self._keys:
+                self._cond.wait(timeout)
+            if not self._keys:
+                return None
+            key = self._keys.popleft()
+            self._queued.discard(key)
+            return key
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._keys)
+
+
+def create_job_queue(name: str) -> JobQueue:
+    """Instantiate a job queue by name."""
+    if name == 'local':
+        return LocalJobQueue()
+    raise ValueError(f"Unknown job queue '{name}'")
+
+
+class JobSpec:
+    """A kind of job: what it computes and when it is stale.
+
+    Keys are `name` or `name:arg`; `compute(*args)` returns the result (a
+    dict with `success`) and `stamp(*args)` a version of its inputs, so a
+    result computed at the same stamp is not recomputed. Writes to
+    `sources` and every `interval` seconds recompute the keys returned by
+    `scheduled()`.
+    """
+
+    def __init__(self, name: str, compute: Callable[..., Dict[str, Any]],
+                 stamp: Optional[Callable[..., Optional[str]]] = None, sources: Iterable[str] = (),
+                 interval: Optional[float] = None, scheduled: Optional[Callable[[], List[str]]] = None):
+        self.name = name
+        self.compute = compute
+        self.stamp = stamp
+        self.sources = tuple(sources)
+        self.interval = interval
+        self.scheduled = scheduled or (lambda: [name])
+
+
+def _naive(value: Any) -> Any:
+    # SQLite returns aware datetimes; everything here is UTC
+    return value.replace(tzinfo=None) if isinstance(value, datetime) else value
+
+
+class JobRunner:
+    """Precomputes expensive results in background threads and serves the latest.
+
+    Results are stored in the `materialized` collection, so every process
+    (and the next deploy) can serve them, and each run is recorded in the
+    `jobs` table. A scheduler thread queues jobs on their interval and
+    shortly after writes to their sources; JOB_WORKERS threads run them.
+    A key is queued at most once, and one queued while it runs is run
+    again afterwards. Runs are skipped when the stored result already has
+    the current input stamp or another process holds a recent lease.
+    """
+
+    def __init__(self, queue: JobQueue, workers: int = JOB_WORKERS):
+        self.queue = queue
+        self.workers = workers
+        self.specs: Dict[str, JobSpec] = {}
+        self.job_model = JobModel()
+        self.materialized_model = MaterializedModel()
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._errors: Dict[str, str] = {}
+        # key -> monotonic time it should be queued
+        self._due: Dict[str, float] = {}
+        self._last_scheduled: Dict[str, float] = {}
+        self._running: Set[str] = set()
+        self._rerun: Set[str] = set()
+        self._counts = {'runs': 0, 'skipped': 0, 'failed': 0}
+        self._pid: Optional[int] = None
+        self._cond = threading.Condition()
+
+    def register(self, spec: JobSpec):
+        self.specs[spec.name] = spec
+        for source in spec.sources:
+            add_write_listener(source, lambda doc_id, data, merge, spec=spec: self.trigger(spec))
+
+    def _spec(self, key: str) -> Tuple[JobSpec, List[str]]:
+        name, *args = key.split(':')
+        if name not in self.specs:
+            raise KeyError(f"Unknown job '{name}'")
+        return self.specs[name], args
+
+    # ---- scheduling --------------------------------------------------
+
+    def start(self):
+        """Start the scheduler and worker threads in this process (once per process)."""
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            # Threads do not survive fork: a worker inheriting a runner starts its own
+            self._pid = os.getpid()
+            self._running.clear()
+            self._rerun.clear()
+            threading.Thread(target=self._schedule, name='job-scheduler', daemon=True).start()
+            for index in range(self.workers):
+                threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True).start()
+
+    def trigger(self, spec: JobSpec):
+        """Recompute a job's scheduled keys after JOB_DEBOUNCE_SECONDS (writes coalesce)."""
+        due = time.monotonic() + JOB_DEBOUNCE_SECONDS
+        with self._cond:
+            for key in spec.scheduled():
+                self._due[key] = min(self._due.get(key, due), due)
+            self._cond.notify_all()
+
+    def submit(self, key: str) -> bool:
+        """Queue a key now; False if it is already queued."""
+        self._spec(key)
+        self.start()
+        return self.queue.put(key)
+
+    def _schedule(self):
+        while True:
+            try:
+                now = time.monotonic()
+                for spec in list(self.specs.values()):
+                    if spec.interval is None:
+                        continue
+                    for key in spec.scheduled():
+                        if now - self._last_scheduled.get(key, float('-inf')) >= spec.interval:
+                            self._last_scheduled[key] = now
+                            with self._cond:
+                                self._due[key] = min(self._due.get(key, now), now)
+                with self._cond:
+                    ready = [key for key, due in self._due.items() if due <= now]
+                    for key in ready:
+                        del self._due[key]
+                    wait = min([due - now for due in self._due.values()] + [1.0])
+                for key in ready:
+                    self.queue.put(key)
+                with self._cond:
+                    self._cond.wait(max(0.05, wait))
+            except Exception as e:
+                logger.error(f"Job scheduler failed: {str(e)}")
+                time.sleep(1)
+
+    def _work(self):
+        while True:
+            key = self.queue.get(timeout=1.0)
+            if key is None:
+                continue
+            try:
+                self.run(key)
+            except Exception:
+                # Logged and recorded by run()
+                pass
+
+    # ---- running -----------------------------------------------------
+
+    def _count(self, outcome: str):
+        # Workers and request threads finish runs concurrently
+        with self._cond:
+            self._counts[outcome] += 1
+
+    def _leased_elsewhere(self, key: str) -> bool:
+        job = self.job_model.get(key)
+        if not job or job.get('status') != 'running' or job.get('pid') == os.getpid():
+            return False
+        started = _naive(job.get('startedAt'))
+        return isinstance(started, datetime) and \
+            (datetime.utcnow() - started).total_seconds() < JOB_LEASE_SECONDS
+
+    def run(self, key: str, force: bool = False) -> Optional[Dict[str, Any]]:
+        """Compute and store one result now; returns the materialized document.
+
+        Returns the stored result without computing if it is current, and
+        None if the key is already running (it will run again afterwards).
+        """
+        spec, args = self._spec(key)
+        with self._cond:
+            if key in self._running:
+                self._rerun.add(key)
+                return None
+            self._running.add(key)
+        try:
+            # Taken before computing, so a write racing with it makes the result stale
+            stamp = spec.stamp(*args) if spec.stamp else None
+            current = self.latest(key, refresh=True)
+            if not force and current is not None and stamp is not None and current.get('stamp') == stamp:
+                self._count('skipped')
+                return current
+            if not force and self._leased_elsewhere(key):
+                self._count('skipped')
+                return current
+
+            started_at = datetime.utcnow()
+            job = {'key': key, 'name': spec.name, 'status': 'running', 'pid': os.getpid(),
+                   'startedAt': started_at, 'stamp': stamp}
+            self.job_model.record(key, job)
+            started = time.perf_counter()
+            try:
+                result = spec.compute(*args)
+                if not result.get('success', True):
+                    raise JobFailed(result.get('error') or 'Job failed')
+            except Exception as e:
+                with self._cond:
+                    self._counts['failed'] += 1
+                    self._errors[key] = str(e)
+                logger.error(f"Job {key} failed: {str(e)}")
+                self.job_model.record(key, {**job, 'status': 'failed', 'error': str(e),
+                                            'finishedAt': datetime.utcnow()})
+                raise
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            doc = {'key': key, 'result': result, 'stamp': stamp,
+                   'computedAt': datetime.utcnow(), 'durationMs': duration_ms}
+            self.materialized_model.save(key, doc)
+            self.job_model.record(key, {**job, 'status': 'done', 'finishedAt': doc['computedAt'],
+                                        'durationMs': duration_ms})
+            with self._cond:
+                self._results[key] = doc
+                self._errors.pop(key, None)
+                self._counts['runs'] += 1
+            return doc
+        finally:
+            with self._cond:
+                self._running.discard(key)
+                rerun = key in self._rerun
+                self._rerun.discard(key)
+                self._cond.notify_all()
+            if rerun:
+                self.queue.put(key)
+
+    # ---- serving -----------------------------------------------------
+
+    def latest(self, key: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Latest materialized result (this process's copy unless `refresh`)."""
+        with self._cond:
+            doc = self._results.get(key)
+        if doc is None or refresh:
+            stored = self.materialized_model.get(key)
+            if stored is not None and (doc is None or _naive(stored['computedAt']) > _naive(doc['computedAt'])):
+                doc = {**stored, 'computedAt': _naive(stored['computedAt'])}
+                with self._cond:
+                    self._results[key] = doc
+        return doc
+
+    def serve(self, key: str) -> Dict[str, Any]:
+        """The result to answer a request with.
+
+        A stale result is still served while a recomputation is queued. A
+        result that was never computed is computed on the caller's thread
+        (or, if this process is already computing it, waited for), so the
+        jobs only keep results warm and requests always get one.
+        """
+        spec, args = self._spec(key)
+        self.start()
+        doc = self.latest(key)
+        stamp = spec.stamp(*args) if spec.stamp else None
+        if doc is not None and (stamp is None or doc.get('stamp') == stamp):
+            # Unversioned results are refreshed on their schedule only
+            return doc
+        if doc is not None:
+            # Another process may already have stored the current result
+            doc = self.latest(key, refresh=True)
+            if doc.get('stamp') == stamp:
+                return doc
+        if doc is not None:
+            self.submit(key)
+            return doc
+        with self._cond:
+            self._errors.pop(key, None)
+        # Nothing is stored, so a lease held by another process is not waited for
+        doc = self.run(key, force=True)
+        if doc is not None:
+            return doc
+        with self._cond:
+            while key not in self._results and key not in self._errors:
+                self._cond.wait(1.0)
+            if key in self._errors:
+                raise JobFailed(self._errors[key])
+            return self._results[key]
+
+    @staticmethod
+    def etag(doc: Dict[str, Any]) -> str:
+        """Strong ETag of a materialized result (it changes whenever the result is replaced)."""
+        key = f"{doc['key']}|{_naive(doc['computedAt']).isoformat()}"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+    @staticmethod
+    def age(doc: Dict[str, Any]) -> float:
+        """Seconds since a result was computed."""
+        return max(0.0, (datetime.utcnow() - _naive(doc['computedAt'])).total_seconds())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {'enabled': JOBS_ENABLED, 'queue': JOB_QUEUE, 'queued': len(self.queue),
+                    'running': sorted(self._running), 'workers': self.workers,
+                    'started': self._pid == os.getpid(), **self._counts,
+                    'results': {key: round(self.age(doc), 1) for key, doc in self._results.items()}}
+
+
+def current_month_key(name: str, now: Optional[datetime] = None) -> str:
+    """Job key of a monthly job for the current UTC month, e.g. `monthly-report:2024-01`."""
+    now = now or datetime.utcnow()
+    return f"{name}:{now.year:04d}-{now.month:02d}"
+
+
+def default_jobs() -> List[JobSpec]:
+    """Owner shares, the expense forecast and the current month's report."""
+    from app.services.business_service import BusinessService, OWNER_SHARE_SOURCES
+    from app.services.report_service import ReportService, month_closed
+    business_service = BusinessService()
+    report_service = ReportService()
+    report_models = (report_service.owner_model, report_service.sales_model,
+                     report_service.expense_model, report_service.production_model)
+
+    def report(month: str) -> Dict[str, Any]:
+        year, number = month.split('-')
+        return report_service.get_monthly_report(int(year), int(number))
+
+    def report_stamp(month: str) -> str:
+        # A closed month is served from its stored rollup and does not follow
+        # writes: its result is computed once after the month closes
+        year, number = month.split('-')
+        if month_closed(int(year), int(number)):
+            return f"closed:{month}"
+        return ','.join(f"{model.collection_name}={model.ledger.version()}" for model in report_models)
+
+    return [
+        JobSpec('owner-shares', business_service.calculate_owner_shares,
+                stamp=lambda: business_service.data_etag('owner-shares', OWNER_SHARE_SOURCES),
+                sources=OWNER_SHARE_SOURCES, interval=300),
+        # Refits only for a new month or a change to a closed one; other writes are cheap
+        JobSpec('expense-forecast', business_service.predict_next_month_expenses,
+                stamp=business_service.forecast_stamp, sources=('expenses',), interval=3600),
+        JobSpec('monthly-report', report, stamp=report_stamp,
+                sources=tuple(model.collection_name for model in report_models), interval=300,
+                scheduled=lambda: [current_month_key('monthly-report')]),
+    ]
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """The process-wide runner with the default jobs, created on first use."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(create_job_queue(JOB_QUEUE))
+            for spec in default_jobs():
+                _runner.register(spec)
+        return _runner
@@ -0,0 +1,259 @@
+from app.models.firestore_models import add_write_listener
+from app.models.ledger import AggregateLedger
+from typing import Dict, Any, Optional, Set, Tuple
+import itertools
+import os
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between pushes; writes in between are coalesced into one delta
+LIVE_METRICS_INTERVAL = float(os.getenv('LIVE_METRICS_INTERVAL', 0.5))
+# Without change listeners (e.g. SQLite), metrics are recomputed this often
+LIVE_METRICS_POLL_SECONDS = float(os.getenv('LIVE_METRICS_POLL_SECONDS', 10))
+# Listeners stay up this long after the last client leaves (avoids reloading on page refresh)
+LIVE_METRICS_IDLE_SECONDS = float(os.getenv('LIVE_METRICS_IDLE_SECONDS', 300))
+# Events buffered per client before it is resynchronised with a full snapshot
+LIVE_METRICS_QUEUE_SIZE = int(os.getenv('LIVE_METRICS_QUEUE_SIZE', 100))
+LISTENER_READY_TIMEOUT = float(os.getenv('LIVE_METRICS_LISTENER_TIMEOUT', 10))
+
+def metrics_from_totals(totals: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Dashboard metrics (as in `get_dashboard_metrics`) from ledger-shaped totals."""
+    sales, production = totals['sales'], totals['production']
+    expenses, warranty = totals['expenses'], totals['warranty']
+    return {
+        'totalSales': sales['totalAmount'],
+        'totalExpenses': expenses['amount'],
+        'totalProduction': production['totalCost'],
+        'profitLoss': sales['totalAmount'] - production['totalCost'] - expenses['amount'],
+        'salesCount': sales['count'],
+        'expenseCount': expenses['count'],
+        'productionCount': production['count'],
+        'warrantyCount': warranty['count'],
+        'warrantyReplaced': warranty['replacedCount'],
+        'warrantyPending': warranty['count'] - warranty['replacedCount'],
+        'expensesByCategory': AggregateLedger.groups(expenses, 'amount'),
+    }
+
+
+class LiveMetricsHub:
+    """Pushes dashboard metric changes to every connected client.
+
+    One set of change listeners per process (`on_snapshot` on Firestore)
+    keeps running totals for the four business collections, updated from
+    each document change with the collections' ledger deltas. A single
+    broadcaster thread turns changes into metric deltas, at most once per
+    LIVE_METRICS_INTERVAL, and fans them out to per-client queues. Backend
+    work therefore scales with the write rate, not with the number of
+    viewers. Backends without listeners fall back to one shared recompute
+    every LIVE_METRICS_POLL_SECONDS, and immediately after local writes.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.models = {
+            'sales': service.sales_model,
+            'production': service.production_model,
+            'expenses': service.expense_model,
+            'warranty': service.warranty_model,
+        }
+        self.mode: Optional[str] = None
+        self._docs: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._totals: Dict[str, Dict[str, Any]] = {}
+        self._metrics: Optional[Dict[str, Any]] = None
+        self._subscribers: Set[queue.Queue] = set()
+        self._watches = []
+        self._thread: Optional[threading.Thread] = None
+        self._dirty = False
+        self._idle_since: Optional[float] = None
+        self._sequence = itertools.count(1)
+        self._cond = threading.Condition()
+        for name in self.models:
+            add_write_listener(name, lambda doc_id, data, merge: self._mark_dirty())
+
+    # ---- subscribers -------------------------------------------------
+
+    def subscribe(self) -> queue.Queue:
+        """Register a client; its queue starts with a snapshot once metrics are known."""
+        events = queue.Queue(LIVE_METRICS_QUEUE_SIZE)
+        with self._cond:
+            self._subscribers.add(events)
+            self._idle_since = None
+            if self._metrics is not None:
+                events.put_nowait(('snapshot', dict(self._metrics), next(self._sequence)))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='live-metrics', daemon=True)
+                self._thread.start()
+        return events
+
+    def unsubscribe(self, events: queue.Queue):
+        with self._cond:
+            self._subscribers.discard(events)
+            if not self._subscribers:
+                self._idle_since = time.monotonic()
+            self._cond.notify_all()
+
+    def _publish(self, event: str, payload: Dict[str, Any]):
+        """Queue an event for every client; a client that fell behind gets a fresh snapshot."""
+        sequence = next(self._sequence)
+        for events in list(self._subscribers):
+            try:
+                events.put_nowait((event, payload, sequence))
+            except queue.Full:
+                while True:
+                    try:
+                        events.get_nowait()
+                    except queue.Empty:
+                        break
+                events.put_nowait(('snapshot', dict(self._metrics), sequence))
+
+    # ---- change listeners --------------------------------------------
+
+    def _fields(self, name: str) -> Tuple[str, ...]:
+        ledger = self.models[name].ledger
+        return ledger.sum_fields + ledger.flag_fields + ((ledger.group_field,) if ledger.group_field else ())
+
+    def _project(self, name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        # Never empty, so the ledger delta counts the document as present
+        return {'present': True, **{field: data.get(field) for field in self._fields(name)}}
+
+    def _mark_dirty(self):
+        with self._cond:
+            self._dirty = True
+            self._cond.notify_all()
+
+    def _on_reset(self, name: str, docs: Dict[str, Dict[str, Any]]):
+        ledger = self.models[name].ledger
+        projected = {doc_id: self._project(name, data or {}) for doc_id, data in docs.items()}
+        totals = ledger.empty()
+        for key, value in ledger.batch_delta((None, doc) for doc in projected.values()).items():
+            totals[key] = totals.get(key, 0) + value
+        with self._cond:
+            self._docs[name] = projected
+            self._totals[name] = totals
+            self._dirty = True
+            self._cond.notify_all()
+
+    def _on_change(self, name: str, doc_id: str, data: Optional[Dict[str, Any]]):
+        ledger = self.models[name].ledger
+        new = self._project(name, data) if data is not None else None
+        with self._cond:
+            docs = self._docs.setdefault(name, {})
+            old = docs.pop(doc_id, None)
+            if new is not None:
+                docs[doc_id] = new
+            totals = self._totals.setdefault(name, ledger.empty())
+            for key, value in ledger.delta(old, new).items():
+                totals[key] = totals.get(key, 0) + value
+            self._dirty = True
+            self._cond.notify_all()
+
+    def _start_listeners(self) -> bool:
+        """Subscribe to the four collections and wait for their initial snapshots."""
+        try:
+            for name, model in self.models.items():
+                ready = threading.Event()
+
+                def on_reset(docs, name=name, ready=ready):
+                    self._on_reset(name, docs)
+                    ready.set()
+
+                watch = model.backend.watch(name, on_reset,
+                                            lambda doc_id, data, name=name: self._on_change(name, doc_id, data))
+                if watch is None:
+                    logger.info("Backend cannot push changes, live metrics poll instead")
+                    break
+                self._watches.append(watch)
+                if not ready.wait(LISTENER_READY_TIMEOUT):
+                    logger.warning(f"Listener for {name} not ready, live metrics poll instead")
+                    break
+            else:
+                return True
+        except Exception as e:
+            logger.warning(f"Listeners unavailable, live metrics poll instead: {str(e)}")
+        self._stop_listeners()
+        return False
+
+    def _stop_listeners(self):
+        for watch in self._watches:
+            watch.unsubscribe()
+        self._watches = []
+        self._docs = {}
+        self._totals = {}
+
+    # ---- broadcaster -------------------------------------------------
+
+    def _compute(self) -> Optional[Dict[str, Any]]:
+        if self.mode == 'listeners':
+            with self._cond:
+                return metrics_from_totals(self._totals)
+        result = self.service.get_dashboard_metrics()
+        return result['metrics'] if result.get('success') else None
+
+    def _should_stop(self) -> bool:
+        return (not self._subscribers and self._idle_since is not None
+                and time.monotonic() - self._idle_since >= LIVE_METRICS_IDLE_SECONDS)
+
+    def _run(self):
+        """Broadcaster thread: compute, diff and publish until idle."""
+        self.mode = 'listeners' if self._start_listeners() else 'polling'
+        self._dirty = True
+        try:
+            while True:
+                with self._cond:
+                    timeout = LIVE_METRICS_POLL_SECONDS if self.mode == 'polling' else LIVE_METRICS_IDLE_SECONDS
+                    if not self._dirty and not self._should_stop():
+                        self._cond.wait(timeout)
+                    if self._should_stop():
+                        return
+                    if self.mode == 'listeners' and not self._dirty:
+                        continue
+                    self._dirty = False
+
+                metrics = self._compute()
+                if metrics is not None:
+                    with self._cond:
+                        previous, self._metrics = self._metrics, metrics
+                        if previous is None:
+                            self._publish('snapshot', dict(metrics))
+                        else:
+                            changed = {key: value for key, value in metrics.items() if previous.get(key) != value}
+                            if changed:
+                                self._publish('delta', changed)
+                # Writes arriving meanwhile are coalesced into the next delta
+                time.sleep(LIVE_METRICS_INTERVAL)
+        except Exception as e:
+            logger.error(f"Live metrics broadcaster failed: {str(e)}")
+            # Back off before the restart below
+            time.sleep(LIVE_METRICS_POLL_SECONDS)
+        finally:
+            with self._cond:
+                self._stop_listeners()
+                self._metrics = None
+                self._thread = None
+                self.mode = None
+                # Clients still connected get a new broadcaster
+                if self._subscribers:
+                    self._thread = threading.Thread(target=self._run, name='live-metrics', daemon=True)
+                    self._thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {'clients': len(self._subscribers), 'mode': self.mode,
+                    'running': self._thread is not None}
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_live_metrics_hub(service) -> LiveMetricsHub:
+    """The process-wide hub, created on first use."""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = LiveMetricsHub(service)
+        return _hub
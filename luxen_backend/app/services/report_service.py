@@ -0,0 +1,203 @@
+from app.models.backends.base import numeric_value
+from app.models.firestore_models import (
+    OwnerModel, ProductionModel, SalesModel,
+    ExpenseModel, ReportModel
+)
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Documents written within this many seconds may still be in flight, so the
+# current month's stored rollup only extends to `now - REPORT_SETTLE_SECONDS`
+REPORT_SETTLE_SECONDS = int(os.getenv('REPORT_SETTLE_SECONDS', 60))
+
+
+def month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
+    """Start (inclusive) and end (exclusive) of a calendar month in UTC."""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def month_closed(year: int, month: int, now: Optional[datetime] = None) -> bool:
+    """Whether a month ended more than REPORT_SETTLE_SECONDS ago, so its documents are final."""
+    now = now or datetime.utcnow()
+    return month_bounds(year, month)[1] <= now - timedelta(seconds=REPORT_SETTLE_SECONDS)
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {
+        'totalSales': 0, 'salesCount': 0,
+        'totalExpenses': 0, 'expenseCount': 0, 'expensesByCategory': {},
+        'productionCost': 0, 'productionCount': 0,
+    }
+
+
+def _add_totals(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine the totals of two adjacent time windows."""
+    merged = {key: a[key] + b[key] for key in a if key != 'expensesByCategory'}
+    categories = dict(a['expensesByCategory'])
+    for category, amount in b['expensesByCategory'].items():
+        categories[category] = categories.get(category, 0) + amount
+    merged['expensesByCategory'] = categories
+    return merged
+
+
+class ReportService:
+    """Monthly reports, materialized as rollups in the `reports` collection.
+
+    A closed month is computed once from `createdAt` range queries and then
+    served from its stored rollup (one document read). The current month's
+    rollup is extended incrementally with documents created since it was
+    last computed. Months are calendar months in UTC.
+    """
+
+    def __init__(self):
+        self.owner_model = OwnerModel()
+        self.production_model = ProductionModel()
+        self.sales_model = SalesModel()
+        self.expense_model = ExpenseModel()
+        self.report_model = ReportModel()
+
+    def _ledger_versions(self) -> Dict[str, int]:
+        return {
+            model.collection_name: model.ledger.version()
+            for model in (self.sales_model, self.expense_model, self.production_model)
+        }
+
+    def compute_totals(self, start: datetime, end: datetime) -> Dict[str, Any]:
+        """Sales, expenses and production for documents created in [start, end)."""
+        where = [('createdAt', '>=', start), ('createdAt', '<', end)]
+        sales = self.sales_model.aggregate(['totalAmount'], where=where)
+        production = self.production_model.aggregate(['totalCost'], where=where)
+
+        # Expenses are streamed (projected) for the per-category breakdown
+        totals = _empty_totals()
+        for expense in self.expense_model.between(start, end).select(['amount', 'category']).stream():
+            amount = numeric_value(expense.get('amount'))
+            category = expense.get('category') or 'Other'
+            totals['totalExpenses'] += amount
+            totals['expenseCount'] += 1
+            totals['expensesByCategory'][category] = totals['expensesByCategory'].get(category, 0) + amount
+
+        totals.update({
+            'totalSales': sales['totalAmount'], 'salesCount': sales['count'],
+            'productionCost': production['totalCost'], 'productionCount': production['count'],
+        })
+        return totals
+
+    @staticmethod
+    def _owner_shares(profit_loss: float, owners: List[Dict[str, Any]]) -> Dict[str, float]:
+        """Split a month's profit or loss by investment share."""
+        total_investment = sum(numeric_value(o.get('investmentAmount')) for o in owners)
+        if total_investment <= 0:
+            return {}
+        return {
+            owner.get('name', 'Unknown'): round(profit_loss * numeric_value(owner.get('investmentAmount'))
+                                                / total_investment, 2)
+            for owner in owners
+        }
+
+    def _build(self, year: int, month: int, totals: Dict[str, Any], owners: List[Dict[str, Any]],
+               **fields) -> Dict[str, Any]:
+        profit_loss = totals['totalSales'] - totals['totalExpenses'] - totals['productionCost']
+        return {
+            'year': year,
+            'month': month,
+            **totals,
+            'profitLoss': profit_loss,
+            'ownerShares': self._owner_shares(profit_loss, owners),
+            **fields,
+        }
+
+    def _refresh_current(self, year: int, month: int, stored: Optional[Dict[str, Any]],
+                         now: datetime) -> Dict[str, Any]:
+        """Bring the current month's rollup up to date, reusing what is stored."""
+        start, end = month_bounds(year, month)
+        settled = max(start, now - timedelta(seconds=REPORT_SETTLE_SECONDS))
+        # Read before the totals, so a write racing with them shows up next time
+        versions = self._ledger_versions()
+        owners = self.owner_model.get_all_owners()
+        # Documents still settling are included in the response but not stored
+        unsettled = self.compute_totals(settled, end)
+
+        base = None
+        if stored and not stored.get('closed') and stored.get('computedThrough'):
+            through = stored['computedThrough'].replace(tzinfo=None)
+            if start <= through <= settled:
+                recent = self.compute_totals(through, settled)
+                # Ledger versions move once per backend write; more moves than new
+                # documents means existing documents changed, so start over
+                moves = sum(versions.values()) - sum(stored.get('ledgerVersions', {}).values())
+                added = sum(totals[key] for totals in (recent, unsettled)
+                            for key in ('salesCount', 'expenseCount', 'productionCount'))
+                if moves <= added:
+                    base = _add_totals({key: stored[key] for key in _empty_totals()}, recent)
+        if base is None:
+            base = self.compute_totals(start, settled)
+
+        now_written = datetime.utcnow()
+        report = self._build(year, month, base, owners, closed=False, computedThrough=settled,
+                             ledgerVersions=versions,
+                             createdAt=(stored or {}).get('createdAt', now_written),
+                             updatedAt=now_written)
+        self.report_model.save_month(year, month, report)
+        return self._build(year, month, _add_totals(base, unsettled), owners,
+                           **{key: report[key] for key in ('closed', 'computedThrough', 'ledgerVersions',
+                                                           'createdAt', 'updatedAt')})
+
+    def _has_data_before(self, end: datetime) -> bool:
+        """Whether any sale, expense or production entry was created before `end`."""
+        return any(model.where('createdAt', '<', end).limit(1).get()
+                   for model in (self.sales_model, self.expense_model, self.production_model))
+
+    def _close_month(self, year: int, month: int, stored: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Compute a finished month in full and store it as a closed rollup.
+
+        Months before the first recorded entry are computed but not stored,
+        so requests for arbitrary past months do not fill the collection.
+        """
+        start, end = month_bounds(year, month)
+        versions = self._ledger_versions()
+        now = datetime.utcnow()
+        report = self._build(year, month, self.compute_totals(start, end), self.owner_model.get_all_owners(),
+                             closed=True, computedThrough=end, ledgerVersions=versions,
+                             createdAt=(stored or {}).get('createdAt', now), updatedAt=now)
+        if stored or self._has_data_before(end):
+            self.report_model.save_month(year, month, report)
+        return report
+
+    def get_monthly_report(self, year: int, month: int, rebuild: bool = False) -> Dict[str, Any]:
+        """Report for a month; closed months are served from their stored rollup."""
+        try:
+            now = datetime.utcnow()
+            current = (now.year, now.month)
+            if not 1 <= month <= 12:
+                return {'success': False, 'error': 'Month must be between 1 and 12'}
+            if (year, month) > current:
+                return {'success': False, 'error': 'Cannot report on a future month'}
+
+            stored = None if rebuild else self.report_model.get_month(year, month)
+            if not month_closed(year, month, now):
+                # The current month, or one that ended too recently for its entries to be final
+                report = self._refresh_current(year, month, stored, now)
+            elif stored and stored.get('closed'):
+                report = stored
+            else:
+                # First request after the month ended (or a legacy report): compute once and freeze
+                report = self._close_month(year, month, stored)
+
+            report = {key: value for key, value in report.items() if key != 'id'}
+            return {'success': True, **report, 'totalProduction': report['productionCost']}
+        except Exception as e:
+            logger.error(f"Error building report for {year}-{month:02d}: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+    def list_reports(self, year: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Stored rollups, optionally for one year, in month order."""
+        where = [('year', '==', year)] if year is not None else None
+        reports = self.report_model.iter_all(order_by=None, where=where)
+        return sorted(reports, key=lambda r: (r.get('year', 0), r.get('month', 0)))
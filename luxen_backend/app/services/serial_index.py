@@ -0,0 +1,347 @@
+from app.models.firestore_models import (
+    ProductionModel, SalesModel, WarrantyModel, add_write_listener, remove_write_listener
+)
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
+import hashlib
+import math
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds between full rebuilds when no change listener keeps the index current
+SERIAL_INDEX_REBUILD_SECONDS = float(os.getenv('SERIAL_INDEX_REBUILD_SECONDS', 300))
+SERIAL_INDEX_LISTENERS = os.getenv('SERIAL_INDEX_LISTENERS', 'true').lower() in ('1', 'true', 'yes')
+# Target false-positive rate of the Bloom filter
+SERIAL_BLOOM_ERROR_RATE = float(os.getenv('SERIAL_BLOOM_ERROR_RATE', 0.01))
+# How long to wait for each listener's initial snapshot
+LISTENER_READY_TIMEOUT = float(os.getenv('SERIAL_INDEX_LISTENER_TIMEOUT', 10))
+
+# Field holding the serial number(s) in each indexed collection
+SERIAL_FIELDS = {
+    'production': 'serialNumbers',
+    'sales': 'serialNumbers',
+    'warranty': 'serialNumber',
+}
+
+# A serial normally maps to one document; a tuple records duplicates
+Refs = Union[str, Tuple[str, ...]]
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no removals).
+
+    Sized for `capacity` items at `error_rate` false positives; `k` bit
+    positions per item come from one 128-bit BLAKE2b digest by double
+    hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = SERIAL_BLOOM_ERROR_RATE):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(64, int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        """False means definitely absent; True means probably present."""
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def stats(self) -> Dict[str, Any]:
+        return {'bits': self.size, 'hashes': self.hashes, 'items': self.count,
+                'capacity': self.capacity, 'errorRate': self.error_rate}
+
+
+def _refs(value: Optional[Refs]) -> List[str]:
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _add_ref(index: Dict[str, Refs], serial: str, doc_id: str):
+    current = index.get(serial)
+    if current is None:
+        index[serial] = doc_id
+    elif doc_id not in _refs(current):
+        index[serial] = (*_refs(current), doc_id)
+
+
+def _remove_ref(index: Dict[str, Refs], serial: str, doc_id: str):
+    remaining = [ref for ref in _refs(index.get(serial)) if ref != doc_id]
+    if not remaining:
+        index.pop(serial, None)
+    else:
+        index[serial] = remaining[0] if len(remaining) == 1 else tuple(remaining)
+
+
+def _serials(collection: str, data: Dict[str, Any]) -> Tuple[str, ...]:
+    """Serial numbers a document refers to (list or single field)."""
+    value = data.get(SERIAL_FIELDS[collection])
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, (list, tuple)):
+        return ()
+    return tuple(dict.fromkeys(s.strip() for s in value if isinstance(s, str) and s.strip()))
+
+
+class SerialIndex:
+    """Serial number -> production batch, sale and warranty claims.
+
+    Built from the `production`, `sales` and `warranty` collections, then kept
+    current by the backend's change listeners (Firestore `on_snapshot`) and
+    by writes made through the models. Without listeners, writes made
+    elsewhere are picked up by a full rebuild every
+    SERIAL_INDEX_REBUILD_SECONDS. A Bloom filter over every known serial
+    answers most unknown serials without touching the maps. Lookups are
+    O(1) in the number of batches, sales and claims.
+    """
+
+    def __init__(self):
+        self.models = {
+            'production': ProductionModel(),
+            'sales': SalesModel(),
+            'warranty': WarrantyModel(),
+        }
+        self._maps: Dict[str, Dict[str, Refs]] = {name: {} for name in self.models}
+        # Per collection: {doc_id: serials}, to unindex updated and deleted documents
+        self._documents: Dict[str, Dict[str, Tuple[str, ...]]] = {name: {} for name in self.models}
+        # Distinct serials over all maps, kept as entries come and go
+        self._count = 0
+        self._bloom = BloomFilter(1024)
+        self._watches = []
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._write_listeners = {
+            name: (lambda doc_id, data, merge, name=name: self._on_write(name, doc_id, data, merge))
+            for name in self.models
+        }
+        for name, listener in self._write_listeners.items():
+            add_write_listener(name, listener)
+
+    @property
+    def listening(self) -> bool:
+        """True while every collection's change listener is active."""
+        return bool(self._watches) and all(watch.is_active for watch in self._watches)
+
+    def _elsewhere(self, collection: str, serial: str) -> bool:
+        """Whether a serial is in a map other than `collection`'s."""
+        return any(serial in index for name, index in self._maps.items() if name != collection)
+
+    def _index(self, collection: str, doc_id: str, serials: Tuple[str, ...]):
+        """Replace a document's serials in the maps (empty removes it)."""
+        index = self._maps[collection]
+        for serial in self._documents[collection].pop(doc_id, ()):
+            _remove_ref(index, serial, doc_id)
+            if serial not in index and not self._elsewhere(collection, serial):
+                self._count -= 1
+        if not serials:
+            return
+        self._documents[collection][doc_id] = serials
+        for serial in serials:
+            self._remember(serial)
+            if serial not in index and not self._elsewhere(collection, serial):
+                self._count += 1
+            _add_ref(index, serial, doc_id)
+
+    def _remember(self, serial: str):
+        """Add a serial to the Bloom filter, doubling it when full."""
+        if serial in self._bloom:
+            return
+        if self._bloom.count >= self._bloom.capacity:
+            self._rebuild_bloom(self._bloom.capacity * 2)
+        self._bloom.add(serial)
+
+    def _rebuild_bloom(self, capacity: int):
+        bloom = BloomFilter(capacity)
+        for serial in self._known():
+            bloom.add(serial)
+        self._bloom = bloom
+
+    def _known(self) -> set:
+        """Every serial in any of the maps."""
+        return set().union(*self._maps.values())
+
+    def _on_reset(self, collection: str, docs: Dict[str, Dict[str, Any]]):
+        """Replace one collection's entries with a full snapshot."""
+        with self._lock:
+            self._count -= sum(1 for serial in self._maps[collection] if not self._elsewhere(collection, serial))
+            self._maps[collection] = {}
+            self._documents[collection] = {}
+            for doc_id, data in docs.items():
+                self._index(collection, doc_id, _serials(collection, data or {}))
+
+    def _on_change(self, collection: str, doc_id: str, data: Optional[Dict[str, Any]]):
+        with self._lock:
+            self._index(collection, doc_id, _serials(collection, data) if data is not None else ())
+
+    def _on_write(self, collection: str, doc_id: str, data: Optional[Dict[str, Any]], merge: bool):
+        """Write listener for the models; updates without the serial field keep the old serials."""
+        if self._loaded_at is None or (merge and data is not None and SERIAL_FIELDS[collection] not in data):
+            return
+        self._on_change(collection, doc_id, data)
+
+    def _stop_listeners(self):
+        for watch in self._watches:
+            watch.unsubscribe()
+        self._watches = []
+
+    def _start_listeners(self) -> bool:
+        """Subscribe to every collection and wait for the initial snapshots."""
+        try:
+            for name, model in self.models.items():
+                ready = threading.Event()
+
+                def on_reset(docs, name=name, ready=ready):
+                    self._on_reset(name, docs)
+                    ready.set()
+
+                watch = model.backend.watch(name, on_reset,
+                                            lambda doc_id, data, name=name: self._on_change(name, doc_id, data))
+                if watch is None:
+                    logger.info("Backend cannot push changes, serial index uses periodic rebuilds")
+                    break
+                self._watches.append(watch)
+                if not ready.wait(LISTENER_READY_TIMEOUT):
+                    logger.warning(f"Listener for {name} not ready, serial index uses periodic rebuilds")
+                    break
+            else:
+                return True
+        except Exception as e:
+            logger.warning(f"Listeners unavailable, serial index uses periodic rebuilds: {str(e)}")
+        self._stop_listeners()
+        return False
+
+    def load(self):
+        """Build the index with one projected read of each collection."""
+        started = time.perf_counter()
+        snapshots = {
+            name: {doc.pop('id'): doc for doc in model.iter_all(order_by=None, select=[SERIAL_FIELDS[name]])}
+            for name, model in self.models.items()
+        }
+        with self._lock:
+            for name, docs in snapshots.items():
+                self._on_reset(name, docs)
+            self._rebuild_bloom(max(1024, 2 * sum(len(index) for index in self._maps.values())))
+        logger.info(f"Serial index loaded {len(self)} serials in {time.perf_counter() - started:.2f}s")
+
+    def ensure_loaded(self):
+        """Build the index on first use; rebuild it periodically without listeners."""
+        if self._loaded_at is not None and (
+                self.listening or time.monotonic() - self._loaded_at < SERIAL_INDEX_REBUILD_SECONDS):
+            return
+        with self._load_lock:
+            if self._loaded_at is not None and (
+                    self.listening or time.monotonic() - self._loaded_at < SERIAL_INDEX_REBUILD_SECONDS):
+                return
+            try:
+                self._stop_listeners()
+                if not (SERIAL_INDEX_LISTENERS and self._start_listeners()):
+                    self.load()
+                else:
+                    with self._lock:
+                        self._rebuild_bloom(max(1024, 2 * len(self)))
+                self._loaded_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error loading serial index: {str(e)}")
+                raise
+
+    def close(self):
+        """Stop following writes; the index keeps its current contents."""
+        with self._load_lock:
+            self._stop_listeners()
+            for name, listener in self._write_listeners.items():
+                remove_write_listener(name, listener)
+
+    def __len__(self) -> int:
+        """Distinct serials in the index."""
+        return self._count
+
+    def lookup(self, serial: str) -> Dict[str, Any]:
+        """Where a serial was produced, sold and claimed."""
+        self.ensure_loaded()
+        serial = serial.strip()
+        with self._lock:
+            if serial not in self._bloom:
+                batches, sales, claims = [], [], []
+            else:
+                batches, sales, claims = (_refs(self._maps[name].get(serial))
+                                          for name in ('production', 'sales', 'warranty'))
+        return {
+            'serialNumber': serial,
+            'produced': bool(batches),
+            'sold': bool(sales),
+            'batchIds': batches,
+            'saleIds': sales,
+            'claimIds': claims,
+        }
+
+    def validate_sale(self, serials: List[str], sale_id: Optional[str] = None) -> Dict[str, Any]:
+        """Check serials for a sale: produced, not sold elsewhere, not repeated.
+
+        Pass the sale's own `sale_id` when validating an edit to it.
+        """
+        errors = []
+        seen = set()
+        for serial in serials:
+            info = self.lookup(serial)
+            serial = info['serialNumber']
+            if serial in seen:
+                errors.append({'serialNumber': serial, 'error': 'Listed more than once'})
+            elif not info['produced']:
+                errors.append({'serialNumber': serial, 'error': 'Not produced in any batch'})
+            else:
+                other_sales = [ref for ref in info['saleIds'] if ref != sale_id]
+                if other_sales:
+                    errors.append({'serialNumber': serial, 'error': 'Already sold',
+                                   'saleIds': other_sales})
+            seen.add(serial)
+        return {'valid': not errors, 'errors': errors}
+
+    def validate_claim(self, serial: str) -> Dict[str, Any]:
+        """Check a warranty claim's serial: it must have been sold."""
+        info = self.lookup(serial)
+        result = {'valid': info['sold'], **info}
+        if not info['sold']:
+            result['error'] = 'Produced but not sold' if info['produced'] else 'Unknown serial number'
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Index sizes and Bloom filter parameters for monitoring."""
+        with self._lock:
+            return {
+                'serials': len(self),
+                'produced': len(self._maps['production']),
+                'sold': len(self._maps['sales']),
+                'claimed': len(self._maps['warranty']),
+                'listening': self.listening,
+                'bloom': self._bloom.stats(),
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_serial_index() -> SerialIndex:
+    """The process-wide index, created (not yet loaded) on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SerialIndex()
+        return _index
@@ -0,0 +1,125 @@
+from app.metrics import SINGLE_FLIGHT_CALLS
+from app.models.firestore_models import add_write_listener
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional, Tuple
+import functools
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Concurrent identical calls to decorated methods share one execution per process
+SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Seconds a finished result is also handed to calls arriving after it (0 = in-flight only)
+SINGLE_FLIGHT_GRACE_SECONDS = float(os.getenv('SINGLE_FLIGHT_GRACE_SECONDS', 0.5))
+# Collections whose writes start new flights (results from before a write are not shared after it)
+SINGLE_FLIGHT_SOURCES = ('owners', 'sales', 'production', 'expenses', 'warranty')
+
+
+def _parse_methods(value: str) -> Dict[str, Optional[float]]:
+    """Per-method settings, e.g. `get_dashboard_metrics=1,predict_next_month_expenses=off`."""
+    methods: Dict[str, Optional[float]] = {}
+    for item in value.split(','):
+        name, _, grace = item.partition('=')
+        if name.strip():
+            grace = grace.strip().lower()
+            methods[name.strip()] = None if grace == 'off' else float(grace or SINGLE_FLIGHT_GRACE_SECONDS)
+    return methods
+
+
+# Grace seconds per method name; 'off' disables coalescing for that method
+SINGLE_FLIGHT_METHODS = _parse_methods(os.getenv('SINGLE_FLIGHT_METHODS', ''))
+
+# Moved by every write to SINGLE_FLIGHT_SOURCES in this process
+_generation = 0
+_listening = False
+_flights_lock = threading.Lock()
+
+
+def _on_write(doc_id: str, data: Optional[Dict[str, Any]], merge: bool):
+    global _generation
+    with _flights_lock:
+        _generation += 1
+
+
+def _current_generation() -> int:
+    global _listening
+    with _flights_lock:
+        if not _listening:
+            for name in SINGLE_FLIGHT_SOURCES:
+                add_write_listener(name, _on_write)
+            _listening = True
+        return _generation
+
+
+class SingleFlight:
+    """Runs one call per key at a time; callers arriving meanwhile wait for its outcome.
+
+    A successful result is also returned to calls made within `grace`
+    seconds after it finished. Calls made after a local write to the
+    business collections never share a result computed before it.
+    Exceptions are raised in every waiting caller and are not kept.
+    """
+
+    def __init__(self, name: str, grace: float = SINGLE_FLIGHT_GRACE_SECONDS):
+        self.name = name
+        self.grace = grace
+        self._calls: Dict[Tuple[int, Any], Future] = {}
+        # key -> (generation, expires, result)
+        self._recent: Dict[Any, Tuple[int, float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Any, call: Callable[[], Any]) -> Any:
+        generation = _current_generation()
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is not None and recent[0] == generation and recent[1] > time.monotonic():
+                SINGLE_FLIGHT_CALLS.inc(self.name, 'grace')
+                return recent[2]
+            future = self._calls.get((generation, key))
+            leader = future is None
+            if leader:
+                future = self._calls[(generation, key)] = Future()
+        if not leader:
+            SINGLE_FLIGHT_CALLS.inc(self.name, 'in_flight')
+            return future.result()
+
+        SINGLE_FLIGHT_CALLS.inc(self.name, 'executed')
+        try:
+            result = call()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[(generation, key)]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[(generation, key)]
+            # Service methods report failures as {'success': False}; those are not reused
+            if self.grace > 0 and not (isinstance(result, dict) and result.get('success') is False):
+                self._recent[key] = (generation, time.monotonic() + self.grace, result)
+        future.set_result(result)
+        return result
+
+
+def single_flight(method: Callable) -> Callable:
+    """Coalesce concurrent argument-free calls of a service method within this process.
+
+    Calls passing arguments (e.g. a request's snapshot, which already
+    shares reads) run directly. Shared results are the same object for
+    every caller and must not be mutated.
+    """
+    grace = SINGLE_FLIGHT_METHODS.get(method.__name__, SINGLE_FLIGHT_GRACE_SECONDS)
+    if not SINGLE_FLIGHT_ENABLED or (method.__name__ in SINGLE_FLIGHT_METHODS and grace is None):
+        return method
+    flight = SingleFlight(method.__qualname__, grace)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if args or any(value is not None for value in kwargs.values()):
+            return method(self, *args, **kwargs)
+        return flight.do(None, lambda: method(self))
+
+    wrapper.flight = flight
+    return wrapper
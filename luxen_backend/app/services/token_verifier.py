@@ -0,0 +1,199 @@
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Tuple
+import base64
+import json
+import os
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Public certificates Firebase Auth signs ID tokens with (rotated every few hours)
+FIREBASE_CERTS_URL = ('https://www.googleapis.com/robot/v1/metadata/x509/'
+                      'securetoken@system.gserviceaccount.com')
+FIREBASE_ISSUER = 'https://securetoken.google.com/'
+FIREBASE_PROJECT_ID = os.getenv('FIREBASE_PROJECT_ID')
+# Verified tokens remembered per process, each until it expires
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 1024))
+# Tolerated clock difference for exp/iat/auth_time (Firebase allows up to 60)
+AUTH_CLOCK_SKEW_SECONDS = min(60, int(os.getenv('AUTH_CLOCK_SKEW_SECONDS', 0)))
+# Certificate cache lifetime when the response has no usable max-age
+DEFAULT_CERTS_MAX_AGE = 3600
+# An unknown key ID triggers a refetch at most this often (key rotation)
+MIN_REFRESH_SECONDS = 60
+
+_MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+# fetch() -> (response body {kid: PEM certificate}, Cache-Control header or None)
+CertificateFetcher = Callable[[], Tuple[Dict[str, str], Optional[str]]]
+
+
+class InvalidToken(ValueError):
+    """Raised when an ID token is malformed, expired, or not signed by Firebase."""
+
+
+def fetch_firebase_certificates() -> Tuple[Dict[str, str], Optional[str]]:
+    """Download Firebase's signing certificates."""
+    import requests
+    response = requests.get(FIREBASE_CERTS_URL, timeout=10)
+    response.raise_for_status()
+    return response.json(), response.headers.get('Cache-Control')
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+class SigningKeys:
+    """Firebase's public signing keys, cached for their `Cache-Control` max-age.
+
+    Certificates are parsed into verifiers once per key. Only one thread
+    fetches at a time; if a refresh fails the expired keys stay in use
+    until the next attempt, so a certificate endpoint outage does not
+    reject every request.
+    """
+
+    def __init__(self, fetch: CertificateFetcher = fetch_firebase_certificates):
+        self.fetch = fetch
+        self._verifiers: Dict[str, Any] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        from google.auth import crypt
+        certificates, cache_control = self.fetch()
+        match = _MAX_AGE_PATTERN.search(cache_control or '')
+        max_age = int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE
+        verifiers = {kid: crypt.RSAVerifier.from_string(pem) for kid, pem in certificates.items()}
+        now = time.monotonic()
+        self._verifiers, self._fetched_at, self._expires_at = verifiers, now, now + max_age
+        logger.info(f"Loaded {len(verifiers)} token signing keys, valid for {max_age}s")
+
+    def verifier(self, kid: str):
+        """Verifier for a key ID, refreshing expired keys (and unknown IDs, rate-limited)."""
+        now = time.monotonic()
+        if now < self._expires_at and kid in self._verifiers:
+            return self._verifiers[kid]
+        with self._lock:
+            now = time.monotonic()
+            stale = now >= self._expires_at
+            unknown = kid not in self._verifiers and now - self._fetched_at >= MIN_REFRESH_SECONDS
+            if stale or unknown:
+                try:
+                    self._refresh()
+                except Exception as e:
+                    if not self._verifiers:
+                        raise
+                    logger.warning(f"Could not refresh token signing keys, using cached keys: {str(e)}")
+            verifier = self._verifiers.get(kid)
+        if verifier is None:
+            raise InvalidToken('Token is signed by an unknown key')
+        return verifier
+
+    def stats(self) -> Dict[str, Any]:
+        return {'keys': len(self._verifiers), 'expiresIn': max(0, round(self._expires_at - time.monotonic()))}
+
+
+class TokenVerifier:
+    """Verifies Firebase ID tokens locally, without a call per request.
+
+    The RS256 signature is checked against cached public keys, then the
+    claims Firebase requires (audience, issuer, subject and timestamps).
+    Verified tokens are kept in an LRU until they expire, so a client
+    reusing its token pays for one dictionary lookup. Revocation is not
+    checked; tokens live at most an hour.
+    """
+
+    def __init__(self, project_id: Optional[str] = FIREBASE_PROJECT_ID,
+                 keys: Optional[SigningKeys] = None, max_size: int = AUTH_TOKEN_CACHE_SIZE,
+                 clock_skew: int = AUTH_CLOCK_SKEW_SECONDS, clock: Callable[[], float] = time.time):
+        self.project_id = project_id
+        self.keys = keys or SigningKeys()
+        self.max_size = max_size
+        self.clock_skew = clock_skew
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._verified: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Claims of a valid token (`uid` added); raises InvalidToken otherwise."""
+        if not isinstance(token, str) or not token:
+            raise InvalidToken('Token is required')
+        now = self.clock()
+        with self._lock:
+            claims = self._verified.get(token)
+            if claims is not None:
+                if claims['exp'] + self.clock_skew > now:
+                    self._verified.move_to_end(token)
+                    self.hits += 1
+                    return claims
+                del self._verified[token]
+            self.misses += 1
+        claims = self._verify_uncached(token, now)
+        with self._lock:
+            self._verified[token] = claims
+            self._verified.move_to_end(token)
+            while len(self._verified) > self.max_size:
+                self._verified.popitem(last=False)
+        return claims
+
+    def _verify_uncached(self, token: str, now: float) -> Dict[str, Any]:
+        if not self.project_id:
+            raise InvalidToken('FIREBASE_PROJECT_ID is not configured')
+        try:
+            header_segment, payload_segment, signature_segment = token.split('.')
+            header = json.loads(_b64decode(header_segment))
+            claims = json.loads(_b64decode(payload_segment))
+            signature = _b64decode(signature_segment)
+        except (ValueError, TypeError):
+            raise InvalidToken('Token is not a well-formed JWT')
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise InvalidToken('Token is not a well-formed JWT')
+        if header.get('alg') != 'RS256':
+            raise InvalidToken("Token must be signed with RS256")
+        if not isinstance(header.get('kid'), str):
+            raise InvalidToken("Token has no 'kid' header")
+
+        verifier = self.keys.verifier(header['kid'])
+        signed = f"{header_segment}.{payload_segment}".encode('ascii')
+        if not verifier.verify(signed, signature):
+            raise InvalidToken('Token signature is invalid')
+
+        if claims.get('aud') != self.project_id:
+            raise InvalidToken('Token was issued for another project')
+        if claims.get('iss') != FIREBASE_ISSUER + self.project_id:
+            raise InvalidToken('Token has the wrong issuer')
+        subject = claims.get('sub')
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise InvalidToken("Token has an invalid 'sub' claim")
+        for claim in ('exp', 'iat', 'auth_time'):
+            if not isinstance(claims.get(claim), (int, float)) or isinstance(claims.get(claim), bool):
+                raise InvalidToken(f"Token has no valid '{claim}' claim")
+        if claims['exp'] + self.clock_skew <= now:
+            raise InvalidToken('Token has expired')
+        if claims['iat'] - self.clock_skew > now or claims['auth_time'] - self.clock_skew > now:
+            raise InvalidToken('Token was issued in the future')
+        return {**claims, 'uid': subject}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'cached': len(self._verified), 'maxSize': self.max_size,
+                    'hits': self.hits, 'misses': self.misses, **self.keys.stats()}
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_token_verifier() -> TokenVerifier:
+    """The process-wide verifier, created on first use."""
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            _verifier = TokenVerifier()
+        return _verifier
@@ -0,0 +1,6 @@
+"""Performance benchmarks for the LUXEN backend hot paths.
+
+Run from `luxen_backend/`:
+
+    python -m benchmarks.run --sizes 1000,10000 --check
+"""
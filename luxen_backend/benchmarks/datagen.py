@@ -0,0 +1,129 @@
+"""Synthetic LUXEN business data, modelled on luxen_web_app/docs/database/SEED_DATA.json."""
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, Tuple
+import random
+
+# Collections scaled to the requested size; owners stay a realistic handful
+SCALED_COLLECTIONS = ('production', 'sales', 'expenses', 'warranty')
+
+EXPENSE_CATEGORIES = [
+    'Raw Materials', 'Utilities', 'Rent', 'Salaries', 'Marketing',
+    'Transportation', 'Maintenance', 'Office Supplies', 'Other'
+]
+CUSTOMER_NAMES = ['রহিম ইলেকট্রনিক্স', 'করিম ট্রেডিং', 'Dhaka Lighting House', 'Chittagong Electric', 'সিলেট ট্রেডার্স']
+OWNER_NAMES = ['রহিম আহমেদ', 'করিম হোসেন', 'Nadia Islam', 'Tanvir Rahman', 'সাকিব হাসান']
+WARRANTY_REASONS = ['বাল্ব কাজ করছে না', 'আলো দুর্বল', 'Flickering', 'Does not turn on']
+EXPENSE_DESCRIPTIONS = ['পণ্য ডেলিভারি খরচ', 'মাসের বিদ্যুৎ বিল', 'ফ্যাক্টরি ভাড়া', 'যন্ত্রপাতি মেরামত']
+
+START_DATE = datetime(2024, 1, 1)
+# Documents are spread evenly over this many days, so forecasts see ~24 months
+SPAN_DAYS = 730
+
+Document = Tuple[str, Dict[str, Any]]
+
+
+def _created_at(rng: random.Random, index: int, size: int) -> datetime:
+    offset = SPAN_DAYS * 86400 * index / max(size, 1) + rng.uniform(0, 3600)
+    return START_DATE + timedelta(seconds=offset)
+
+
+def serial_number(batch: int, unit: int) -> str:
+    """Deterministic serial in the LUXEN-YYYY-BBB-XXXXXXXX format."""
+    return f"LUXEN-2024-{batch:03d}-{(batch * 7919 + unit * 104729) & 0xFFFFFFFF:08X}"
+
+
+def owners(count: int = 5, seed: int = 0) -> Iterator[Document]:
+    rng = random.Random(seed)
+    for i in range(count):
+        name = OWNER_NAMES[i % len(OWNER_NAMES)] + ('' if i < len(OWNER_NAMES) else f' {i}')
+        yield f"owner_{i + 1}", {
+            'uid': f"owner_{i + 1}",
+            'email': f"owner{i + 1}@luxen.com",
+            'name': name,
+            'phone': f"+8801{rng.randrange(10 ** 8, 10 ** 9)}",
+            'role': 'owner',
+            'investmentAmount': rng.randrange(100, 1000) * 1000,
+            'createdAt': START_DATE,
+        }
+
+
+def production(size: int, seed: int = 0) -> Iterator[Document]:
+    rng = random.Random(seed + 1)
+    for i in range(size):
+        quantity = rng.randrange(500, 2001, 100)
+        material, labor = quantity * 50, quantity * 15
+        electricity, packaging = quantity * 5, quantity * 10
+        total = material + labor + electricity + packaging
+        yield f"prod_{i + 1:07d}", {
+            'batchName': f"Batch-2024-{i + 1:03d}",
+            'quantity': quantity,
+            'materialCost': material,
+            'laborCost': labor,
+            'electricityCost': electricity,
+            'packagingCost': packaging,
+            'totalCost': total,
+            'costPerUnit': total / quantity,
+            'serialNumbers': [serial_number(i + 1, unit) for unit in range(3)],
+            'createdAt': _created_at(rng, i, size),
+        }
+
+
+def sales(size: int, seed: int = 0) -> Iterator[Document]:
+    rng = random.Random(seed + 2)
+    for i in range(size):
+        units = rng.randint(1, 3)
+        unit_price = rng.randrange(8000, 15001, 500)
+        yield f"sale_{i + 1:07d}", {
+            'customerName': rng.choice(CUSTOMER_NAMES),
+            'serialNumbers': [serial_number(i + 1, unit) for unit in range(units)],
+            'totalAmount': unit_price * units,
+            'unitPrice': unit_price,
+            'paymentStatus': rng.choice(['Paid', 'Paid', 'Pending']),
+            'invoiceId': f"INV-2024-{i + 1:07d}",
+            'createdAt': _created_at(rng, i, size),
+        }
+
+
+def expenses(size: int, seed: int = 0) -> Iterator[Document]:
+    rng = random.Random(seed + 3)
+    for i in range(size):
+        yield f"exp_{i + 1:07d}", {
+            'category': rng.choice(EXPENSE_CATEGORIES),
+            'amount': rng.randrange(500, 20001, 250),
+            'description': rng.choice(EXPENSE_DESCRIPTIONS),
+            'createdAt': _created_at(rng, i, size),
+        }
+
+
+def warranty(size: int, seed: int = 0) -> Iterator[Document]:
+    rng = random.Random(seed + 4)
+    for i in range(size):
+        yield f"war_{i + 1:07d}", {
+            'serialNumber': serial_number(i + 1, 0),
+            'customerName': rng.choice(CUSTOMER_NAMES),
+            'reason': rng.choice(WARRANTY_REASONS),
+            'replaced': rng.random() < 0.6,
+            'createdAt': _created_at(rng, i, size),
+        }
+
+
+GENERATORS = {
+    'production': production,
+    'sales': sales,
+    'expenses': expenses,
+    'warranty': warranty,
+}
+
+
+def populate(backend, size: int, owner_count: int = 5, seed: int = 0) -> Dict[str, int]:
+    """Write `size` documents to every scaled collection (plus the owners) into `backend`."""
+    counts = {'owners': 0}
+    for doc_id, data in owners(owner_count, seed):
+        backend.set('owners', doc_id, data)
+        counts['owners'] += 1
+    for collection in SCALED_COLLECTIONS:
+        counts[collection] = 0
+        for doc_id, data in GENERATORS[collection](size, seed):
+            backend.set(collection, doc_id, data)
+            counts[collection] += 1
+    return counts
@@ -0,0 +1,213 @@
+"""Time the BusinessService and AIService hot paths over synthetic datasets.
+
+Each dataset size is loaded into an in-memory storage backend, then every
+benchmark is run `--repeat` times. Business calculations are timed with
+rebuilt aggregate ledgers (`ledger`, the production path), without them
+(`cold`, which aggregates the collections on every call) and on a loaded
+columnar store (`columnar`, excluding the refresh queries).
+
+Expense forecasts are cached until a month closes, so the forecast is
+also timed as a full refit (`ForecastService.forecast[refit]`). Serial
+validation (`SerialIndex.validate_sale[batch]`) should not grow with the
+dataset size. Chat intent classification is timed at high volume
+(`AIService.classify_batch[volume]`, CHAT_VOLUME messages per sample) and
+also reported per message.
+
+Results are written as JSON; with `--check` the medians are compared with
+`thresholds.json` and the process exits with status 1 on any regression.
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Callable, List
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.backends import set_backend  # noqa: E402
+from app.models.backends.memory_backend import MemoryBackend  # noqa: E402
+from app.models.ledger import LEDGER_COLLECTION  # noqa: E402
+from app.services.ai_service import AIService  # noqa: E402
+from app.services.business_service import BusinessService  # noqa: E402
+from app.services import columnar_snapshot  # noqa: E402
+from app.services.serial_index import SerialIndex  # noqa: E402
+from benchmarks import datagen  # noqa: E402
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+DEFAULT_THRESHOLDS = BENCHMARK_DIR / 'thresholds.json'
+DEFAULT_OUTPUT = BENCHMARK_DIR / 'results.json'
+
+# A mix of English and Bangla questions hitting every response branch
+CHAT_PROMPTS = [
+    'What are my total sales?', 'আমার মোট বিক্রয় কত?',
+    'Did we make a profit?', 'লাভ কত হয়েছে?',
+    'Show my expenses', 'এই মাসের খরচ কত?',
+    'How much production this month?', 'উৎপাদন খরচ কত?',
+    'Any warranty claims?', 'ওয়ারেন্টি দাবি কতগুলো?',
+    'Owner share details', 'মালিকদের শেয়ার কত?',
+    'hello', 'হ্যালো', 'help', 'What is the weather today?',
+]
+# Messages classified per AIService.classify_batch sample
+CHAT_VOLUME = 10000
+# Serial numbers checked per SerialIndex.validate_sale sample
+SERIAL_BATCH = 100
+
+
+def _timings(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Run func `repeat` times and summarise wall-clock milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+        if isinstance(result, dict) and result.get('success') is False:
+            raise RuntimeError(f"Benchmark call failed: {result.get('error')}")
+    samples.sort()
+    return {
+        'min_ms': round(samples[0], 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+    }
+
+
+def _business_benchmarks(service: BusinessService,
+                         snapshot: Callable[[], Any]) -> Dict[str, Callable[[], Any]]:
+    # A fresh snapshot per call, as each API request gets its own
+    return {
+        'calculate_owner_shares': lambda: service.calculate_owner_shares(snapshot()),
+        'predict_next_month_expenses': lambda: service.predict_next_month_expenses(snapshot()),
+        'get_dashboard_metrics': lambda: service.get_dashboard_metrics(snapshot()),
+    }
+
+
+def run_size(size: int, repeat: int, owner_count: int, seed: int) -> List[Dict[str, Any]]:
+    """Load one dataset and time every benchmark against it."""
+    backend = MemoryBackend()
+    set_backend(backend)
+    started = time.perf_counter()
+    datagen.populate(backend, size, owner_count=owner_count, seed=seed)
+    print(f"Loaded {size} documents per collection in {time.perf_counter() - started:.1f}s")
+
+    service = BusinessService()
+    results = []
+    for scenario in ('cold', 'ledger', 'columnar'):
+        snapshot = service.snapshot
+        if scenario == 'cold':
+            backend.collections.pop(LEDGER_COLLECTION, None)
+        elif scenario == 'ledger':
+            for model in (service.sales_model, service.production_model,
+                          service.expense_model, service.warranty_model):
+                model.ledger.rebuild()
+        else:
+            store = columnar_snapshot.ColumnarStore(service)
+            store.refresh()
+            snapshot = lambda: store.snapshot(refresh=False)  # noqa: E731
+        for name, func in _business_benchmarks(service, snapshot).items():
+            results.append({'name': name, 'scenario': scenario, 'size': size,
+                            'repeat': repeat, **_timings(func, repeat)})
+
+    # Forecasts are cached until a month closes; time a full refit of every category
+    expenses = service.expense_table()
+
+    def refit():
+        service.forecaster.invalidate()
+        return service.forecaster.forecast(lambda: expenses)
+
+    refit()  # imports scikit-learn outside the timed runs
+    results.append({'name': 'ForecastService.forecast', 'scenario': 'refit', 'size': size,
+                    'repeat': repeat, **_timings(refit, repeat)})
+
+    metrics = service.get_dashboard_metrics()['metrics']
+
+    def chat():
+        for prompt in CHAT_PROMPTS:
+            AIService.generate_response(prompt, metrics)
+
+    # Each sample answers every prompt once; the median is per batch
+    results.append({'name': 'AIService.generate_response', 'scenario': 'batch', 'size': size,
+                    'repeat': repeat * 10, 'prompts': len(CHAT_PROMPTS), **_timings(chat, repeat * 10)})
+
+    messages = (CHAT_PROMPTS * (CHAT_VOLUME // len(CHAT_PROMPTS) + 1))[:CHAT_VOLUME]
+    timings = _timings(lambda: AIService.classify_batch(messages), repeat)
+    results.append({'name': 'AIService.classify_batch', 'scenario': 'volume', 'size': size,
+                    'repeat': repeat, 'messages': CHAT_VOLUME,
+                    'per_message_us': round(timings['median_ms'] * 1000 / CHAT_VOLUME, 3), **timings})
+
+    # Half produced and sold, half unknown; each sample validates them all
+    index = SerialIndex()
+    index.ensure_loaded()
+    serials = [datagen.serial_number(1 + i * size // SERIAL_BATCH, 0) for i in range(SERIAL_BATCH // 2)]
+    serials += [f"LUXEN-2099-{i:03d}-00000000" for i in range(SERIAL_BATCH - len(serials))]
+    results.append({'name': 'SerialIndex.validate_sale', 'scenario': 'batch', 'size': size,
+                    'repeat': repeat * 10, 'serials': SERIAL_BATCH,
+                    **_timings(lambda: index.validate_sale(serials), repeat * 10)})
+    index.close()
+    set_backend(None)
+    return results
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    """Threshold lookup key, e.g. `get_dashboard_metrics[ledger]@10000`."""
+    return f"{result['name']}[{result['scenario']}]@{result['size']}"
+
+
+def check_thresholds(results: List[Dict[str, Any]], thresholds: Dict[str, float]) -> List[str]:
+    """Describe every result whose median exceeds its threshold."""
+    failures = []
+    for result in results:
+        limit = thresholds.get(result_key(result))
+        if limit is not None and result['median_ms'] > limit:
+            failures.append(f"{result_key(result)}: median {result['median_ms']}ms > {limit}ms")
+    return failures
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000',
+                        help='comma-separated documents per collection (1000 to 1000000)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark')
+    parser.add_argument('--owners', type=int, default=5, help='number of owner documents')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the data generator')
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT), help='where to write JSON results')
+    parser.add_argument('--thresholds', default=str(DEFAULT_THRESHOLDS), help='regression thresholds file')
+    parser.add_argument('--check', action='store_true', help='exit 1 if any threshold is exceeded')
+    args = parser.parse_args(argv)
+
+    # The cold scenario deliberately runs without ledgers; keep their warnings quiet
+    logging.getLogger().setLevel(logging.ERROR)
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = []
+    for size in sizes:
+        for result in run_size(size, args.repeat, args.owners, args.seed):
+            results.append(result)
+            print(f"  {result_key(result):<55} median {result['median_ms']:>10.3f}ms")
+
+    report = {
+        'generatedAt': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': 'memory',
+        'results': results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"Results written to {args.output}")
+
+    if args.check:
+        thresholds = json.loads(Path(args.thresholds).read_text(encoding='utf-8'))
+        failures = check_thresholds(results, thresholds)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            return 1
+        print('All benchmarks within thresholds')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
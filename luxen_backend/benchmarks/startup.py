@@ -0,0 +1,135 @@
+"""Measure cold-start cost: import time of the app and time to first response.
+
+`python -X importtime -c "import run"` is run in fresh interpreters (the
+first run also warms the bytecode cache and is discarded); the median
+cumulative import time of `run` is reported with the heaviest modules.
+Then gunicorn is started with one worker and `/health` is polled until it
+answers, which is the time a Cloud Run instance takes to serve its first
+request. Both use the Firestore backend without credentials: nothing on
+the startup path may need them.
+
+With `--check` the process exits 1 if a module that should load on first
+use (DEFERRED_MODULES) is imported at startup, or if the median import
+time exceeds `--max-import-ms`.
+"""
+from benchmarks.throughput import BACKEND_DIR, _free_port, _wait_ready
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+import argparse
+import json
+import os
+import platform
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+# Imported on first use, never while the app starts
+DEFERRED_MODULES = ('firebase_admin', 'google.cloud.firestore', 'grpc', 'numpy', 'sklearn')
+
+# (self µs, cumulative µs, depth) per module
+ImportProfile = Dict[str, Tuple[int, int, int]]
+
+
+def _env(**overrides: str) -> Dict[str, str]:
+    env = {key: value for key, value in os.environ.items()
+           if not key.startswith(('FIREBASE_', 'GOOGLE_APPLICATION_CREDENTIALS'))}
+    return {**env, 'STORAGE_BACKEND': 'firestore', 'PYTHONPATH': str(BACKEND_DIR), **overrides}
+
+
+def import_profile(module: str = 'run') -> ImportProfile:
+    """Per-module import times for `import <module>` in a fresh interpreter."""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    profile: ImportProfile = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        profile[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return profile
+
+
+def time_to_first_response(timeout: float = 60) -> float:
+    """Seconds from starting gunicorn (one worker) until /health answers."""
+    port = _free_port()
+    env = _env(GUNICORN_BIND=f"127.0.0.1:{port}", WEB_CONCURRENCY='1')
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'run:app'],
+                              cwd=BACKEND_DIR, env=env, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(f"http://127.0.0.1:{port}", server, timeout)
+        return time.perf_counter() - started
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='interpreters started per measurement')
+    parser.add_argument('--top', type=int, default=10, help='heaviest top-level imports to list')
+    parser.add_argument('--max-import-ms', type=float, default=None, help='fail --check above this')
+    parser.add_argument('--skip-serve', action='store_true', help='only measure imports')
+    parser.add_argument('--output', default=None, help='also write JSON results here')
+    parser.add_argument('--check', action='store_true', help='exit 1 on a deferred import or slow start')
+    args = parser.parse_args(argv)
+
+    import_profile()  # compiles bytecode; not counted
+    profiles = [import_profile() for _ in range(args.repeat)]
+    import_ms = statistics.median(profile['run'][1] for profile in profiles) / 1000
+    last = profiles[-1]
+    # -X importtime lists a module's imports just before it: walk back from `run`
+    names = list(last)
+    children = []
+    for name in reversed(names[:names.index('run')]):
+        depth = last[name][2]
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((name, last[name][1]))
+    heaviest = sorted(children, key=lambda item: -item[1])[:args.top]
+    deferred = sorted(name for name in last
+                      if any(name == module or name.startswith(module + '.') for module in DEFERRED_MODULES))
+
+    print(f"  import run                median {import_ms:>8.1f}ms")
+    for name, cumulative in heaviest:
+        print(f"    {name:<30} {cumulative / 1000:>8.1f}ms")
+    ttfr: Optional[float] = None
+    if not args.skip_serve:
+        ttfr = statistics.median(time_to_first_response() for _ in range(args.repeat))
+        print(f"  first response (gunicorn) median {ttfr * 1000:>8.1f}ms")
+    if deferred:
+        print(f"  imported at startup but should be deferred: {', '.join(deferred[:10])}")
+
+    if args.output:
+        report: Dict[str, Any] = {
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'import_run_ms': round(import_ms, 1),
+            'time_to_first_response_ms': round(ttfr * 1000, 1) if ttfr is not None else None,
+            'heaviest': [{'module': name, 'cumulative_ms': round(c / 1000, 1)} for name, c in heaviest],
+            'deferred_imported': deferred,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+    if args.check:
+        failures = []
+        if deferred:
+            failures.append(f"{len(deferred)} deferred modules imported at startup")
+        if args.max_import_ms is not None and import_ms > args.max_import_ms:
+            failures.append(f"import run {import_ms:.1f}ms > {args.max_import_ms}ms")
+        if failures:
+            print('Startup regressions:\n  ' + '\n  '.join(failures))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Compare gunicorn worker profiles under I/O-bound load.
+
+Each profile in gunicorn.conf.py is started on a synthetic dataset in the
+in-memory backend, with every storage call delayed by `--latency-ms` to
+stand in for a Firestore round trip. Concurrent keep-alive clients then
+request `--path` for `--duration` seconds; requests per second and latency
+percentiles are reported per profile. Profiles whose worker class is not
+installed (gevent) are skipped.
+
+    python -m benchmarks.throughput --profiles sync,gthread,gevent --concurrency 64
+"""
+from app.models.backends.base import StorageBackend
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PROFILES = ('sync', 'gthread', 'gevent')
+
+
+class LatencyBackend(StorageBackend):
+    """Delays every call to a wrapped backend, approximating network round trips."""
+
+    def __init__(self, backend: StorageBackend, latency: float):
+        self.backend = backend
+        self.latency = latency
+        self.name = backend.name
+
+    def get(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.backend.get(*args, **kwargs)
+
+    def stream(self, *args, **kwargs):
+        time.sleep(self.latency)
+        yield from self.backend.stream(*args, **kwargs)
+
+    def aggregate(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.backend.aggregate(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.backend.add(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.backend.set(*args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.backend.update(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.backend.delete(*args, **kwargs)
+
+    def write_batch(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.backend.write_batch(*args, **kwargs)
+
+
+def create_benchmark_app():
+    """Gunicorn app factory: the API over a seeded, latency-injected memory backend."""
+    from app import create_app
+    from app.models.backends import set_backend
+    from app.models.backends.memory_backend import MemoryBackend
+    from app.models.firestore_models import SalesModel, ProductionModel, ExpenseModel, WarrantyModel
+    from benchmarks import datagen
+
+    backend = MemoryBackend()
+    datagen.populate(backend, int(os.getenv('THROUGHPUT_SIZE', 200)))
+    set_backend(backend)
+    # Rebuilt ledgers, as in production: dashboard reads are a handful of round trips
+    for model in (SalesModel, ProductionModel, ExpenseModel, WarrantyModel):
+        model().ledger.rebuild()
+    set_backend(LatencyBackend(backend, float(os.getenv('THROUGHPUT_LATENCY_MS', 20)) / 1000))
+    return create_app()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _available(profile: str) -> bool:
+    return profile != 'gevent' or importlib.util.find_spec('gevent') is not None
+
+
+def _wait_ready(url: str, server: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {server.returncode}")
+        try:
+            if requests.get(f"{url}/health", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('gunicorn did not become ready')
+
+
+def _drive(url: str, concurrency: int, duration: float) -> Dict[str, Any]:
+    """Hammer `url` from `concurrency` keep-alive clients for `duration` seconds."""
+    deadline = time.monotonic() + duration
+
+    def client() -> tuple:
+        session = requests.Session()
+        latencies, errors = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=30).ok
+            except requests.RequestException:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+        return latencies, errors
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda _: client(), range(concurrency)))
+    elapsed = time.monotonic() - started
+    latencies = sorted(ms for samples, _ in outcomes for ms in samples)
+    if not latencies:
+        raise RuntimeError('No request succeeded')
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in outcomes),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 1),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+    }
+
+
+def run_profile(profile: str, args) -> Dict[str, Any]:
+    """Start gunicorn with one profile, load it, and stop it."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        'STORAGE_BACKEND': 'memory',
+        'GUNICORN_PROFILE': profile,
+        'GUNICORN_BIND': f"127.0.0.1:{port}",
+        'WEB_CONCURRENCY': str(args.workers),
+        'THROUGHPUT_SIZE': str(args.size),
+        'THROUGHPUT_LATENCY_MS': str(args.latency_ms),
+    }
+    if args.threads:
+        env['GUNICORN_THREADS'] = str(args.threads)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--log-level', 'warning',
+         'benchmarks.throughput:create_benchmark_app()'],
+        cwd=BACKEND_DIR, env=env, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(url, server)
+        _drive(url + args.path, args.concurrency, min(2.0, args.duration))  # warm-up
+        return {'profile': profile, **_drive(url + args.path, args.concurrency, args.duration)}
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', default=','.join(PROFILES), help='comma-separated GUNICORN_PROFILE values')
+    parser.add_argument('--workers', type=int, default=2, help='processes per profile (WEB_CONCURRENCY)')
+    parser.add_argument('--threads', type=int, default=None, help='GUNICORN_THREADS for gthread')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load per profile')
+    parser.add_argument('--latency-ms', type=float, default=20, help='simulated storage round trip')
+    parser.add_argument('--size', type=int, default=200, help='documents per collection')
+    parser.add_argument('--path', default='/api/business/dashboard-metrics', help='endpoint to load')
+    parser.add_argument('--output', default=None, help='also write JSON results here')
+    parser.add_argument('--verbose', action='store_true', help='show the server log')
+    args = parser.parse_args(argv)
+
+    results: List[Dict[str, Any]] = []
+    for profile in [p.strip() for p in args.profiles.split(',') if p.strip()]:
+        if not _available(profile):
+            print(f"  {profile:<8} skipped (worker class not installed)")
+            continue
+        result = run_profile(profile, args)
+        results.append(result)
+        print(f"  {profile:<8} {result['rps']:>8.1f} req/s   p50 {result['p50_ms']:>7.1f}ms   "
+              f"p95 {result['p95_ms']:>7.1f}ms   errors {result['errors']}")
+
+    if args.output:
+        report: Dict[str, Optional[Any]] = {
+            'python': platform.python_version(), 'cpus': os.cpu_count(),
+            'settings': {key: value for key, value in vars(args).items() if key != 'output'},
+            'results': results,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,30 +1,39 @@
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
 import os
 import json
+import threading
+import logging
 from dotenv import load_dotenv
 
+# The Firebase and Google Cloud SDKs (with gRPC) take most of the app's
+# import time, so they are imported on first use rather than here
+
 load_dotenv()
 
-# Global Firestore client
+logger = logging.getLogger(__name__)
+
+# Create the Firestore client on a background thread at worker start
+FIREBASE_WARMUP = os.getenv('FIREBASE_WARMUP', 'true').lower() in ('1', 'true', 'yes')
+
+# Firestore client of this process (never inherited across fork, see below)
 db = None
+_db_pid = None
+_db_lock = threading.Lock()
 
 
-def initialize_firebase():
-    """Initialize Firebase Admin SDK."""
-    global db
+def _initialize_app():
+    """Initialize the Firebase Admin SDK app (credentials only, no connections)."""
+    import firebase_admin
+    from firebase_admin import credentials
     
     if firebase_admin._apps:
-        # Firebase already initialized
-        db = firestore.client()
-        return
+        return firebase_admin.get_app()
     
     # Try to initialize with service account key
     service_account_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
     
     if service_account_path and os.path.exists(service_account_path):
         cred = credentials.Certificate(service_account_path)
-        firebase_admin.initialize_app(cred)
+        return firebase_admin.initialize_app(cred)
     else:
         # Try to initialize with environment variables (for Cloud Run)
         try:
@@ -40,22 +49,72 @@ def initialize_firebase():
                 "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
             }
             cred = credentials.Certificate(cred_dict)
-            firebase_admin.initialize_app(cred)
+            return firebase_admin.initialize_app(cred)
         except Exception as e:
             raise Exception(f"Failed to initialize Firebase: {str(e)}")
+
+
+def initialize_firebase():
+    """Initialize Firebase Admin SDK and this process's Firestore client.
     
-    db = firestore.client()
+    The client's gRPC channel is not fork-safe, so it is created lazily in
+    the process that uses it: a gunicorn worker forked from a preloaded
+    master builds its own on first use and shares it between all models
+    and threads.
+    """
+    global db, _db_pid
+    with _db_lock:
+        if db is not None and _db_pid == os.getpid():
+            return
+        from firebase_admin import firestore
+        app = _initialize_app()
+        # Built directly rather than via firestore.client(), which would hand
+        # a forked child the client cached on the app by its parent
+        db = firestore.Client(credentials=app.credential.get_credential(), project=app.project_id)
+        _db_pid = os.getpid()
+
+
+def reset_after_fork():
+    """Forget the parent's client in a forked child (it is rebuilt on first use)."""
+    global db, _db_pid, _db_lock
+    db = None
+    _db_pid = None
+    # The parent may have held the lock while forking
+    _db_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
 
 
 def get_db():
-    """Get Firestore client instance."""
-    global db
-    if db is None:
+    """Get this process's Firestore client, creating it on first use."""
+    if db is None or _db_pid != os.getpid():
         initialize_firebase()
     return db
 
 
+def warm_up_in_background() -> threading.Thread:
+    """Import the SDK and create the client on a daemon thread.
+    
+    Keeps Firebase off the startup path: the server answers (e.g. /health)
+    at once, and a request needing Firestore before the client is ready
+    waits for this thread instead of starting a second initialisation.
+    """
+    def warm():
+        try:
+            get_db()
+            logger.info("Firestore client ready")
+        except Exception as e:
+            logger.error(f"Firestore client initialisation failed: {str(e)}")
+    
+    thread = threading.Thread(target=warm, name='firebase-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
 def get_auth():
     """Get Firebase Auth instance."""
+    from firebase_admin import auth
+    _initialize_app()
     return auth
 
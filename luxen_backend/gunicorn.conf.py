@@ -0,0 +1,54 @@
+"""
+Gunicorn settings for the LUXEN backend.
+
+Requests spend most of their time waiting on Firestore, so each worker
+overlaps many of them. GUNICORN_PROFILE selects how:
+
+    gthread (default)  WEB_CONCURRENCY processes x GUNICORN_THREADS threads
+    gevent             greenlets, GUNICORN_WORKER_CONNECTIONS per process (needs `pip install gevent`)
+    sync               one request at a time per process (baseline only)
+
+The app is preloaded in the master (one import, pages shared copy-on-write)
+except under gevent, which must patch the standard library before the app
+is imported. Storage clients are never created before fork: each worker
+starts building its own in `post_worker_init`, on a background thread, so
+it can answer health checks while the Firebase SDK loads. Background job
+threads (app/services/job_runner.py) are started there too, per worker.
+"""
+import os
+
+PROFILE = os.getenv('GUNICORN_PROFILE', 'gthread').lower()
+if PROFILE not in ('gthread', 'gevent', 'sync'):
+    raise ValueError(f"Unknown GUNICORN_PROFILE '{PROFILE}'")
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', os.getenv('FLASK_PORT', '5000'))}")
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+worker_class = PROFILE
+# gthread: each live-metrics stream holds a thread for its lifetime
+threads = int(os.getenv('GUNICORN_THREADS', 16)) if PROFILE == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 500))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false' if PROFILE == 'gevent' else 'true').lower() in ('1', 'true', 'yes')
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+
+
+def post_worker_init(worker):
+    """Start creating this worker's storage client without delaying its first request.
+
+    Then start its background jobs, which precompute results on their own
+    threads (the first runs wait for the client).
+    """
+    from app.models.backends import STORAGE_BACKEND
+    if STORAGE_BACKEND == 'firestore':
+        if PROFILE == 'gevent':
+            # Lets gRPC (Firestore) cooperate with gevent's event loop
+            from grpc.experimental import gevent as grpc_gevent
+            grpc_gevent.init_gevent()
+        from config.firebase_config import FIREBASE_WARMUP, warm_up_in_background
+        if FIREBASE_WARMUP:
+            warm_up_in_background()
+    from app.services.job_runner import JOBS_ENABLED, get_job_runner
+    if JOBS_ENABLED:
+        get_job_runner().start()
@@ -20,13 +20,13 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# WSGI entry point for gunicorn (`run:app`); storage clients are created on first use
+app = create_app()
+
 
 def main():
     """Main function to run the Flask app."""
     
-    # Create the Flask app
-    app = create_app()
-    
     # Get configuration
     host = os.getenv('FLASK_HOST', '0.0.0.0')
     port = int(os.getenv('FLASK_PORT', 5000))
@@ -35,6 +35,12 @@ def main():
     logger.info(f"Starting LUXEN Backend on {host}:{port}")
     logger.info(f"Debug mode: {debug}")
     
+    # Load the Firebase SDK while the server starts (gunicorn does this per worker)
+    from app.models.backends import STORAGE_BACKEND
+    from config.firebase_config import FIREBASE_WARMUP, warm_up_in_background
+    if STORAGE_BACKEND == 'firestore' and FIREBASE_WARMUP:
+        warm_up_in_background()
+    
     # Run the app
     app.run(host=host, port=port, debug=debug)
 
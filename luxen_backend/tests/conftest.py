@@ -0,0 +1,32 @@
+"""Shared fixtures: every test runs against a fresh in-memory backend."""
+from pathlib import Path
+import os
+import sys
+
+# Set before the app is imported; nothing under test may need credentials
+os.environ['STORAGE_BACKEND'] = 'memory'
+os.environ.setdefault('JOBS_ENABLED', 'false')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+
+from app.models import ledger  # noqa: E402
+from app.models.backends import set_backend  # noqa: E402
+from app.models.backends.memory_backend import MemoryBackend  # noqa: E402
+from app.services import single_flight  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def backend():
+    """A new MemoryBackend as the process-wide backend, with ledger caches cleared."""
+    memory = MemoryBackend()
+    set_backend(memory)
+    ledger._shard_counts.clear()
+    ledger._summed.clear()
+    ledger._rebuilds.clear()
+    # Results shared within the grace window belong to the previous backend
+    single_flight._on_write(None, None, False)
+    yield memory
+    set_backend(None)
+    ledger._shard_counts.clear()
+    ledger._summed.clear()
@@ -0,0 +1,62 @@
+from app import create_app
+from app.routes import auth_routes
+from app.services.token_verifier import InvalidToken
+import pytest
+
+
+class _Verifier:
+    """Accepts the token 'good' only."""
+
+    def verify(self, token):
+        if token != 'good':
+            raise InvalidToken('Token signature is invalid')
+        return {'uid': 'user-1', 'exp': 0}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(auth_routes, 'AUTH_REQUIRED', True)
+    monkeypatch.setattr(auth_routes, 'get_token_verifier', lambda: _Verifier())
+    return create_app().test_client()
+
+
+def _api_rules():
+    app = create_app()
+    for rule in app.url_map.iter_rules():
+        if rule.rule.startswith('/api/') and rule.endpoint.split('.')[0] not in auth_routes.PUBLIC_BLUEPRINTS:
+            method = 'GET' if 'GET' in rule.methods else sorted(rule.methods - {'HEAD', 'OPTIONS'})[0]
+            path = rule.rule.replace('<', '').replace('>', '').replace('path:', '')
+            yield rule.endpoint, method, path
+
+
+def test_every_api_blueprint_is_protected():
+    blueprints = {endpoint.split('.')[0] for endpoint, _, _ in _api_rules()}
+    assert {'business', 'reports', 'ai', 'import', 'serials'} <= blueprints
+
+
+@pytest.mark.parametrize('endpoint,method,path', list(_api_rules()))
+def test_api_endpoints_reject_requests_without_a_token(client, endpoint, method, path):
+    response = client.open(path, method=method)
+    assert response.status_code == 401, endpoint
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
+
+    response = client.open(path, method=method, headers={'Authorization': 'Bearer forged'})
+    assert response.status_code == 401, endpoint
+
+
+def test_unauthenticated_import_writes_nothing(client, backend):
+    response = client.post('/api/import/owners', data='{"name": "Mallory", "sharePercentage": 100}\n',
+                           content_type='application/x-ndjson')
+    assert response.status_code == 401
+    assert not backend.collections.get('owners')
+
+
+def test_valid_token_is_accepted(client):
+    response = client.get('/api/serials/LUXEN-2024-001-00000001', headers={'Authorization': 'Bearer good'})
+    assert response.status_code != 401
+
+
+def test_token_verification_health_and_metrics_stay_open(client):
+    assert client.post('/api/auth/verify-token', json={}).status_code == 400
+    assert client.get('/health').status_code == 200
+    assert client.get('/metrics').status_code == 200
@@ -0,0 +1,65 @@
+from app.services.business_service import BusinessService
+from datetime import datetime, timedelta
+
+
+def _add_expenses(service):
+    for amount, category in ((10, 'Packaging'), (20, 'Rent'), (5, 'Packaging')):
+        service.expense_model.add({'amount': amount, 'category': category})
+
+
+def test_expenses_by_category_without_a_rebuilt_ledger():
+    service = BusinessService()
+    _add_expenses(service)
+
+    metrics = service.get_dashboard_metrics()['metrics']
+    assert metrics['totalExpenses'] == 35
+    assert metrics['expensesByCategory'] == {'Packaging': 15, 'Rent': 20}
+
+
+def test_expenses_by_category_from_the_ledger():
+    service = BusinessService()
+    _add_expenses(service)
+    service.expense_model.ledger.rebuild()
+    service.expense_model.add({'amount': 1, 'category': 'Rent'})
+
+    metrics = service.get_dashboard_metrics()['metrics']
+    assert metrics['expensesByCategory'] == {'Packaging': 15, 'Rent': 21}
+
+
+def _add_expense(service, amount, created_at):
+    doc_id = service.expense_model.add({'amount': amount, 'category': 'Rent'})
+    service.expense_model.update(doc_id, {'createdAt': created_at})
+
+
+def test_forecast_refits_only_when_closed_months_change(monkeypatch):
+    service = BusinessService()
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last_month = month_start - timedelta(days=15)
+    _add_expense(service, 100, last_month - timedelta(days=31))
+    _add_expense(service, 120, last_month)
+
+    loads = []
+    expense_table = service.expense_table
+    monkeypatch.setattr(service, 'expense_table', lambda snapshot=None: loads.append(1) or expense_table(snapshot))
+
+    first = service.predict_next_month_expenses()
+    assert len(loads) == 1
+
+    # New expenses this month are not modelled yet
+    service.expense_model.add({'amount': 999, 'category': 'Rent'})
+    assert service.predict_next_month_expenses()['historicalData'] == first['historicalData']
+    assert len(loads) == 1
+
+    # A late entry for a closed month is
+    _add_expense(service, 30, last_month)
+    corrected = service.predict_next_month_expenses()
+    assert len(loads) == 2
+    assert sum(corrected['historicalData'].values()) == sum(first['historicalData'].values()) + 30
+
+
+def test_monthly_totals_ignore_non_numeric_amounts():
+    service = BusinessService()
+    _add_expense(service, 100, datetime(2024, 1, 10))
+    _add_expense(service, '50', datetime(2024, 1, 11))
+
+    assert service.monthly_expense_totals() == {'2024-01': 100}
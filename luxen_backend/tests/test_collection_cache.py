@@ -0,0 +1,37 @@
+from app.models.collection_cache import CollectionCache
+import threading
+
+
+class _SlowStream:
+    """Runs `during` from another thread while the first document is streamed."""
+
+    def __init__(self, backend, during):
+        self.backend = backend
+        self.during = during
+
+    def stream(self, collection):
+        for index, doc in enumerate(self.backend.stream(collection)):
+            if index == 0:
+                thread = threading.Thread(target=self.during)
+                thread.start()
+                thread.join(timeout=2)
+                assert not thread.is_alive(), 'the cache lock was held while streaming'
+            yield doc
+
+
+def test_load_streams_without_the_lock_and_keeps_concurrent_writes(backend):
+    backend.set('sales', 's1', {'totalAmount': 1})
+    backend.set('sales', 's2', {'totalAmount': 2})
+    cache = CollectionCache(None, 'sales', use_listener=False)
+
+    def write():
+        # A write the stream may or may not already include
+        backend.set('sales', 's3', {'totalAmount': 3})
+        cache.apply('s3', {'totalAmount': 3})
+        backend.delete('sales', 's2')
+        cache.apply('s2', None)
+        cache.stats()
+
+    cache.backend = _SlowStream(backend, write)
+    docs = {doc['id']: doc['totalAmount'] for doc in cache.documents()}
+    assert docs == {'s1': 1, 's3': 3}
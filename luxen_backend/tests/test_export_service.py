@@ -0,0 +1,20 @@
+from app.services.export_service import csv_chunks
+import csv
+import io
+
+
+def _rows(docs, columns):
+    text = b''.join(csv_chunks(columns, docs)).decode('utf-8-sig')
+    return list(csv.reader(io.StringIO(text)))
+
+
+def test_csv_neutralises_formula_text():
+    docs = [
+        {'customerName': '=HYPERLINK("http://x","y")', 'category': '+1', 'amount': -5},
+        {'customerName': '@SUM(A1)', 'category': '-2', 'amount': 3.5},
+        {'customerName': 'Rahim', 'category': 'Rent', 'amount': 0},
+    ]
+    rows = _rows(docs, ['customerName', 'category', 'amount'])
+    assert rows[1] == ['\'=HYPERLINK("http://x","y")', "'+1", '-5']
+    assert rows[2] == ["'@SUM(A1)", "'-2", '3.5']
+    assert rows[3] == ['Rahim', 'Rent', '0']
@@ -0,0 +1,90 @@
+from app.models.firestore_models import ExpenseModel, SalesModel
+from app.services.import_service import ImportService
+import io
+
+SALES_CSV = (
+    'id,invoiceId,customerName,totalAmount\n'
+    's1,INV-1,Rahim,100\n'
+    's2,INV-2,Karim,250.5\n'
+    's3,INV-3,Salma,not-a-number\n'
+)
+
+
+def _import(body, mode):
+    return ImportService().import_stream('sales', io.BytesIO(body.encode('utf-8')), 'csv', mode)
+
+
+def test_upsert_import_is_idempotent(backend):
+    sales = SalesModel()
+    sales.ledger.rebuild()
+
+    for _ in range(3):
+        result = _import(SALES_CSV, 'upsert')
+        assert result['success'] is True
+        assert result['imported'] == 3
+
+    assert sorted(backend.collections['sales']) == ['s1', 's2', 's3']
+    assert backend.get('sales', 's2')['totalAmount'] == 250.5
+    totals = sales.ledger.read()
+    assert totals['count'] == 3
+    assert totals['totalAmount'] == 350.5
+    assert sales.ledger.drift() == {}
+
+
+def test_upsert_replaces_changed_rows():
+    sales = SalesModel()
+    sales.ledger.rebuild()
+    _import(SALES_CSV, 'upsert')
+    _import('id,invoiceId,totalAmount\ns1,INV-1,40\n', 'upsert')
+
+    totals = sales.ledger.read()
+    assert totals['count'] == 3
+    assert totals['totalAmount'] == 290.5
+
+
+def test_add_import_generates_ids():
+    sales = SalesModel()
+    _import(SALES_CSV, 'add')
+    _import(SALES_CSV, 'add')
+    assert sales.aggregate(['totalAmount'])['count'] == 6
+
+
+def test_upsert_keeps_created_at_of_replaced_rows(backend):
+    from app.services.business_service import BusinessService
+    from datetime import datetime
+    expenses_csv = 'id,category,amount\ne1,rent,100\ne2,salary,50\n'
+    ExpenseModel().ledger.rebuild()
+    ImportService().import_stream('expenses', io.BytesIO(expenses_csv.encode('utf-8')), 'csv', 'upsert')
+    backend.collections['expenses']['e1']['createdAt'] = datetime(2024, 1, 15)
+    before = BusinessService().monthly_expense_totals()
+
+    result = ImportService().import_stream('expenses', io.BytesIO(expenses_csv.encode('utf-8')), 'csv', 'upsert')
+
+    assert result['success'] is True
+    assert backend.get('expenses', 'e1')['createdAt'] == datetime(2024, 1, 15)
+    assert BusinessService().monthly_expense_totals() == before
+    assert before['2024-01'] == 100
+    totals = ExpenseModel().ledger.read()
+    assert totals['count'] == 2
+    assert totals['amount'] == 150
+
+
+def test_csv_keeps_codes_and_ids_as_text(backend):
+    body = 'id,invoiceId,customerPhone,totalAmount\n0001,00042,01712345678,100\n'
+    result = _import(body, 'upsert')
+
+    assert result['success'] is True
+    sale = backend.get('sales', '0001')
+    assert sale['invoiceId'] == '00042'
+    assert sale['customerPhone'] == '01712345678'
+    assert sale['totalAmount'] == 100
+
+
+def test_csv_rejects_non_finite_numbers(backend):
+    body = 'id,totalAmount\ns1,1e400\ns2,"[1, NaN]"\ns3,5\n'
+    result = _import(body, 'upsert')
+
+    assert result['imported'] == 1
+    assert result['skipped'] == 2
+    assert [error['line'] for error in result['errors']] == [2, 3]
+    assert sorted(backend.collections['sales']) == ['s3']
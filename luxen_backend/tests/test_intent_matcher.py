@@ -0,0 +1,31 @@
+from app import create_app
+from app.services.intent_matcher import INTENT_MATCHER
+import pytest
+
+
+@pytest.mark.parametrize('message,intent', [
+    ('আমার আয় কত?', 'sales'),
+    ('এই মাসের আয়ের হিসাব', 'sales'),
+    ('মালিকদের অংশ দেখাও', 'owner'),
+    ('ওয়ারেন্টির দাবিগুলো', 'warranty'),
+    ('How many sales this month?', 'sales'),
+])
+def test_keywords_match_with_their_suffixes(message, intent):
+    assert INTENT_MATCHER.classify(message) == intent
+
+
+@pytest.mark.parametrize('message', ['আয়না কোথায়?', 'অনুষ্ঠানের আয়োজন', 'হাইড্রোজেন', 'this shipping'])
+def test_keywords_inside_longer_words_do_not_match(message):
+    assert INTENT_MATCHER.classify(message) is None
+
+
+def test_chat_classifies_each_message_once(monkeypatch):
+    calls = []
+    classify = INTENT_MATCHER.classify
+    monkeypatch.setattr(INTENT_MATCHER, 'classify', lambda text: calls.append(text) or classify(text))
+
+    response = create_app().test_client().post('/api/ai/chat', json={'message': 'hello there, classify once'})
+
+    assert response.status_code == 200
+    assert response.get_json()['success'] is True
+    assert calls == ['hello there, classify once']
@@ -0,0 +1,64 @@
+from app import create_app
+from app.models.firestore_models import ExpenseModel, OwnerModel
+from app.routes import business_routes
+from app.services.job_runner import JobRunner, LocalJobQueue, current_month_key, default_jobs
+import pytest
+import threading
+
+
+def _spec(name):
+    return next(spec for spec in default_jobs() if spec.name == name)
+
+
+def test_closed_month_report_stamp_ignores_writes():
+    spec = _spec('monthly-report')
+    current = current_month_key('monthly-report').split(':')[1]
+    closed_stamp = spec.stamp('2020-01')
+    current_stamp = spec.stamp(current)
+
+    ExpenseModel().add({'amount': 5, 'category': 'Rent'})
+
+    assert spec.stamp('2020-01') == closed_stamp
+    assert spec.stamp(current) != current_stamp
+
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(LocalJobQueue(), workers=1)
+    for spec in default_jobs():
+        runner.register(spec)
+    return runner
+
+
+def test_first_request_is_computed_inline(runner, monkeypatch):
+    OwnerModel().add({'name': 'Rafi', 'investmentAmount': 100})
+    monkeypatch.setattr(business_routes, 'JOBS_ENABLED', True)
+    monkeypatch.setattr(business_routes, 'get_job_runner', lambda: runner)
+
+    response = create_app().test_client().get('/api/business/owner-shares')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['success'] is True
+    assert body['totalInvestment'] == 100
+    assert 'ageSeconds' in body
+    assert runner.materialized_model.get('owner-shares') is not None
+
+
+def test_run_counts_are_exact_under_concurrency(runner):
+    finished = []
+
+    def run_many():
+        for _ in range(50):
+            # None when another thread is running the key: not counted
+            if runner.run('owner-shares') is not None:
+                finished.append(1)
+
+    threads = [threading.Thread(target=run_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = runner.stats()
+    assert stats['runs'] + stats['skipped'] + stats['failed'] == len(finished)
@@ -0,0 +1,135 @@
+from app.models import ledger
+from app.models.firestore_models import ExpenseModel, SalesModel
+from app.models.ledger import LEDGER_COLLECTION
+from app.services.business_service import BusinessService
+from datetime import datetime, timedelta
+import pytest
+
+
+def _add_sales(model, amounts):
+    for amount in amounts:
+        model.add({'totalAmount': amount, 'serialNumbers': []})
+
+
+@pytest.fixture
+def shards(monkeypatch):
+    """Spread ledger writes over four shards and read them uncached."""
+    monkeypatch.setattr(ledger, 'LEDGER_SHARDS', 4)
+    monkeypatch.setattr(ledger, 'LEDGER_READ_CACHE_SECONDS', 0)
+
+
+def test_unsharded_ledger_follows_writes_after_rebuild(backend):
+    sales = SalesModel()
+    _add_sales(sales, [5, 7])
+    assert sales.ledger.read() is None
+
+    sales.ledger.rebuild()
+    _add_sales(sales, [3])
+    doc_id = sales.add({'totalAmount': 10})
+    sales.update(doc_id, {'totalAmount': 4})
+
+    totals = sales.ledger.read()
+    assert totals['count'] == 4
+    assert totals['totalAmount'] == 19
+    assert sales.ledger.drift() == {}
+    assert set(backend.collections[LEDGER_COLLECTION]) == {'sales'}
+
+
+@pytest.mark.usefixtures('shards')
+def test_sharded_ledger_sums_every_shard(backend):
+    sales = SalesModel()
+    _add_sales(sales, [1, 2])
+    sales.ledger.rebuild()
+    _add_sales(sales, range(1, 21))
+
+    assert sales.ledger.shard_count() == 4
+    assert len(backend.collections[LEDGER_COLLECTION]) > 1
+    actual = sales.aggregate(['totalAmount'])
+    totals = sales.ledger.read()
+    assert totals['count'] == actual['count'] == 22
+    assert totals['totalAmount'] == actual['totalAmount'] == 213
+    assert backend.get(LEDGER_COLLECTION, 'sales')['shardsUsed'] == 4
+
+
+@pytest.mark.usefixtures('shards')
+def test_other_processes_sum_shards_recorded_as_used(backend, monkeypatch):
+    sales = SalesModel()
+    sales.ledger.rebuild()
+    _add_sales(sales, range(1, 21))
+
+    # A process configured without sharding still reads the shards written above
+    monkeypatch.setattr(ledger, 'LEDGER_SHARDS', 1)
+    ledger._shard_counts.clear()
+    assert SalesModel().ledger.read()['totalAmount'] == 210
+
+
+@pytest.mark.usefixtures('shards')
+def test_rebuild_resets_shards_written_before_it(backend, monkeypatch):
+    sales = SalesModel()
+    _add_sales(sales, range(1, 21))
+    assert len(backend.collections[LEDGER_COLLECTION]) > 1
+
+    sales.ledger.rebuild()
+    shards = {doc_id: doc for doc_id, doc in backend.collections[LEDGER_COLLECTION].items() if doc_id != 'sales'}
+    assert all(doc == sales.ledger.marker() for doc in shards.values())
+    assert sales.ledger.read()['totalAmount'] == 210
+
+    # Raising the shard count later must not bring back old values
+    sales.ledger.set_shards(8)
+    assert sales.ledger.read()['totalAmount'] == 210
+
+
+@pytest.mark.usefixtures('shards')
+def test_group_totals_are_summed_across_shards():
+    expenses = ExpenseModel()
+    expenses.ledger.rebuild()
+    for i in range(12):
+        expenses.add({'amount': 10, 'category': 'Packaging' if i % 3 else 'Rent'})
+
+    totals = expenses.ledger.read()
+    assert ledger.AggregateLedger.groups(totals, 'amount') == {'Packaging': 80, 'Rent': 40}
+    assert expenses.ledger.drift() == {}
+
+
+def test_expired_ledger_is_rebuilt_and_changes_the_etag(backend):
+    service = BusinessService()
+    sales = service.sales_model
+    _add_sales(sales, [5])
+    sales.ledger.rebuild()
+    tag = service.data_etag('dashboard-metrics', ['sales'])
+    assert tag is not None
+
+    # A write the backend's ledger never sees, like the web app's addDoc
+    backend.set('sales', 'direct', {'totalAmount': 7, 'createdAt': datetime.utcnow()})
+    assert sales.ledger.totals()['totalAmount'] == 5
+
+    backend.update(LEDGER_COLLECTION, 'sales', {'rebuiltAt': datetime.utcnow() - timedelta(hours=1)})
+    assert service.data_etag('dashboard-metrics', ['sales']) is None
+    # The expired totals are served while the rebuild runs off the request thread
+    assert sales.ledger.totals()['totalAmount'] == 5
+    ledger._rebuilds['sales'].join(timeout=5)
+    assert sales.ledger.totals()['totalAmount'] == 12
+    fresh = service.data_etag('dashboard-metrics', ['sales'])
+    assert fresh not in (None, tag)
+
+
+def test_expired_ledger_is_not_rebuilt_under_another_process_lease(backend):
+    sales = SalesModel()
+    _add_sales(sales, [5])
+    sales.ledger.rebuild()
+    backend.set('sales', 'direct', {'totalAmount': 7, 'createdAt': datetime.utcnow()})
+    backend.update(LEDGER_COLLECTION, 'sales', {'rebuiltAt': datetime.utcnow() - timedelta(hours=1),
+                                                'rebuildingSince': datetime.utcnow(), 'rebuildingBy': 'other'})
+
+    sales.ledger.rebuild_in_background().join(timeout=5)
+    assert sales.ledger.totals()['totalAmount'] == 5
+    assert 'rebuildingBy' not in sales.ledger.read()
+
+
+def test_ledgers_without_max_age_are_trusted(backend, monkeypatch):
+    monkeypatch.setattr(ledger, 'LEDGER_MAX_AGE_SECONDS', 0)
+    sales = SalesModel()
+    sales.ledger.rebuild()
+    backend.set('sales', 'direct', {'totalAmount': 7})
+    backend.update(LEDGER_COLLECTION, 'sales', {'rebuiltAt': datetime.utcnow() - timedelta(days=1)})
+    assert sales.ledger.totals()['totalAmount'] == 0
@@ -0,0 +1,24 @@
+from app import create_app
+from app.routes import business_routes
+import threading
+
+STREAM = '/api/business/dashboard-metrics/stream'
+
+
+def test_streams_beyond_the_cap_get_503(monkeypatch):
+    monkeypatch.setattr(business_routes, '_stream_slots', threading.BoundedSemaphore(1))
+    client = create_app().test_client()
+
+    first = client.get(STREAM, buffered=False)
+    assert first.status_code == 200
+    assert next(first.response) == b'retry: 3000\n\n'
+
+    second = client.get(STREAM, buffered=False)
+    assert second.status_code == 503
+    assert 'Retry-After' in second.headers
+
+    # Closing a stream frees its slot
+    first.close()
+    third = client.get(STREAM, buffered=False)
+    assert third.status_code == 200
+    third.close()
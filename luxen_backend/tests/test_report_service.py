@@ -0,0 +1,44 @@
+from app.services.report_service import ReportService
+from datetime import datetime, timedelta
+
+
+def _add_expense(service, amount, created_at):
+    doc_id = service.expense_model.add({'amount': amount, 'category': 'Rent'})
+    service.expense_model.update(doc_id, {'createdAt': created_at})
+
+
+def test_closed_month_report_ignores_non_numeric_amounts(backend):
+    service = ReportService()
+    _add_expense(service, 100, datetime(2024, 1, 10))
+    _add_expense(service, 'n/a', datetime(2024, 1, 11))
+
+    report = service.get_monthly_report(2024, 1)
+    assert report['success'] is True
+    assert report['totalExpenses'] == 100
+    assert report['expenseCount'] == 2
+    assert backend.get('reports', 'rep_2024_01')['closed'] is True
+
+
+def test_months_before_any_data_are_not_stored(backend):
+    service = ReportService()
+    _add_expense(service, 100, datetime(2024, 1, 10))
+
+    report = service.get_monthly_report(1999, 6)
+    assert report['success'] is True
+    assert report['totalExpenses'] == 0
+    assert backend.collections.get('reports', {}) == {}
+
+
+def test_just_ended_month_is_not_closed_yet(backend, monkeypatch):
+    import app.services.report_service as report_service
+    service = ReportService()
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last_month = month_start - timedelta(days=1)
+    _add_expense(service, 100, last_month)
+    # Every entry of the last month is still within the settle window
+    monkeypatch.setattr(report_service, 'REPORT_SETTLE_SECONDS', 40 * 86400)
+
+    report = service.get_monthly_report(last_month.year, last_month.month)
+    assert report['success'] is True
+    assert report['closed'] is False
+    assert report['totalExpenses'] == 100
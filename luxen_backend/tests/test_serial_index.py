@@ -0,0 +1,31 @@
+from app.services.serial_index import SerialIndex
+import pytest
+
+
+@pytest.fixture
+def index():
+    index = SerialIndex()
+    yield index
+    index.close()
+
+
+def test_len_counts_distinct_serials_as_documents_change(index):
+    production = index.models['production']
+    sales = index.models['sales']
+    batch = production.add({'serialNumbers': ['A', 'B', 'C'], 'totalCost': 3})
+    index.ensure_loaded()
+    assert len(index) == 3
+
+    sale = sales.add({'serialNumbers': ['A', 'Z'], 'totalAmount': 1})
+    assert len(index) == 4
+    sales.update(sale, {'serialNumbers': ['B']})
+    assert len(index) == 3
+    production.delete(batch)
+    assert len(index) == 1
+    sales.delete(sale)
+    assert len(index) == 0
+
+    production.add({'serialNumbers': ['D', 'E'], 'totalCost': 2})
+    index.load()
+    assert len(index) == len(index._known()) == 2
+    assert index.stats()['serials'] == 2
@@ -0,0 +1,50 @@
+from app.models.firestore_models import SalesModel
+from app.services.business_service import BusinessService
+from app.services.single_flight import SingleFlight
+import threading
+import time
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight('test', grace=0)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'success': True}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do(None, slow))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+
+def test_grace_results_are_not_shared_after_a_write():
+    service = BusinessService()
+    SalesModel().add({'totalAmount': 10})
+    first = service.get_dashboard_metrics()
+    assert service.get_dashboard_metrics() is first
+
+    SalesModel().add({'totalAmount': 5})
+    fresh = service.get_dashboard_metrics()
+    assert fresh is not first
+    assert fresh['metrics']['totalSales'] == 15
+
+
+def test_failures_are_not_reused():
+    flight = SingleFlight('test', grace=60)
+    outcomes = iter([{'success': False, 'error': 'down'}, {'success': True}])
+    assert flight.do(None, lambda: next(outcomes))['success'] is False
+    assert flight.do(None, lambda: next(outcomes))['success'] is True
+
+
+def test_calls_with_a_snapshot_run_directly():
+    service = BusinessService()
+    snapshot = service.snapshot()
+    assert service.get_dashboard_metrics(snapshot) is not service.get_dashboard_metrics(snapshot)